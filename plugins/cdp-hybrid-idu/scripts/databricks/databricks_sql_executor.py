@@ -25,13 +25,20 @@ Install:
 
 import argparse
 import getpass
+import hashlib
+import json
+import math
 import pathlib
+import random
 import re
 import sys
+import threading
 import time
 import os
 import yaml
-from typing import List, Tuple, Optional
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterator, List, NamedTuple, Set, Tuple, Optional
 
 from databricks import sql
 from rich import print
@@ -56,6 +63,539 @@ def load_unify_config(config_path: pathlib.Path) -> dict:
         return {}
 
 
+def get_table_prefix(config: dict) -> str:
+    """Get the unification table prefix (canonical ID name) from config"""
+    canonical_ids = config.get('canonical_ids', [])
+    return canonical_ids[0].get('name', 'td_id') if canonical_ids else 'td_id'
+
+
+# Statement classification by leading keyword
+STATEMENT_KINDS = {
+    "USE": "context",
+    "SET": "config",
+    "RESET": "config",
+    "CREATE": "ddl",
+    "DROP": "ddl",
+    "ALTER": "ddl",
+    "TRUNCATE": "ddl",
+    "OPTIMIZE": "ddl",
+    "VACUUM": "ddl",
+    "ANALYZE": "ddl",
+    "COMMENT": "ddl",
+    "INSERT": "dml",
+    "MERGE": "dml",
+    "UPDATE": "dml",
+    "DELETE": "dml",
+    "COPY": "dml",
+    "SELECT": "query",
+    "WITH": "query",
+    "VALUES": "query",
+    "DESCRIBE": "query",
+    "DESC": "query",
+    "SHOW": "query",
+    "EXPLAIN": "query",
+    "BEGIN": "script",
+    "DECLARE": "script",
+    "EXECUTE": "script",
+    "CALL": "script",
+}
+# END <keyword> closes a scripting construct whose opener is not counted
+END_SUFFIXES = {"IF", "WHILE", "LOOP", "FOR", "REPEAT"}
+
+
+class SqlStatement(NamedTuple):
+    text: str  # statement as written (comments included)
+    code: str  # statement with comments removed
+    kind: str  # context, config, ddl, dml, query, script or other
+    keyword: str  # leading keyword, upper-cased
+
+
+def _scan_word(sql: str, i: int) -> int:
+    while i < len(sql) and (sql[i].isalnum() or sql[i] == "_"):
+        i += 1
+    return i
+
+
+def _next_word(sql: str, i: int) -> str:
+    """Upper-cased word following position i (skipping whitespace), or ";" / ""."""
+    while i < len(sql) and sql[i].isspace():
+        i += 1
+    if i < len(sql) and sql[i] == ";":
+        return ";"
+    return sql[i:_scan_word(sql, i)].upper()
+
+
+def split_sql(sql: str) -> List[Tuple[str, str]]:
+    """
+    Split a script into statements on top-level semicolons, respecting quotes
+    (with backslash and doubled-quote escapes), -- and /* */ comments,
+    $$ blocks and BEGIN/CASE ... END nesting.
+    Returns: [(text, code_without_comments)]
+    """
+    statements = []
+    text_start = 0
+    code: List[str] = []
+    depth = 0
+    i = 0
+    n = len(sql)
+
+    def flush(end: int):
+        text = sql[text_start:end].strip()
+        stmt_code = "".join(code).strip()
+        if stmt_code:
+            statements.append((text, stmt_code))
+        code.clear()
+
+    while i < n:
+        ch = sql[i]
+        if ch in ("'", '"', "`"):
+            j = i + 1
+            while j < n:
+                if sql[j] == "\\" and ch != "`":
+                    j += 2
+                    continue
+                if sql[j] == ch:
+                    if j + 1 < n and sql[j + 1] == ch:
+                        j += 2
+                        continue
+                    break
+                j += 1
+            code.append(sql[i:j + 1])
+            i = j + 1
+        elif sql.startswith("--", i):
+            j = sql.find("\n", i)
+            i = n if j < 0 else j
+        elif sql.startswith("/*", i):
+            j = sql.find("*/", i + 2)
+            i = n if j < 0 else j + 2
+            code.append(" ")
+        elif sql.startswith("$$", i):
+            j = sql.find("$$", i + 2)
+            j = n if j < 0 else j + 2
+            code.append(sql[i:j])
+            i = j
+        elif ch.isalpha() or ch == "_":
+            j = _scan_word(sql, i)
+            word = sql[i:j].upper()
+            if word == "CASE":
+                depth += 1
+            elif word == "BEGIN" and _next_word(sql, j) not in (";", "TRANSACTION", "WORK", ""):
+                depth += 1
+            elif word == "END" and depth > 0 and _next_word(sql, j) not in END_SUFFIXES:
+                depth -= 1
+            code.append(sql[i:j])
+            i = j
+        elif ch == ";" and depth == 0:
+            flush(i)
+            i += 1
+            text_start = i
+        else:
+            code.append(ch)
+            i += 1
+
+    flush(n)
+    return statements
+
+
+_PARSE_CACHE: Dict[str, List[SqlStatement]] = {}
+_PARSE_CACHE_LOCK = threading.Lock()
+
+
+def parse_sql(sql: str) -> List[SqlStatement]:
+    """Split and classify a script; results are cached by content hash"""
+    key = hashlib.sha256(sql.encode("utf-8")).hexdigest()
+    with _PARSE_CACHE_LOCK:
+        cached = _PARSE_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    statements = []
+    for text, code in split_sql(sql):
+        words = code.split(None, 2)
+        keyword = words[0].upper().rstrip("(")
+        kind = STATEMENT_KINDS.get(keyword, "other")
+        statements.append(SqlStatement(text, code, kind, keyword))
+
+    with _PARSE_CACHE_LOCK:
+        _PARSE_CACHE[key] = statements
+    return statements
+
+
+def rebuilt_table_rows(statements: List[SqlStatement], row_counts: Dict[int, int]) -> Dict[str, int]:
+    """
+    Row counts of the tables a script rebuilt from scratch (CREATE OR REPLACE, then
+    only INSERTs), summed from the statements' affected rows; tables it MERGEs into,
+    UPDATEs or DELETEs from are left out since affected rows are not their size
+    """
+    table_rows: Dict[str, int] = {}
+    for index, stmt in enumerate(statements):
+        match = CREATE_OR_REPLACE_RE.match(stmt.code)
+        if match:
+            table_rows[normalize_table_name(match.group(1))] = row_counts.get(index, 0)
+            continue
+        for table in extract_table_refs(stmt.code)[1]:
+            if table not in table_rows:
+                continue
+            if stmt.keyword == "INSERT":
+                table_rows[table] += row_counts.get(index, 0)
+            else:
+                table_rows.pop(table)
+    return table_rows
+
+
+# Errors worth retrying: Delta optimistic-concurrency conflicts, endpoint
+# throttling/unavailability and dropped connections
+TRANSIENT_ERROR_PATTERNS = [
+    re.compile(r"DELTA_CONCURRENT|Concurrent\w*Exception|MetadataChangedException"),
+    re.compile(r"TEMPORARILY_UNAVAILABLE|RESOURCE_EXHAUSTED|Service Unavailable|Too Many Requests"),
+    re.compile(r"\b(429|502|503|504)\b"),
+    re.compile(r"timed out|Timeout(Error|Exception)|Read ?Timeout|Connect ?Timeout", re.I),
+    re.compile(r"Connection (reset|aborted|refused)|RemoteDisconnected|BrokenPipe", re.I),
+]
+
+# Statements that can simply be re-run after an ambiguous failure
+IDEMPOTENT_STATEMENT_RE = re.compile(
+    r"^(CREATE\s+OR\s+REPLACE\b|CREATE\s+(?:\w+\s+)?TABLE\s+IF\s+NOT\s+EXISTS\b"
+    r"|DROP\s+\w+\s+IF\s+EXISTS\b|INSERT\s+OVERWRITE\b|SELECT\b|WITH\b"
+    r"|DELETE\b|DESCRIBE\b|DESC\b|SHOW\b|OPTIMIZE\b|USE\b|SET\b|RESET\b)",
+    re.I,
+)
+CREATE_OR_REPLACE_RE = re.compile(r"^CREATE\s+OR\s+REPLACE\s+TABLE\s+([\w.`]+)", re.I)
+
+
+def is_idempotent_statement(stmt: SqlStatement) -> bool:
+    """True if re-running the statement gives the same result (safe to retry on its own)"""
+    return bool(IDEMPOTENT_STATEMENT_RE.match(stmt.code))
+
+
+def is_session_statement(stmt: SqlStatement) -> bool:
+    """True for statements that only change session state (USE/SET)"""
+    return stmt.kind in ("context", "config")
+
+
+def is_restartable_script(statements: List[SqlStatement]) -> bool:
+    """
+    True if the whole script can be re-run from the top: every non-idempotent
+    write targets a table the script itself recreated with CREATE OR REPLACE
+    or cleared with DELETE earlier
+    """
+    recreated = set()
+    for stmt in statements:
+        if is_idempotent_statement(stmt):
+            match = CREATE_OR_REPLACE_RE.match(stmt.code)
+            if match:
+                recreated.add(normalize_table_name(match.group(1)))
+            elif stmt.keyword == "DELETE":
+                recreated |= extract_table_refs(stmt.code)[1]
+            continue
+        _, writes = extract_table_refs(stmt.code)
+        if not writes or not writes <= recreated:
+            return False
+    return True
+
+
+class RetryPolicy:
+    """Classifies errors as transient and retries them with exponential backoff"""
+
+    def __init__(self, max_retries: int = 3, backoff: float = 2.0, max_backoff: float = 60.0):
+        self.max_retries = max(0, max_retries)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def is_transient(self, error: Exception) -> bool:
+        message = f"{type(error).__name__}: {error}"
+        return any(pattern.search(message) for pattern in TRANSIENT_ERROR_PATTERNS)
+
+    def should_retry(self, error: Exception, attempt: int) -> bool:
+        """attempt is the number of retries already made"""
+        return attempt < self.max_retries and self.is_transient(error)
+
+    def wait(self, attempt: int, error: Exception, description: str = ""):
+        """Sleep before retry number `attempt` (1-based), with jitter"""
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        print(
+            f"[yellow]⚠[/yellow] Transient error{f' in {description}' if description else ''}: "
+            f"{str(error).splitlines()[0] if str(error) else type(error).__name__}"
+        )
+        print(f"[cyan]•[/cyan] Retrying in {delay:.1f}s (attempt {attempt}/{self.max_retries})")
+        time.sleep(delay)
+
+    def call(self, fn: Callable, description: str = ""):
+        """Call fn(), retrying transient failures"""
+        attempt = 0
+        while True:
+            try:
+                return fn()
+            except Exception as e:
+                if not self.should_retry(e, attempt):
+                    raise
+                attempt += 1
+                self.wait(attempt, e, description)
+
+
+def iter_result_batch_sizes(cursor, batch_size: int) -> Iterator[int]:
+    """
+    Yield the row counts of successive result batches, holding one batch at a time.
+    Uses Arrow batches (fetchmany_arrow) and falls back to row batches without pyarrow.
+    """
+    fetch_arrow = getattr(cursor, "fetchmany_arrow", None)
+    if fetch_arrow is not None:
+        try:
+            batch = fetch_arrow(batch_size)
+        except Exception:
+            fetch_arrow = None
+        else:
+            while batch.num_rows:
+                yield batch.num_rows
+                batch = fetch_arrow(batch_size)
+            return
+
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            return
+        yield len(batch)
+
+
+# Delta history operations that rewrite the whole table, so numOutputRows is its row count
+FULL_REWRITE_OPERATIONS = {
+    "CREATE TABLE AS SELECT",
+    "REPLACE TABLE AS SELECT",
+    "CREATE OR REPLACE TABLE AS SELECT",
+}
+
+
+class OptimizePolicy:
+    """Decides whether a Delta table is fragmented enough to be worth an OPTIMIZE"""
+
+    def __init__(
+        self,
+        mode: str = "auto",
+        min_files: int = 16,
+        max_fragmentation: float = 4.0,
+        target_file_size: int = 128 * 1024 * 1024,
+        background: bool = False,
+    ):
+        self.mode = mode  # "auto", "always" or "off"
+        self.min_files = min_files
+        self.max_fragmentation = max_fragmentation
+        self.target_file_size = target_file_size
+        self.background = background
+
+    def should_optimize(self, detail: Optional[dict]) -> Tuple[bool, str]:
+        """
+        Judge a table from its DESCRIBE DETAIL statistics
+        Returns: (optimize, reason)
+        """
+        if self.mode == "off":
+            return False, "optimization disabled"
+        if self.mode == "always":
+            return True, "optimize mode always"
+        if not detail:
+            return False, "no file statistics"
+
+        num_files = int(detail.get("numFiles") or 0)
+        size_bytes = int(detail.get("sizeInBytes") or 0)
+        if num_files < self.min_files:
+            return False, f"{num_files} files"
+
+        # How many times more files the table has than compacted files would need
+        fragmentation = num_files / max(1, math.ceil(size_bytes / self.target_file_size))
+        reason = f"{num_files} files, {fragmentation:.1f}x fragmentation"
+        return fragmentation >= self.max_fragmentation, reason
+
+
+class PooledConnection:
+    """A pooled connection plus the state needed to decide whether it can be reused"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.dirty = False  # session context (USE/SET) changed since it was applied
+        self.suspect = False  # last use raised an error; validate before reuse
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of connections with the session context already applied.
+    Connections are opened lazily up to max_size; dead connections are replaced
+    and connections whose context may have changed get it re-applied on checkout.
+    """
+
+    def __init__(
+        self,
+        connect_fn: Callable[[], object],
+        context_statements: List[str],
+        max_size: int = 4,
+    ):
+        self.connect_fn = connect_fn
+        self.context_statements = context_statements
+        self._context_keys = {" ".join(stmt.split()).upper() for stmt in context_statements}
+        self.max_size = max(1, max_size)
+        self._idle: List[PooledConnection] = []
+        self._opened = 0
+        self._closed = False
+        self._lock = threading.Condition()
+
+    def resize(self, max_size: int):
+        """Raise the number of connections the pool may open"""
+        with self._lock:
+            self.max_size = max(self.max_size, max_size)
+            self._lock.notify_all()
+
+    def _open(self) -> PooledConnection:
+        pooled = PooledConnection(self.connect_fn())
+        self._apply_context(pooled)
+        return pooled
+
+    def _apply_context(self, pooled: PooledConnection):
+        cursor = pooled.connection.cursor()
+        try:
+            for stmt in self.context_statements:
+                cursor.execute(stmt)
+        finally:
+            cursor.close()
+        pooled.dirty = False
+
+    def track_context(self, pooled: PooledConnection, stmt: str):
+        """Mark a connection dirty if a statement changed its session context"""
+        if " ".join(stmt.split()).upper() not in self._context_keys:
+            pooled.dirty = True
+
+    def _is_alive(self, pooled: PooledConnection) -> bool:
+        try:
+            cursor = pooled.connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _close(self, pooled: PooledConnection):
+        try:
+            pooled.connection.close()
+        except Exception:
+            pass
+
+    def acquire(self) -> PooledConnection:
+        """Check out a connection, opening or repairing one if needed"""
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                if self._idle:
+                    pooled = self._idle.pop()
+                    break
+                if self._opened < self.max_size:
+                    self._opened += 1
+                    pooled = None
+                    break
+                self._lock.wait()
+
+        try:
+            if pooled is None:
+                return self._open()
+            if pooled.suspect and not self._is_alive(pooled):
+                print(f"[yellow]⚠[/yellow] Connection lost, reconnecting")
+                self._close(pooled)
+                return self._open()
+            if pooled.dirty or pooled.suspect:
+                self._apply_context(pooled)
+            pooled.suspect = False
+            return pooled
+        except Exception:
+            with self._lock:
+                self._opened -= 1
+                self._lock.notify()
+            raise
+
+    def release(self, pooled: PooledConnection):
+        """Return a connection to the pool"""
+        with self._lock:
+            if self._closed:
+                self._opened -= 1
+                self._close(pooled)
+            else:
+                self._idle.append(pooled)
+            self._lock.notify()
+
+    @contextmanager
+    def cursor(self) -> Iterator[Tuple[object, PooledConnection]]:
+        """Yield (cursor, pooled_connection); the connection goes back to the pool afterwards"""
+        pooled = self.acquire()
+        cursor = None
+        try:
+            cursor = pooled.connection.cursor()
+            yield cursor, pooled
+        except Exception:
+            pooled.suspect = True
+            raise
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except Exception:
+                    pooled.suspect = True
+            self.release(pooled)
+
+    def close_all(self):
+        """Close every idle connection; connections still in use close on release"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+            self._lock.notify_all()
+        for pooled in idle:
+            self._close(pooled)
+
+
+class RunReport:
+    """Timings of steps, statements, loop iterations and checks collected for the run report"""
+
+    def __init__(self):
+        self.run_id = time.strftime("%Y%m%d_%H%M%S")
+        self.started_at = time.time()
+        self.events: List[dict] = []
+        self.tables: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timed(self, kind: str, name: str, **fields) -> Iterator[dict]:
+        """Time a block; the caller may add rows/counts to the yielded event"""
+        started = time.time()
+        event = {"kind": kind, "name": name, **fields, "success": True, "started_at": round(started, 3)}
+        with self._lock:
+            self.events.append(event)
+        try:
+            yield event
+        except BaseException:
+            event["success"] = False
+            raise
+        finally:
+            event["seconds"] = round(time.time() - started, 3)
+
+    def snapshot(self) -> List[dict]:
+        """Finished events in start order"""
+        with self._lock:
+            return [event for event in self.events if "seconds" in event]
+
+    def write_json(self, path: pathlib.Path):
+        report = {
+            "run_id": self.run_id,
+            "started_at": round(self.started_at, 3),
+            "seconds": round(time.time() - self.started_at, 3),
+            "events": self.snapshot(),
+        }
+        if self.tables:
+            report["tables"] = self.tables
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(report, indent=2, default=str), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+
 class DatabricksExecutor:
     def __init__(
         self,
@@ -66,6 +606,17 @@ class DatabricksExecutor:
         schema: str,
         auth_type: str = "pat",  # personal access token by default
         config: dict = None,
+        pool_size: int = 4,
+        retry_policy: Optional[RetryPolicy] = None,
+        report: Optional[RunReport] = None,
+        max_result_rows: int = 100_000,
+        result_batch_size: int = 10_000,
+        count_large_results: bool = False,
+        optimize_policy: Optional[OptimizePolicy] = None,
+        client_loop: bool = False,
+        loop_history_table: bool = True,
+        cold_start: bool = False,
+        loop_progress_interval: float = 15.0,
     ):
         self.server_hostname = server_hostname
         self.http_path = http_path
@@ -73,40 +624,62 @@ class DatabricksExecutor:
         self.catalog = catalog
         self.schema = schema
         self.auth_type = auth_type
-        self.connection = None
-        self.cursor = None
+        self.pool_size = pool_size
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.report = report or RunReport()
+        self._table_info: Dict[str, dict] = {}
+        self._table_info_lock = threading.Lock()
+        self.max_result_rows = max_result_rows
+        self.result_batch_size = result_batch_size
+        self.count_large_results = count_large_results
+        self.optimize_policy = optimize_policy or OptimizePolicy()
+        self.client_loop = client_loop
+        self.loop_history_table = loop_history_table
+        self.cold_start = cold_start
+        self.loop_progress_interval = loop_progress_interval
+        self.pool: Optional[ConnectionPool] = None
+        self._warmup: Optional[threading.Thread] = None
+        self._warmup_event: Optional[dict] = None
+        self._warmup_ok = False
+        self._optimize_worker: Optional[ThreadPoolExecutor] = None
+        self._pending_optimize: Dict[str, object] = {}
+        self._optimize_lock = threading.Lock()
         self.config = config or {}
         
         # Extract table name prefix from config
-        canonical_ids = self.config.get('canonical_ids', [])
-        self.table_prefix = canonical_ids[0].get('name', 'td_id') if canonical_ids else 'td_id'
+        self.table_prefix = get_table_prefix(self.config)
+
+    def _open_connection(self):
+        """Open a new Databricks connection (used by the connection pool)"""
+        # Different connection methods based on auth type
+        if self.auth_type == "pat":
+            # Personal Access Token authentication
+            return sql.connect(
+                server_hostname=self.server_hostname,
+                http_path=self.http_path,
+                access_token=self.access_token,
+            )
+        elif self.auth_type == "oauth":
+            # OAuth authentication
+            return sql.connect(
+                server_hostname=self.server_hostname,
+                http_path=self.http_path,
+                auth_type="databricks-oauth",
+            )
+        raise ValueError(f"Unsupported auth type: {self.auth_type}")
 
     def connect(self):
-        """Establish connection to Databricks"""
+        """Establish connection pool to Databricks"""
         try:
-            # Different connection methods based on auth type
-            if self.auth_type == "pat":
-                # Personal Access Token authentication
-                self.connection = sql.connect(
-                    server_hostname=self.server_hostname,
-                    http_path=self.http_path,
-                    access_token=self.access_token,
-                )
-            elif self.auth_type == "oauth":
-                # OAuth authentication
-                self.connection = sql.connect(
-                    server_hostname=self.server_hostname,
-                    http_path=self.http_path,
-                    auth_type="databricks-oauth",
-                )
-            else:
-                raise ValueError(f"Unsupported auth type: {self.auth_type}")
-
-            self.cursor = self.connection.cursor()
+            # Every pooled connection gets the catalog and schema context
+            self.pool = ConnectionPool(
+                self._open_connection,
+                [f"USE CATALOG {self.catalog}", f"USE SCHEMA {self.schema}"],
+                max_size=self.pool_size,
+            )
 
-            # Set catalog and schema context
-            self.cursor.execute(f"USE CATALOG {self.catalog}")
-            self.cursor.execute(f"USE SCHEMA {self.schema}")
+            # Open the first connection up front to validate credentials
+            self.pool.release(self.pool.acquire())
 
             print(f"[green]✓[/green] Connected to Databricks: {self.server_hostname}")
             print(
@@ -119,62 +692,132 @@ class DatabricksExecutor:
             return False
 
     def disconnect(self):
-        """Close Databricks connection"""
-        if self.cursor:
-            self.cursor.close()
-        if self.connection:
-            self.connection.close()
+        """Close Databricks connections"""
+        self.wait_for_optimize()
+        if self._optimize_worker:
+            self._optimize_worker.shutdown()
+        if self.pool:
+            self.pool.close_all()
         print(f"[yellow]•[/yellow] Disconnected from Databricks")
 
+    def cold_start_reason(self, fingerprint: str) -> Optional[str]:
+        """
+        Why the unify loop cannot be seeded from the previous run's graph, or None when
+        that graph exists and was built with the same keys, priorities and layout (fingerprint)
+        """
+        if self.cold_start:
+            return "--cold-start given"
+        graph_table = f"{self.catalog}.{self.schema}.{self.table_prefix}_graph"
+        fingerprint_table = f"{graph_table}_fingerprint"
+
+        # A failed check only costs a cold start, so errors are not retried
+        try:
+            with self.pool.cursor() as (cursor, _):
+                cursor.execute(f"SELECT 1 FROM {graph_table} LIMIT 1").fetchall()
+        except Exception:
+            return f"no previous {self.table_prefix}_graph"
+        try:
+            with self.pool.cursor() as (cursor, _):
+                row = cursor.execute(f"SELECT key_fingerprint FROM {fingerprint_table}").fetchone()
+        except Exception:
+            row = None
+        if row is None:
+            return "the previous graph has no recorded key fingerprint"
+        if row[0] != fingerprint:
+            return "merge keys, their priority or the graph layout changed since the previous graph was built"
+        return None
+
+    def start_warmup(self):
+        """Connect and wake the warehouse in a background thread while the run is planned"""
+        self._warmup = threading.Thread(target=self._warm_up, name="warmup", daemon=True)
+        self._warmup.start()
+
+    def _warm_up(self):
+        with self.report.timed("warmup", self.http_path) as event:
+            self._warmup_event = event
+            self._warmup_ok = self.connect()
+            if self._warmup_ok:
+                # A stopped SQL warehouse only counts as started once it has answered a query
+                try:
+                    with self.pool.cursor() as (cursor, _):
+                        cursor.execute("SELECT 1").fetchall()
+                except Exception as e:
+                    print(f"[yellow]⚠[/yellow] Warehouse warm-up query failed: {e}")
+            event["success"] = self._warmup_ok
+
+    def wait_for_warmup(self) -> bool:
+        """
+        Wait for the background connection and print how much of its latency
+        planning hid. Returns whether the connection succeeded.
+        """
+        if self._warmup is None:
+            self.start_warmup()
+        waiting = time.time()
+        self._warmup.join()
+        waited = time.time() - waiting
+
+        event = self._warmup_event
+        hidden = max(0.0, event["seconds"] - waited)
+        event.update(waited_seconds=round(waited, 3), hidden_seconds=round(hidden, 3))
+        print(
+            f"[cyan]•[/cyan] Startup: connect and warm-up took {event['seconds']:.1f}s, "
+            f"{hidden:.1f}s hidden behind planning, waited {waited:.1f}s"
+        )
+        return self._warmup_ok
+
     def execute_sql(
-        self, sql: str, description: str = ""
+        self, sql: str, description: str = "", table_rows: Optional[Dict[str, int]] = None
     ) -> Tuple[bool, Optional[int], str]:
         """
         Execute SQL statement
+        table_rows, if given, is filled with the row counts of the tables the script rebuilt
         Returns: (success, row_count, message)
         """
         try:
-            # Split SQL into individual statements
-            statements = [stmt.strip() for stmt in sql.split(";") if stmt.strip()]
-
-            total_rows = 0
-            for stmt in statements:
-                # Skip empty statements
-                if not stmt:
-                    continue
-
-                # Handle different statement types
-                if stmt.upper().startswith(
-                    ("USE CATALOG", "USE SCHEMA", "USE DATABASE")
-                ):
-                    # Execute context-setting statements
-                    self.cursor.execute(stmt)
-                elif stmt.upper().startswith("SET "):
-                    # Execute configuration statements
-                    self.cursor.execute(stmt)
-                else:
-                    # Execute main statement
-                    result = self.cursor.execute(stmt)
-
-                    # Try to get row count (may not be available for all operations)
-                    try:
-                        if hasattr(result, "rowcount") and result.rowcount >= 0:
-                            total_rows += result.rowcount
-                        else:
-                            # For some operations, try to get affected rows differently
-                            rows = self.cursor.fetchall()
-                            if rows:
-                                total_rows += len(rows)
-                    except Exception:
-                        # Row count not available for this operation type
-                        # For INSERT statements, row count might be available via other means
-                        if stmt.upper().strip().startswith("INSERT"):
-                            try:
-                                # Try to extract table name and count rows if possible
-                                # This is a fallback - actual row count should come from result.rowcount
-                                pass
-                            except:
-                                pass
+            # Split SQL into individual statements (parsed once per distinct script)
+            statements = parse_sql(sql)
+
+            # Scripts whose writes all target tables they recreate can be restarted
+            restartable = is_restartable_script(statements)
+            row_counts: Dict[int, int] = {}
+            attempt = 0
+            start = 0
+
+            while True:
+                current = start
+                try:
+                    with self.pool.cursor() as (cursor, pooled):
+                        # Replay session statements that preceded the retry point
+                        for stmt in statements[:start]:
+                            if is_session_statement(stmt):
+                                cursor.execute(stmt.text)
+                                self.pool.track_context(pooled, stmt.text)
+
+                        for index in range(start, len(statements)):
+                            current = index
+                            with self.report.timed(
+                                "statement", description, index=index + 1, keyword=statements[index].keyword
+                            ) as event:
+                                row_counts[index] = event["rows"] = self._execute_statement(
+                                    cursor, pooled, index, statements[index], description
+                                )
+                    break
+                except Exception as e:
+                    if not self.retry_policy.should_retry(e, attempt):
+                        raise
+                    if is_idempotent_statement(statements[current]):
+                        start = current
+                    elif restartable:
+                        start = 0
+                        row_counts.clear()
+                    else:
+                        raise
+                    attempt += 1
+                    self.retry_policy.wait(attempt, e, description)
+
+            total_rows = sum(row_counts.values())
+            if table_rows is not None:
+                table_rows.update(rebuilt_table_rows(statements, row_counts))
 
             return True, total_rows if total_rows > 0 else None, "Executed successfully"
 
@@ -182,7 +825,9 @@ class DatabricksExecutor:
             error_msg = str(e)
 
             # Handle common Databricks/Delta errors with helpful messages
-            if "DELTA_" in error_msg:
+            if self.retry_policy.is_transient(e):
+                error_msg = f"Transient error (retries exhausted): {error_msg}"
+            elif "DELTA_" in error_msg:
                 error_msg = f"Delta table error: {error_msg}"
             elif "CATALOG_NOT_FOUND" in error_msg:
                 error_msg = f"Catalog '{self.catalog}' not found: {error_msg}"
@@ -193,13 +838,114 @@ class DatabricksExecutor:
 
             return False, None, f"Error: {error_msg}"
 
+    def _execute_statement(
+        self, cursor, pooled: PooledConnection, index: int, stmt: SqlStatement, description: str = ""
+    ) -> int:
+        """Execute one statement of a script; returns rows affected (0 if unknown)"""
+        rows = 0
+
+        # Handle different statement types
+        if stmt.kind == "context":
+            # Execute context-setting statements
+            cursor.execute(stmt.text)
+            self.pool.track_context(pooled, stmt.text)
+        elif stmt.kind == "config":
+            # Execute configuration statements
+            cursor.execute(stmt.text)
+            self.pool.track_context(pooled, stmt.text)
+        else:
+            # Execute main statement
+            result = cursor.execute(stmt.text)
+
+            # Try to get row count (may not be available for all operations)
+            try:
+                rows += self.count_result_rows(result, stmt, description)
+            except Exception:
+                # Row count not available for this operation type
+                pass
+
+        return rows
+
+    def count_result_rows(self, cursor, stmt: SqlStatement, description: str = "") -> int:
+        """
+        Row count of an executed statement, taken from statement metadata when
+        available. Other result sets are streamed in batches and counted up to
+        max_result_rows so an unexpected large SELECT is never held in memory.
+        """
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            return cursor.rowcount
+
+        if not cursor.description:
+            return 0
+
+        # DML and CTAS report affected rows as a one-row result
+        columns = [column[0].lower() for column in cursor.description]
+        if "num_affected_rows" in columns:
+            row = cursor.fetchone()
+            return int(row[columns.index("num_affected_rows")] or 0) if row else 0
+
+        counted = 0
+        for batch_rows in iter_result_batch_sizes(cursor, self.result_batch_size):
+            counted += batch_rows
+            if counted >= self.max_result_rows:
+                break
+        else:
+            return counted
+
+        if self.count_large_results and stmt.keyword in ("SELECT", "WITH"):
+            # Count server-side instead of fetching the rest of the result
+            # The closing parenthesis gets its own line: stmt.text may end in a -- comment
+            count_sql = f"SELECT COUNT(*) FROM (\n{stmt.text.rstrip().rstrip(';')}\n) result_rows"
+            row = cursor.execute(count_sql).fetchone()
+            return int(row[0]) if row else counted
+
+        print(
+            f"[yellow]⚠[/yellow] {description}: statement {stmt.keyword} returned more than "
+            f"{self.max_result_rows:,} rows; stopped reading its result"
+        )
+        return counted
+
+    def get_loop_updated_count(self, iteration: int) -> Optional[int]:
+        """
+        Read the number of leaders re-pointed by an iteration from the loop stats table
+        Returns None if the iteration did not record stats
+        """
+        stats_table = f"{self.catalog}.{self.schema}.{self.table_prefix}_unify_loop_stats"
+        stats_sql = f"SELECT updated_count FROM {stats_table} WHERE iteration = {iteration}"
+
+        def run_lookup():
+            with self.pool.cursor() as (cursor, _):
+                return cursor.execute(stats_sql).fetchone()
+
+        try:
+            row = self.retry_policy.call(run_lookup, "loop stats lookup")
+        except Exception:
+            row = None
+
+        if not row or row[0] is None:
+            print(f"[yellow]⚠[/yellow] No loop stats for iteration {iteration}, comparing full tables")
+            return None
+        return int(row[0])
+
     def check_unify_loop_convergence(
-        self, prev_table: str, curr_table: str
-    ) -> Tuple[int, bool]:
+        self, prev_table: str, curr_table: str, iteration: Optional[int] = None
+    ) -> Tuple[Optional[int], bool]:
         """
         Check if unify loop has converged
-        Returns: (updated_count, should_continue)
+        Returns: (updated_count, should_continue); updated_count is None when
+        convergence could not be determined, which must never count as converged
         """
+        # Generated iterations record their leader changes; use that when available
+        if iteration is not None:
+            updated_count = self.get_loop_updated_count(iteration)
+            if updated_count is not None:
+                return updated_count, updated_count > 0
+
+        if prev_table == curr_table:
+            # Updated in place (frontier mode): there is no previous table to compare against
+            print(f"[red]✗[/red] Cannot check convergence of {curr_table} without loop stats")
+            return None, False
+
         try:
             # Format table names with catalog and schema
             prev_full_table = f"{self.catalog}.{self.schema}.{prev_table}"
@@ -215,8 +961,11 @@ class DatabricksExecutor:
             ) diff
             """
 
-            result = self.cursor.execute(check_sql)
-            row = result.fetchone()
+            def run_check():
+                with self.pool.cursor() as (cursor, _):
+                    return cursor.execute(check_sql).fetchone()
+
+            row = self.retry_policy.call(run_check, "convergence check")
             updated_count = row[0] if row else 0
 
             should_continue = updated_count > 0
@@ -224,7 +973,7 @@ class DatabricksExecutor:
 
         except Exception as e:
             print(f"[red]✗[/red] Error checking convergence: {e}")
-            return 0, False
+            return None, False
 
     def optimize_delta_table(self, table_name: str) -> bool:
         """
@@ -235,71 +984,232 @@ class DatabricksExecutor:
             optimize_sql = f"OPTIMIZE {full_table_name}"
 
             print(f"[cyan]•[/cyan] Optimizing Delta table: {table_name}")
-            self.cursor.execute(optimize_sql)
+            def run_optimize():
+                with self.pool.cursor() as (cursor, _):
+                    cursor.execute(optimize_sql)
+
+            with self.report.timed("optimize", table_name):
+                self.retry_policy.call(run_optimize, f"OPTIMIZE {table_name}")
             return True
 
         except Exception as e:
             print(f"[yellow]⚠[/yellow] Failed to optimize {table_name}: {e}")
             return False
 
-    def get_table_info(self, table_name: str) -> Optional[dict]:
+    def get_table_detail(self, table_name: str) -> Optional[dict]:
+        """DESCRIBE DETAIL of a Delta table as a column name -> value dict"""
+        full_table_name = f"{self.catalog}.{self.schema}.{table_name}"
+
+        def run_describe():
+            with self.pool.cursor() as (cursor, _):
+                cursor.execute(f"DESCRIBE DETAIL {full_table_name}")
+                row = cursor.fetchone()
+                columns = [column[0] for column in cursor.description or []]
+            return dict(zip(columns, row)) if row else None
+
+        try:
+            return self.retry_policy.call(run_describe, f"DESCRIBE DETAIL {table_name}")
+        except Exception as e:
+            print(f"[yellow]⚠[/yellow] Could not describe {table_name}: {e}")
+            return None
+
+    def table_exists(self, table_name: str) -> bool:
+        """Whether a table exists in the executor's schema"""
+
+        def run_show():
+            with self.pool.cursor() as (cursor, _):
+                cursor.execute(f"SHOW TABLES IN {self.catalog}.{self.schema} LIKE '{table_name}'")
+                return cursor.fetchone() is not None
+
+        return self.retry_policy.call(run_show, f"SHOW TABLES {table_name}")
+
+    def maybe_optimize(self, table_name: str) -> bool:
         """
-        Get basic information about a Delta table
+        Run OPTIMIZE on a table when the optimize policy finds it fragmented
+        Runs on a separate pooled connection when background optimization is enabled
         """
-        try:
+        policy = self.optimize_policy
+        if policy.mode == "off":
+            return False
+
+        self.wait_for_optimize(table_name)
+        detail = self.get_table_detail(table_name) if policy.mode == "auto" else None
+        should_optimize, reason = policy.should_optimize(detail)
+        if not should_optimize:
+            print(f"[cyan]•[/cyan] Skipping OPTIMIZE of {table_name} ({reason})")
+            return False
+
+        if policy.background:
+            print(f"[cyan]•[/cyan] OPTIMIZE of {table_name} queued in the background ({reason})")
+            with self._optimize_lock:
+                if self._optimize_worker is None:
+                    self._optimize_worker = ThreadPoolExecutor(
+                        max_workers=1, thread_name_prefix="optimize"
+                    )
+                self._pending_optimize[table_name.lower()] = self._optimize_worker.submit(
+                    self.optimize_delta_table, table_name
+                )
+            return True
+
+        print(f"[cyan]•[/cyan] {table_name}: {reason}")
+        return self.optimize_delta_table(table_name)
+
+    def wait_for_optimize(self, table_name: Optional[str] = None):
+        """Wait for background OPTIMIZE of one table (or all tables) before it is written again"""
+        with self._optimize_lock:
+            if table_name is None:
+                futures = list(self._pending_optimize.values())
+                self._pending_optimize.clear()
+            else:
+                futures = [self._pending_optimize.pop(table_name.lower(), None)]
+        for future in futures:
+            if future is not None:
+                future.result()
+
+    def get_table_info(self, table_name: str, exact: bool = False) -> Optional[dict]:
+        """
+        Row count and size of a Delta table from metadata, cached for the run
+        An exact COUNT(*) only runs when exact=True
+        """
+        key = normalize_table_name(table_name)
+        with self._table_info_lock:
+            info = self._table_info.get(key)
+        if info is not None and (info["exact"] or not exact):
+            return info
+
+        detail = self.get_table_detail(table_name)
+        if detail is None:
+            return None
+
+        info = {
+            "row_count": self.get_written_row_count(table_name),
+            "size_bytes": detail.get("sizeInBytes"),
+            "num_files": detail.get("numFiles"),
+            "table_format": detail.get("format", "unknown"),
+            "location": detail.get("location", "unknown"),
+            "exact": False,
+        }
+        if exact:
             full_table_name = f"{self.catalog}.{self.schema}.{table_name}"
 
-            # Get row count
-            count_result = self.cursor.execute(
-                f"SELECT COUNT(*) FROM {full_table_name}"
-            )
-            row_count = count_result.fetchone()[0] if count_result else 0
+            def run_count():
+                with self.pool.cursor() as (cursor, _):
+                    return cursor.execute(f"SELECT COUNT(*) FROM {full_table_name}").fetchone()
 
-            # Get table info (Delta-specific)
-            info_result = self.cursor.execute(f"DESCRIBE DETAIL {full_table_name}")
-            detail = info_result.fetchone() if info_result else None
+            try:
+                row = self.retry_policy.call(run_count, f"COUNT(*) {table_name}")
+                info.update(row_count=int(row[0]) if row else 0, exact=True)
+            except Exception as e:
+                print(f"[yellow]⚠[/yellow] Could not count rows of {table_name}: {e}")
 
-            return {
-                "row_count": row_count,
-                "table_format": detail[3] if detail and len(detail) > 3 else "unknown",
-                "location": detail[8] if detail and len(detail) > 8 else "unknown",
-            }
+        with self._table_info_lock:
+            self._table_info[key] = info
+        self.report.tables[key] = info
+        return info
 
-        except Exception as e:
-            print(f"[yellow]⚠[/yellow] Could not get table info for {table_name}: {e}")
+    def get_written_row_count(self, table_name: str) -> Optional[int]:
+        """
+        Rows written by the last full rewrite of a table (CTAS / CREATE OR REPLACE),
+        read from the Delta history; None if the last operation was not a full rewrite
+        """
+        full_table_name = f"{self.catalog}.{self.schema}.{table_name}"
+
+        def run_history():
+            with self.pool.cursor() as (cursor, _):
+                cursor.execute(f"DESCRIBE HISTORY {full_table_name} LIMIT 1")
+                row = cursor.fetchone()
+                columns = [column[0] for column in cursor.description or []]
+            return dict(zip(columns, row)) if row else {}
+
+        try:
+            history = self.retry_policy.call(run_history, f"DESCRIBE HISTORY {table_name}")
+        except Exception:
             return None
 
+        if history.get("operation") not in FULL_REWRITE_OPERATIONS:
+            return None
+        # MAP columns arrive as a dict or as a list of key/value pairs
+        metrics = dict(history.get("operationMetrics") or {})
+        rows = metrics.get("numOutputRows")
+        return int(rows) if rows is not None else None
+
+    def invalidate_table_info(self, *table_names: str):
+        """Drop cached table info of tables that are about to be rewritten"""
+        with self._table_info_lock:
+            for table_name in table_names:
+                self._table_info.pop(normalize_table_name(table_name), None)
+
+
+class UnifyLoopError(Exception):
+    """The unify loop stopped in a state that must not be canonicalized"""
+
+    def __init__(self, message: str, iterations: int):
+        super().__init__(message)
+        self.iterations = iterations
+
+
+# Loop files start with a header written by the generator, e.g. "-- unify_loop: prefix=x mode=frontier"
+LOOP_HEADER_RE = re.compile(r"^--\s*unify_loop:(.*)$", re.M)
+LOOP_TEMPLATE_FILE = "unify_loop_iteration.sql.tmpl"
+LOOP_SCRIPT_FILE = "04_unify_loop_script.sql"
+LOOP_HISTORY_FILE = "unify_loop_history.json"
+LOOP_HISTORY_RUNS = 20
+WARM_START_HEADER_RE = re.compile(r"^--\s*warm_start:\s*fingerprint=(\w+)", re.M)
+
+
+def read_loop_header(sql: str) -> Dict[str, str]:
+    """Parse the key=value pairs of a loop file header (empty for files without one)"""
+    match = LOOP_HEADER_RE.search(sql)
+    if not match:
+        return {}
+    return dict(pair.split("=", 1) for pair in match.group(1).split() if "=" in pair)
 
-def generate_iteration_sql(executor: DatabricksExecutor, iteration: int) -> str:
+
+def loop_table_name(table_prefix: str, iteration: int, loop_tables: str = "per-iteration") -> str:
+    """Graph table written by a loop iteration (iteration 0 is the extracted graph)"""
+    if loop_tables == "ping-pong" and iteration > 0:
+        return f"{table_prefix}_graph_unify_loop_{'ping' if iteration % 2 else 'pong'}"
+    return f"{table_prefix}_graph_unify_loop_{iteration}"
+
+
+def generate_iteration_sql(
+    executor: DatabricksExecutor, iteration: int, sql_dir: Optional[pathlib.Path] = None
+) -> str:
     """Generate SQL for a unify loop iteration dynamically"""
     prev_iteration = iteration - 1
+
+    # Prefer the generator's template so extra iterations match the generated files
+    template_path = sql_dir / LOOP_TEMPLATE_FILE if sql_dir else None
+    if template_path and template_path.exists():
+        template = template_path.read_text(encoding="utf-8")
+        replacements = {
+            "{{prev_iteration}}": str(prev_iteration),
+            "{{iteration}}": str(iteration),
+            "{{prev_slot}}": "pong" if iteration % 2 else "ping",
+            "{{curr_slot}}": "ping" if iteration % 2 else "pong",
+        }
+        for token, value in replacements.items():
+            template = template.replace(token, value)
+        return template
+
     table_prefix = executor.table_prefix
     catalog = executor.catalog
     schema = executor.schema
-    
-    return f"""
-USE CATALOG {catalog};
-USE SCHEMA {schema};
-
-CREATE OR REPLACE TABLE {catalog}.{schema}.{table_prefix}_graph_unify_loop_{iteration} (
-    follower_id STRING,
-    follower_ns BIGINT,
-    leader_id STRING,
-    leader_ns BIGINT,
-    follower_first_seen_at BIGINT,
-    follower_last_seen_at BIGINT,
-    follower_source_table_ids ARRAY<BIGINT>,
-    follower_last_processed_at BIGINT
-) USING DELTA
-;
+    prev_table = f"{catalog}.{schema}.{table_prefix}_graph_unify_loop_{prev_iteration}"
+    curr_table = f"{catalog}.{schema}.{table_prefix}_graph_unify_loop_{iteration}"
+    diff_table = f"{catalog}.{schema}.{table_prefix}_unify_loop_leader_diff"
+    stats_table = f"{catalog}.{schema}.{table_prefix}_unify_loop_stats"
+    priority_case_sql = """CASE leader_ns 
+                WHEN 1 THEN 1 WHEN 2 THEN 2 WHEN 3 THEN 3 
+                ELSE leader_ns 
+            END"""
 
-INSERT INTO {catalog}.{schema}.{table_prefix}_graph_unify_loop_{iteration}
-WITH prev_table_with_leader_leader AS (
+    leader_leader_cte = f"""WITH prev_table_with_leader_leader AS (
     SELECT
         follower_id, follower_ns, leader_id, leader_ns,
         follower_first_seen_at, follower_last_seen_at,
         follower_source_table_ids, follower_last_processed_at
-    FROM {catalog}.{schema}.{table_prefix}_graph_unify_loop_{prev_iteration}
+    FROM {prev_table}
     
     UNION ALL
     
@@ -309,18 +1219,67 @@ WITH prev_table_with_leader_leader AS (
         follower_first_seen_at, follower_last_seen_at,
         follower_source_table_ids, follower_last_processed_at
     FROM (
-        SELECT DISTINCT leader_id, leader_ns FROM {catalog}.{schema}.{table_prefix}_graph_unify_loop_{prev_iteration}
+        SELECT DISTINCT leader_id, leader_ns FROM {prev_table}
     ) prev_leaders
     INNER JOIN (
         SELECT
             follower_id, follower_ns,
             follower_first_seen_at, follower_last_seen_at,
             follower_source_table_ids, follower_last_processed_at
-        FROM {catalog}.{schema}.{table_prefix}_graph_unify_loop_{prev_iteration}
+        FROM {prev_table}
     ) prev_followers
     ON prev_leaders.leader_id = prev_followers.follower_id 
     AND prev_leaders.leader_ns = prev_followers.follower_ns
-)
+)"""
+
+    return f"""USE CATALOG {catalog};
+USE SCHEMA {schema};
+
+-- Leaders re-pointed in this iteration (its row count drives convergence)
+CREATE OR REPLACE TABLE {diff_table}
+USING DELTA
+AS
+{leader_leader_cte}
+SELECT DISTINCT
+    older_leader.ns_prio as older_leader_ns,
+    older_leader.id as older_leader_id,
+    newer_leader.ns_prio as newer_leader_ns,
+    newer_leader.id as newer_leader_id
+FROM (
+    SELECT
+        older_leader,
+        MIN(newer_leader) as newer_leader
+    FROM (
+        SELECT
+            leader as older_leader,
+            MIN(leader) OVER (PARTITION BY follower_id, follower_ns) as newer_leader
+        FROM (
+            SELECT
+                follower_id, follower_ns,
+                STRUCT(
+                    {priority_case_sql} AS ns_prio, 
+                    leader_id AS id
+                ) as leader
+            FROM prev_table_with_leader_leader
+        ) rs
+    ) wsrs
+    WHERE older_leader > newer_leader
+    GROUP BY older_leader
+) diffrs;
+
+CREATE OR REPLACE TABLE {curr_table} (
+    follower_id STRING,
+    follower_ns BIGINT,
+    leader_id STRING,
+    leader_ns BIGINT,
+    follower_first_seen_at BIGINT,
+    follower_last_seen_at BIGINT,
+    follower_source_table_ids ARRAY<BIGINT>,
+    follower_last_processed_at BIGINT
+) USING DELTA;
+
+INSERT INTO {curr_table}
+{leader_leader_cte}
 SELECT
     follower_id, follower_ns, leader_id, leader_ns,
     MIN(follower_first_seen_at) as follower_first_seen_at,
@@ -339,41 +1298,17 @@ FROM (
              ELSE UNIX_TIMESTAMP() 
         END as follower_last_processed_at
     FROM prev_table_with_leader_leader prev
-    LEFT JOIN (
-        SELECT DISTINCT
-            older_leader.ns_prio as older_leader_ns,
-            older_leader.id as older_leader_id,
-            newer_leader.ns_prio as newer_leader_ns,
-            newer_leader.id as newer_leader_id
-        FROM (
-            SELECT
-                older_leader,
-                MIN(newer_leader) as newer_leader
-            FROM (
-                SELECT
-                    leader as older_leader,
-                    MIN(leader) OVER (PARTITION BY follower_id, follower_ns) as newer_leader
-                FROM (
-                    SELECT
-                        follower_id, follower_ns,
-                        STRUCT(
-                            CASE leader_ns 
-                WHEN 1 THEN 1 WHEN 2 THEN 2 WHEN 3 THEN 3 
-                ELSE leader_ns 
-            END AS ns_prio, 
-                            leader_id AS id
-                        ) as leader
-                    FROM prev_table_with_leader_leader
-                ) rs
-            ) wsrs
-            WHERE older_leader > newer_leader
-            GROUP BY older_leader
-        ) diffrs
-    ) diff
+    LEFT JOIN {diff_table} diff
     ON prev.leader_id = diff.older_leader_id AND prev.leader_ns = diff.older_leader_ns
 ) lp
 GROUP BY follower_id, follower_ns, leader_id, leader_ns;
-"""
+
+-- Record iteration stats (read by the executor instead of an EXCEPT scan)
+DELETE FROM {stats_table} WHERE iteration = {iteration};
+
+INSERT INTO {stats_table}
+SELECT {iteration} as iteration, COUNT(*) as updated_count, UNIX_TIMESTAMP() as time
+FROM {diff_table};"""
 
 
 def get_sql_files(sql_dir: pathlib.Path) -> List[Tuple[str, pathlib.Path]]:
@@ -397,7 +1332,308 @@ def get_sql_files(sql_dir: pathlib.Path) -> List[Tuple[str, pathlib.Path]]:
     return files
 
 
-def execute_unify_loop(executor: DatabricksExecutor, sql_dir: pathlib.Path, max_iterations: int = 30) -> int:
+# Table references used to derive step dependencies
+TABLE_NAME_RE = r"([\w.`]+)"
+TABLE_WRITE_PATTERNS = [
+    re.compile(r"\bCREATE\s+(?:OR\s+REPLACE\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?" + TABLE_NAME_RE, re.I),
+    re.compile(r"\bINSERT\s+(?:INTO|OVERWRITE)\s+(?:TABLE\s+)?" + TABLE_NAME_RE, re.I),
+    re.compile(r"\bMERGE\s+INTO\s+" + TABLE_NAME_RE, re.I),
+    re.compile(r"\bUPDATE\s+" + TABLE_NAME_RE + r"\s+SET\b", re.I),
+    re.compile(r"\bDELETE\s+FROM\s+" + TABLE_NAME_RE, re.I),
+    re.compile(r"\bDROP\s+TABLE\s+(?:IF\s+EXISTS\s+)?" + TABLE_NAME_RE, re.I),
+    re.compile(r"\bALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?" + TABLE_NAME_RE, re.I),
+    re.compile(r"\bRENAME\s+TO\s+" + TABLE_NAME_RE, re.I),
+    re.compile(r"\bOPTIMIZE\s+" + TABLE_NAME_RE, re.I),
+]
+TABLE_READ_PATTERN = re.compile(r"\b(?:FROM|JOIN|USING|CLONE)\s+" + TABLE_NAME_RE, re.I)
+NON_TABLE_WORDS = {"values", "delta", "lateral", "select", "table", "identifier"}
+
+
+def normalize_table_name(name: str) -> str:
+    """Reduce catalog.schema.table (optionally quoted) to a lowercase table name"""
+    return name.replace("`", "").split(".")[-1].lower()
+
+
+def extract_table_refs(sql: str) -> Tuple[Set[str], Set[str]]:
+    """
+    Find the tables a SQL script reads and writes
+    Returns: (reads, writes)
+    """
+    # Match against code only so table names in comments are ignored
+    sql = " ".join(stmt.code for stmt in parse_sql(sql))
+
+    writes = set()
+    for pattern in TABLE_WRITE_PATTERNS:
+        for match in pattern.finditer(sql):
+            writes.add(normalize_table_name(match.group(1)))
+
+    reads = set()
+    for match in TABLE_READ_PATTERN.finditer(sql):
+        reads.add(normalize_table_name(match.group(1)))
+
+    writes -= NON_TABLE_WORDS
+    reads -= NON_TABLE_WORDS | writes
+    return reads, writes
+
+
+class ExecutionStep:
+    """A single node of the execution plan: one SQL file or the unify loop"""
+
+    def __init__(self, name: str, kind: str, file_path: Optional[pathlib.Path] = None):
+        self.name = name
+        self.kind = kind  # "file" or "loop"
+        self.file_path = file_path
+        self.reads: Set[str] = set()
+        self.writes: Set[str] = set()
+        self.deps: Set[str] = set()
+        self.downstream_reads: Set[str] = set()  # written here, read by a later step
+
+
+def build_execution_plan(
+    sql_files: List[Tuple[str, pathlib.Path]], table_prefix: str, skip_loop: bool = False
+) -> List[ExecutionStep]:
+    """
+    Build the step dependency graph from step names and the tables each step reads/writes.
+    Loop iteration files are folded into a single "unify loop" step placed before canonicalization.
+    """
+    steps: List[ExecutionStep] = []
+    loop_step = None
+
+    for order_name, file_path in sql_files:
+        if ("loop_iteration" in order_name or "loop_script" in order_name) and not skip_loop:
+            if loop_step is None:
+                loop_step = ExecutionStep("04_unify_loop", "loop")
+            reads, writes = extract_table_refs(file_path.read_text(encoding="utf-8"))
+            loop_step.reads |= reads
+            loop_step.writes |= writes
+            continue
+
+        # Unify loop runs right before canonicalization
+        if "canonicalize" in order_name and loop_step is not None and loop_step not in steps:
+            steps.append(loop_step)
+
+        step = ExecutionStep(order_name, "file", file_path)
+        step.reads, step.writes = extract_table_refs(file_path.read_text(encoding="utf-8"))
+        steps.append(step)
+
+    # No canonicalize step: unify loop runs last (fallback)
+    if loop_step is not None and loop_step not in steps:
+        steps.append(loop_step)
+
+    if loop_step is not None:
+        loop_step.writes.add(f"{table_prefix}_graph_unify_loop_final".lower())
+        loop_step.reads -= loop_step.writes
+
+    for idx, step in enumerate(steps):
+        for earlier in steps[:idx]:
+            # Unordered files and steps without detectable tables act as barriers
+            barrier = (
+                step.name.startswith("99_")
+                or not (step.reads or step.writes)
+                or not (earlier.reads or earlier.writes)
+            )
+            conflict = (
+                earlier.writes & (step.reads | step.writes)
+                or earlier.reads & step.writes
+            )
+            if barrier or conflict:
+                step.deps.add(earlier.name)
+
+    # Tables read by a later step before anything rewrites them
+    for idx, step in enumerate(steps):
+        unread = set(step.writes)
+        for later in steps[idx + 1:]:
+            step.downstream_reads |= unread & later.reads
+            unread -= later.writes
+
+    return steps
+
+
+def content_hash(*texts: str) -> str:
+    """sha256 over one or more SQL texts"""
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class RunState:
+    """
+    Thread-safe run-state file kept in the SQL directory. Records completed
+    steps (with content hashes) and unify loop progress so an interrupted
+    run can be resumed with --resume.
+    """
+
+    def __init__(self, path: pathlib.Path, fresh: bool = False):
+        self.path = path
+        self._lock = threading.Lock()
+        self._state = {"steps": {}, "loop": {}}
+        if fresh:
+            self._save()
+        elif path.exists():
+            try:
+                self._state.update(json.loads(path.read_text(encoding="utf-8")))
+            except Exception as e:
+                print(f"[yellow]⚠[/yellow] Ignoring unreadable run state {path}: {e}")
+
+    def is_step_complete(self, name: str, step_hash: str) -> bool:
+        with self._lock:
+            entry = self._state["steps"].get(name)
+        return bool(entry) and entry.get("hash") == step_hash
+
+    def mark_step_complete(self, name: str, step_hash: str):
+        with self._lock:
+            self._state["steps"][name] = {"hash": step_hash, "completed_at": time.time()}
+            self._save()
+
+    def invalidate_step(self, name: str):
+        with self._lock:
+            if self._state["steps"].pop(name, None) is not None:
+                self._save()
+
+    def loop_progress(self, loop_hash: str) -> Optional[dict]:
+        """Last finished loop iteration recorded for the same loop SQL, if any"""
+        with self._lock:
+            loop = dict(self._state["loop"])
+        if loop.get("hash") == loop_hash and loop.get("iteration"):
+            return loop
+        return None
+
+    def start_loop(self, loop_hash: str):
+        with self._lock:
+            self._state["loop"] = {"hash": loop_hash}
+            self._save()
+
+    def record_loop_iteration(self, iteration: int, table: str, converged: bool):
+        with self._lock:
+            self._state["loop"].update(
+                {"iteration": iteration, "table": table, "converged": converged}
+            )
+            self._save()
+
+    def finish_loop(self):
+        """Mark the loop finished (final table created)"""
+        with self._lock:
+            self._state["loop"]["finished"] = True
+            self._save()
+
+    def is_loop_finished(self, loop_hash: str) -> bool:
+        with self._lock:
+            loop = self._state["loop"]
+            return loop.get("hash") == loop_hash and loop.get("finished", False)
+
+    def _save(self):
+        # Write atomically so an interrupted run never leaves a truncated file
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(self._state, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+def step_content_hash(step: ExecutionStep, sql_dir: pathlib.Path, table_prefix: str) -> str:
+    """Hash of the SQL a step would run (all iteration files for the unify loop)"""
+    if step.kind == "loop":
+        loop_files = sorted(sql_dir.glob("04_*iter*.sql"))
+        return content_hash(table_prefix, *(f.read_text(encoding="utf-8") for f in loop_files))
+    return content_hash(step.file_path.read_text(encoding="utf-8"))
+
+
+def server_loop_results(rows: List[tuple], started_at: float) -> List[Tuple[int, int, Optional[float]]]:
+    """
+    (iteration, updated_count, seconds) from the rows a server-side loop returns;
+    durations come from the epoch second each iteration's stats row was written
+    """
+    results = []
+    previous = started_at
+    for row in rows:
+        seconds = None
+        # Loops generated before the stats time was returned only have two columns
+        if len(row) > 2 and row[2] is not None:
+            seconds = round(max(0.0, float(row[2]) - previous), 3)
+            previous = float(row[2])
+        results.append((int(row[0]), int(row[1]), seconds))
+    return results
+
+
+def poll_loop_progress(
+    executor: DatabricksExecutor, start_iteration: int, seen: Set[int], stop: threading.Event
+):
+    """Print iterations recorded in the loop stats table while the loop script runs"""
+    stats_table = f"{executor.catalog}.{executor.schema}.{executor.table_prefix}_unify_loop_stats"
+    progress_sql = (
+        f"SELECT iteration, updated_count FROM {stats_table} "
+        f"WHERE iteration >= {start_iteration} ORDER BY iteration"
+    )
+    while not stop.wait(executor.loop_progress_interval):
+        try:
+            with executor.pool.cursor() as (cursor, _):
+                rows = cursor.execute(progress_sql).fetchall()
+        except Exception:
+            # Progress is best effort; the script result is authoritative
+            continue
+        for iteration, updated in rows:
+            if iteration not in seen:
+                seen.add(iteration)
+                print(f"[cyan]•[/cyan] Iteration {iteration} completed, updated records: {updated}")
+
+
+def run_unify_loop_script(
+    executor: DatabricksExecutor,
+    script_file: pathlib.Path,
+    start_iteration: int,
+    max_iterations: int,
+) -> Optional[List[Tuple[int, int, Optional[float]]]]:
+    """
+    Submit the generated SQL scripting block that runs the remaining iterations
+    in one statement, printing progress from the loop stats table meanwhile
+    Returns: [(iteration, updated_count, seconds)] for the iterations it ran, None on failure
+    """
+    script_sql = (
+        script_file.read_text(encoding="utf-8")
+        .replace("{{start_iteration}}", str(start_iteration))
+        .replace("{{max_iterations}}", str(max_iterations))
+    )
+    print(f"[cyan]•[/cyan] Running iterations {start_iteration}-{max_iterations} as one SQL script")
+
+    def run_script():
+        with executor.pool.cursor() as (cursor, _):
+            cursor.execute(script_sql)
+            return [tuple(row) for row in cursor.fetchall()]
+
+    seen: Set[int] = set()
+    stop = threading.Event()
+    poller = threading.Thread(
+        target=poll_loop_progress, args=(executor, start_iteration, seen, stop), daemon=True
+    )
+    poller.start()
+    try:
+        with executor.report.timed("script", script_file.stem) as event:
+            rows = executor.retry_policy.call(run_script, "unify loop script")
+            results = server_loop_results(rows, event["started_at"])
+            event["iterations"] = [
+                {"iteration": iteration, "updated_count": updated, "seconds": seconds}
+                for iteration, updated, seconds in results
+            ]
+    except Exception as e:
+        print(f"[red]✗[/red] Unify loop script failed: {e}")
+        return None
+    finally:
+        stop.set()
+        poller.join()
+
+    for iteration, updated, _ in results:
+        if iteration not in seen:
+            print(f"[cyan]•[/cyan] Iteration {iteration} completed, updated records: {updated}")
+    return results
+
+
+def execute_unify_loop(
+    executor: DatabricksExecutor,
+    sql_dir: pathlib.Path,
+    max_iterations: int = 30,
+    run_state: Optional[RunState] = None,
+    resume: bool = False,
+) -> int:
     """Execute unify loop with convergence checking - continues beyond available files if needed"""
     loop_files = sorted(sql_dir.glob("04_*iter*.sql"))
     print(
@@ -409,13 +1645,70 @@ def execute_unify_loop(executor: DatabricksExecutor, sql_dir: pathlib.Path, max_
         print("[yellow]No loop iteration files found[/yellow]")
         return 0
 
+    # Frontier mode updates the final graph table in place instead of one table per iteration
+    loop_header = read_loop_header(loop_files[0].read_text(encoding="utf-8"))
+    loop_mode = loop_header.get("mode", "full")
+    loop_tables = loop_header.get("tables", "per-iteration")
+    final_graph_table = f"{executor.table_prefix}_graph_unify_loop_final"
+    if loop_mode == "frontier":
+        print(f"[cyan]•[/cyan] Frontier mode: iterations update {final_graph_table} in place")
+
     prev_table = f"{executor.table_prefix}_graph_unify_loop_0"
     executed_count = 0
     final_iteration = 0
-    
-    # Continue iterating until convergence or max_iterations reached
+    converged = False
     iteration = 1
-    while iteration <= max_iterations:
+    runner = "client"
+    loop_history: List[dict] = []
+
+    # Pick up after the last finished iteration of an interrupted run
+    loop_hash = content_hash(executor.table_prefix, *(f.read_text(encoding="utf-8") for f in loop_files))
+    progress = run_state.loop_progress(loop_hash) if run_state and resume else None
+    if progress:
+        final_iteration = progress["iteration"]
+        prev_table = progress["table"]
+        converged = progress.get("converged", False)
+        iteration = final_iteration + 1
+        print(f"[cyan]•[/cyan] Resuming after iteration {final_iteration} ({prev_table})")
+    elif run_state:
+        run_state.start_loop(loop_hash)
+
+    # The generated script runs the iterate/check/stop loop server-side in one submission
+    script_file = sql_dir / LOOP_SCRIPT_FILE
+    if (
+        loop_header.get("runner") == "script"
+        and not executor.client_loop
+        and script_file.exists()
+        and not converged
+        and iteration <= max_iterations
+    ):
+        # The script rewrites the loop tables; no background OPTIMIZE may still be running
+        executor.wait_for_optimize()
+        results = run_unify_loop_script(executor, script_file, iteration, max_iterations)
+        if results is None:
+            return executed_count
+
+        runner = loop_header["runner"]
+        for done_iteration, updated, seconds in results:
+            if loop_mode == "frontier":
+                curr_table = final_graph_table
+            else:
+                curr_table = loop_table_name(executor.table_prefix, done_iteration, loop_tables)
+            if run_state:
+                run_state.record_loop_iteration(done_iteration, curr_table, updated == 0)
+            loop_history.append(
+                {"iteration": done_iteration, "updated_count": updated, "seconds": seconds}
+            )
+            executed_count += 1
+            final_iteration = done_iteration
+            converged = updated == 0
+
+        iteration = final_iteration + 1
+        if converged:
+            print(f"[green]✓[/green] Loop converged after {final_iteration} iterations")
+
+    # Continue iterating until convergence or max_iterations reached
+    while iteration <= max_iterations and not converged:
         print(f"\n[yellow]--- Iteration {iteration} ---[/yellow]")
         
         # Use file if available, otherwise generate SQL dynamically
@@ -424,13 +1717,24 @@ def execute_unify_loop(executor: DatabricksExecutor, sql_dir: pathlib.Path, max_
             sql = file_path.read_text()
             source_desc = f"file: {file_path.name}"
         else:
-            sql = generate_iteration_sql(executor, iteration)
+            sql = generate_iteration_sql(executor, iteration, sql_dir)
             source_desc = f"dynamically generated iteration {iteration}"
         
         print(f"[cyan]•[/cyan] Using {source_desc}")
 
+        # A background OPTIMIZE must not race this iteration's writes
+        if loop_mode == "frontier":
+            executor.wait_for_optimize(final_graph_table)
+        else:
+            executor.wait_for_optimize(loop_table_name(executor.table_prefix, iteration, loop_tables))
+
         # Execute the iteration
-        ok, rows, msg = executor.execute_sql(sql, f"iteration_{iteration}")
+        table_rows: Dict[str, int] = {}
+        with executor.report.timed(
+            "iteration", f"iteration_{iteration}", iteration=iteration
+        ) as iteration_event:
+            ok, rows, msg = executor.execute_sql(sql, f"iteration_{iteration}", table_rows)
+            iteration_event.update(success=ok, rows=rows)
         if not ok:
             print(f"[red]✗[/red] {msg}")
             return executed_count
@@ -443,14 +1747,39 @@ def execute_unify_loop(executor: DatabricksExecutor, sql_dir: pathlib.Path, max_
             print(f"[cyan]•[/cyan] Rows processed: {rows}")
 
         # Check convergence after EVERY iteration (including first)
-        curr_table = f"{executor.table_prefix}_graph_unify_loop_{iteration}"
-        updated, cont = executor.check_unify_loop_convergence(prev_table, curr_table)
+        if loop_mode == "frontier":
+            curr_table = final_graph_table
+        else:
+            curr_table = loop_table_name(executor.table_prefix, iteration, loop_tables)
+        with executor.report.timed("convergence_check", curr_table, iteration=iteration) as event:
+            updated, cont = executor.check_unify_loop_convergence(prev_table, curr_table, iteration)
+            event["updated_count"] = iteration_event["updated_count"] = updated
+        if updated is None:
+            raise UnifyLoopError(
+                f"could not determine whether iteration {iteration} converged", executed_count
+            )
         print(f"[cyan]•[/cyan] Updated records: {updated}")
+        loop_history.append(
+            {"iteration": iteration, "updated_count": updated, "seconds": iteration_event["seconds"]}
+        )
+
+        # The graph table was rewritten by this iteration; its size comes from the rows the
+        # iteration inserted, so no metadata query runs on the loop's critical path
+        executor.invalidate_table_info(curr_table)
+        graph_rows = table_rows.get(normalize_table_name(curr_table))
+        if graph_rows is not None:
+            iteration_event["table_rows"] = graph_rows
+            print(f"[cyan]•[/cyan] Graph table: {graph_rows:,} rows")
 
-        # Optimize the table after each iteration for better performance
-        executor.optimize_delta_table(curr_table)
+        # Only the next iteration reads this table again; the last one is promoted as is
+        if cont:
+            executor.maybe_optimize(curr_table)
+
+        if run_state:
+            run_state.record_loop_iteration(iteration, curr_table, not cont)
 
         if not cont:  # convergence reached (updated_count = 0)
+            converged = True
             print(f"[green]✓[/green] Loop converged after {iteration} iterations")
             break
 
@@ -458,13 +1787,62 @@ def execute_unify_loop(executor: DatabricksExecutor, sql_dir: pathlib.Path, max_
         iteration += 1
         time.sleep(2)  # Brief pause between iterations
     
-    if iteration > max_iterations:
+    if not converged and iteration > max_iterations:
         print(f"[yellow]⚠[/yellow] Reached maximum iterations ({max_iterations}) without convergence")
 
+    save_loop_history(executor, sql_dir, loop_header, runner, loop_history, converged)
+
+    # The final table is copied or renamed below
+    executor.wait_for_optimize()
+
     # Create alias table pointing to the final iteration for subsequent steps
-    if final_iteration > 0:
+    if final_iteration > 0 and loop_mode == "frontier":
+        # The final graph table was updated in place; nothing to copy
+        if run_state:
+            run_state.finish_loop()
+    elif final_iteration > 0 and loop_tables == "ping-pong":
+        # Promote the last working table by rename instead of copying it. A resumed run may
+        # find the rename already done, so the final table is only replaced while the
+        # working table still exists
+        final_table_name = loop_table_name(executor.table_prefix, final_iteration, loop_tables)
+        spare_table_name = loop_table_name(executor.table_prefix, final_iteration + 1, loop_tables)
+        table_path = f"{executor.catalog}.{executor.schema}"
+        try:
+            slot_exists = executor.table_exists(final_table_name)
+            final_exists = slot_exists or executor.table_exists(final_graph_table)
+            msg = f"neither {final_table_name} nor {final_graph_table} exists"
+        except Exception as e:
+            slot_exists = final_exists = False
+            msg = f"could not look up the loop tables: {e}"
+
+        if slot_exists:
+            promote_sql = f"""
+            DROP TABLE IF EXISTS {table_path}.{final_graph_table};
+            ALTER TABLE {table_path}.{final_table_name} RENAME TO {final_graph_table};
+            """
+
+            print(f"[cyan]•[/cyan] Promoting final iteration table: {final_table_name}")
+            ok, rows, msg = executor.execute_sql(promote_sql, "Promote final iteration table")
+            if ok:
+                print(f"[green]✓[/green] Table '{final_table_name}' renamed to '{final_graph_table}'")
+        elif final_exists:
+            ok = True
+            print(f"[cyan]•[/cyan] {final_table_name} was already promoted to {final_graph_table}")
+        else:
+            ok = False
+
+        if ok:
+            # Recorded before the spare working table is dropped
+            if run_state:
+                run_state.finish_loop()
+            executor.execute_sql(
+                f"DROP TABLE IF EXISTS {table_path}.{spare_table_name}", "Drop spare loop table"
+            )
+        else:
+            print(f"[yellow]⚠[/yellow] Failed to promote final iteration table: {msg}")
+    elif final_iteration > 0:
         final_table_name = f"{executor.table_prefix}_graph_unify_loop_{final_iteration}"
-        alias_table_name = f"{executor.table_prefix}_graph_unify_loop_final"
+        alias_table_name = final_graph_table
         alias_sql = f"""
         CREATE OR REPLACE TABLE {executor.catalog}.{executor.schema}.{alias_table_name} 
         AS SELECT * FROM {executor.catalog}.{executor.schema}.{final_table_name}
@@ -474,12 +1852,417 @@ def execute_unify_loop(executor: DatabricksExecutor, sql_dir: pathlib.Path, max_
         ok, rows, msg = executor.execute_sql(alias_sql, "Create final iteration alias")
         if ok:
             print(f"[green]✓[/green] Alias table '{alias_table_name}' created")
+            if run_state:
+                run_state.finish_loop()
         else:
             print(f"[yellow]⚠[/yellow] Failed to create alias table: {msg}")
 
     return executed_count
 
 
+def execute_step(
+    executor: DatabricksExecutor,
+    step: ExecutionStep,
+    args,
+    run_state: Optional[RunState] = None,
+    resume: bool = False,
+) -> Tuple[bool, int]:
+    """
+    Execute a single plan step
+    Returns: (success, executed_count)
+    """
+    for table_name in step.writes:
+        executor.wait_for_optimize(table_name)
+    executor.invalidate_table_info(*step.writes)
+
+    if step.kind == "loop":
+        print(f"\n[bold magenta]Executing Unify Loop[/bold magenta]")
+        with executor.report.timed("step", step.name) as event:
+            try:
+                executed = execute_unify_loop(
+                    executor, args.sql_dir, run_state=run_state, resume=resume
+                )
+            except UnifyLoopError as e:
+                event.update(success=False, iterations=e.iterations)
+                print(f"[red]✗[/red] Unify loop stopped: {e}")
+                return False, e.iterations
+            event["iterations"] = executed
+        return True, executed
+
+    file_path = step.file_path
+    print(f"\n[bold]Executing: {file_path.name}[/bold]")
+
+    sql_content = file_path.read_text(encoding="utf-8")
+    warm_start = WARM_START_HEADER_RE.search(sql_content)
+    if warm_start:
+        reason = executor.cold_start_reason(warm_start.group(1))
+        if reason:
+            print(f"[yellow]⚠[/yellow] Cold start ({reason}): the unify loop starts from the extracted edges")
+            return True, 0
+        print(f"[cyan]•[/cyan] Warm start: seeding the unify loop from {executor.table_prefix}_graph")
+
+    with executor.report.timed("step", step.name) as event:
+        success, rows, message = executor.execute_sql(sql_content, file_path.name)
+        event.update(success=success, rows=rows)
+
+    if not success:
+        print(f"[red]✗[/red] {file_path.name}: {message}")
+        return False, 0
+
+    print(f"[green]✓[/green] {file_path.name}: {message}")
+    if rows is not None and rows > 0:
+        print(f"[cyan]•[/cyan] Rows affected: {rows}")
+
+    # Optimize tables this step wrote that later steps read, if they are fragmented
+    if args.optimize_tables:
+        for table_name in sorted(step.downstream_reads):
+            executor.maybe_optimize(table_name)
+
+    return True, 1
+
+
+def run_execution_plan(
+    executor: DatabricksExecutor,
+    steps: List[ExecutionStep],
+    args,
+    run_state: Optional[RunState] = None,
+) -> int:
+    """
+    Run plan steps in dependency order, executing independent steps
+    concurrently (up to --max-parallel). Steps share the executor's
+    connection pool, so each running step gets its own pooled connection.
+    With --resume, steps completed by a previous run are skipped unless
+    their SQL changed or one of their dependencies had to run again.
+    Returns: number of successfully executed files/iterations
+    """
+    max_parallel = max(1, args.max_parallel)
+    resume = getattr(args, "resume", False)
+    step_hashes = {
+        step.name: step_content_hash(step, args.sql_dir, executor.table_prefix)
+        for step in steps
+    }
+
+    def run_step(step: ExecutionStep, resume_step: bool) -> Tuple[bool, int]:
+        return execute_step(executor, step, args, run_state=run_state, resume=resume_step)
+
+    success_count = 0
+    done: Set[str] = set()
+    rerun: Set[str] = set()
+    pending = list(steps)
+    running = {}
+    stopped = False
+
+    with ThreadPoolExecutor(max_workers=max_parallel) as pool:
+        while pending or running:
+            if not stopped:
+                # Schedule ready steps in plan order
+                for step in list(pending):
+                    if len(running) >= max_parallel:
+                        break
+                    if step.deps <= done:
+                        pending.remove(step)
+                        resume_step = resume and not (step.deps & rerun)
+                        if (
+                            resume_step
+                            and run_state
+                            and run_state.is_step_complete(step.name, step_hashes[step.name])
+                        ):
+                            print(f"[cyan]•[/cyan] Skipping {step.name} (completed in previous run)")
+                            if step.kind == "file":
+                                success_count += 1
+                            done.add(step.name)
+                            continue
+
+                        rerun.add(step.name)
+                        if run_state:
+                            run_state.invalidate_step(step.name)
+                        running[pool.submit(run_step, step, resume_step)] = step
+
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                step = running.pop(future)
+                try:
+                    success, executed = future.result()
+                except Exception as e:
+                    print(f"[red]✗[/red] {step.name}: {e}")
+                    success, executed = False, 0
+
+                success_count += executed
+                done.add(step.name)
+
+                step_hash = step_hashes[step.name]
+                if success and run_state and (
+                    step.kind == "file" or run_state.is_loop_finished(step_hash)
+                ):
+                    run_state.mark_step_complete(step.name, step_hash)
+
+                if not success and not stopped:
+                    # Ask user if they want to continue
+                    response = input("Continue with remaining files? (y/n): ").lower()
+                    if response != "y":
+                        stopped = True
+                        print(f"[yellow]•[/yellow] Execution stopped by user choice")
+
+    return success_count
+
+
+def format_step_dependencies(steps: List[ExecutionStep]) -> Dict[str, str]:
+    """Render direct (transitively reduced) dependencies of each step for the plan table"""
+    ancestors: Dict[str, Set[str]] = {}
+    for step in steps:
+        ancestors[step.name] = set(step.deps)
+        for dep in step.deps:
+            ancestors[step.name] |= ancestors.get(dep, set())
+
+    rendered = {}
+    for step in steps:
+        direct = {
+            dep for dep in step.deps
+            if not any(dep in ancestors[other] for other in step.deps if other != dep)
+        }
+        rendered[step.name] = ", ".join(sorted(direct)) or "-"
+    return rendered
+
+
+def describe_table_info(info: dict) -> str:
+    """Human readable row count and size of a table info dict"""
+    parts = []
+    if info.get("row_count") is not None:
+        parts.append(f"{info['row_count']:,} rows")
+    if info.get("size_bytes") is not None:
+        parts.append(f"{info['size_bytes'] / 2**20:,.1f} MB")
+    return ", ".join(parts) or "no statistics"
+
+
+def sql_literal(value) -> str:
+    """Render a Python value as a SQL literal for the run report INSERT"""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    text = str(value).replace("\\", "\\\\").replace("'", "''")
+    return f"'{text}'"
+
+
+def save_run_report_table(executor: DatabricksExecutor, report: RunReport, table_name: str) -> bool:
+    """Append the run report events to a table (created if missing)"""
+    full_table_name = f"{executor.catalog}.{executor.schema}.{table_name}"
+    core_fields = {"kind", "name", "iteration", "rows", "updated_count", "seconds", "success", "started_at"}
+
+    values = []
+    for event in report.snapshot():
+        details = {key: value for key, value in event.items() if key not in core_fields}
+        row = [
+            report.run_id,
+            event["kind"],
+            event["name"],
+            event.get("iteration"),
+            event.get("rows"),
+            event.get("updated_count"),
+            event["seconds"],
+            event["success"],
+            event["started_at"],
+            json.dumps(details, default=str) if details else None,
+        ]
+        values.append("(" + ", ".join(sql_literal(value) for value in row) + ")")
+
+    if not values:
+        return True
+    values_sql = ",\n    ".join(values)
+
+    report_sql = f"""
+    CREATE TABLE IF NOT EXISTS {full_table_name} (
+        run_id STRING,
+        kind STRING,
+        name STRING,
+        iteration INT,
+        rows BIGINT,
+        updated_count BIGINT,
+        seconds DOUBLE,
+        success BOOLEAN,
+        started_at DOUBLE,
+        details STRING
+    ) USING DELTA;
+
+    INSERT INTO {full_table_name} VALUES
+    {values_sql};
+    """
+    ok, _, msg = executor.execute_sql(report_sql, "run report")
+    if not ok:
+        print(f"[yellow]⚠[/yellow] Failed to save run report to {table_name}: {msg}")
+    return ok
+
+
+def read_loop_history_table(executor: DatabricksExecutor, history_table: str) -> Optional[List[dict]]:
+    """Runs recorded in the loop history table (most recent LOOP_HISTORY_RUNS), None on failure"""
+    history_sql = f"""
+    SELECT run_id, iteration, updated_count, seconds, loop_mode, loop_tables, runner, converged
+    FROM {history_table}
+    WHERE run_id IN (
+        SELECT run_id FROM {history_table}
+        GROUP BY run_id
+        ORDER BY MAX(recorded_at) DESC
+        LIMIT {LOOP_HISTORY_RUNS}
+    )
+    ORDER BY run_id, iteration
+    """
+
+    def run_history():
+        with executor.pool.cursor() as (cursor, _):
+            return cursor.execute(history_sql).fetchall()
+
+    try:
+        rows = executor.retry_policy.call(run_history, "loop history")
+    except Exception as e:
+        print(f"[yellow]⚠[/yellow] Could not read loop history from {history_table}: {e}")
+        return None
+
+    runs: Dict[str, dict] = {}
+    for run_id, iteration, updated, seconds, loop_mode, loop_tables, runner, converged in rows:
+        run = runs.setdefault(run_id, {
+            "run_id": run_id,
+            "loop_mode": loop_mode,
+            "loop_tables": loop_tables,
+            "runner": runner,
+            "converged": bool(converged),
+            "iterations": [],
+        })
+        run["iterations"].append({
+            "iteration": int(iteration),
+            "updated_count": int(updated),
+            "seconds": float(seconds) if seconds is not None else None,
+        })
+    return list(runs.values())
+
+
+def save_loop_history(
+    executor: DatabricksExecutor,
+    sql_dir: pathlib.Path,
+    loop_header: Dict[str, str],
+    runner: str,
+    iterations: List[dict],
+    converged: bool,
+):
+    """
+    Append this run's per-iteration updated counts and durations to the
+    {prefix}_loop_history table and export the recent runs to LOOP_HISTORY_FILE,
+    which the SQL generator reads to size the next workflow's unify loop
+    """
+    if not iterations:
+        return
+
+    run = {
+        "run_id": executor.report.run_id,
+        "loop_mode": loop_header.get("mode", "full"),
+        "loop_tables": loop_header.get("tables", "per-iteration"),
+        "runner": runner,
+        "converged": converged,
+        "iterations": iterations,
+    }
+
+    runs = None
+    if executor.loop_history_table:
+        history_table = f"{executor.catalog}.{executor.schema}.{executor.table_prefix}_loop_history"
+        values_sql = ",\n    ".join(
+            "("
+            + ", ".join(
+                sql_literal(value)
+                for value in [
+                    run["run_id"],
+                    entry["iteration"],
+                    entry["updated_count"],
+                    entry["seconds"],
+                    run["loop_mode"],
+                    run["loop_tables"],
+                    runner,
+                    converged,
+                ]
+            )
+            + ", CURRENT_TIMESTAMP())"
+            for entry in iterations
+        )
+        history_sql = f"""
+    CREATE TABLE IF NOT EXISTS {history_table} (
+        run_id STRING,
+        iteration INT,
+        updated_count BIGINT,
+        seconds DOUBLE,
+        loop_mode STRING,
+        loop_tables STRING,
+        runner STRING,
+        converged BOOLEAN,
+        recorded_at TIMESTAMP
+    ) USING DELTA;
+
+    INSERT INTO {history_table} VALUES
+    {values_sql};
+    """
+        ok, _, msg = executor.execute_sql(history_sql, "loop history")
+        if ok:
+            runs = read_loop_history_table(executor, history_table)
+        else:
+            print(f"[yellow]⚠[/yellow] Failed to save loop history to {history_table}: {msg}")
+
+    history_path = sql_dir / LOOP_HISTORY_FILE
+    if runs is None:
+        # Without the table the export keeps the runs made from this directory
+        runs = []
+        if history_path.exists():
+            try:
+                runs = json.loads(history_path.read_text(encoding="utf-8")).get("runs", [])
+            except (OSError, ValueError):
+                runs = []
+        runs = (runs + [run])[-LOOP_HISTORY_RUNS:]
+
+    history = {"table_prefix": executor.table_prefix, "runs": runs}
+    tmp_path = history_path.with_suffix(history_path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(history, indent=2), encoding="utf-8")
+    os.replace(tmp_path, history_path)
+    print(f"[cyan]•[/cyan] Loop history: {len(runs)} runs exported to {history_path.name}")
+
+
+def print_run_report(report: RunReport):
+    """Print per-step and per-iteration timings plus totals for statements and checks"""
+    events = report.snapshot()
+    table = Table(title=f"Run Report ({report.run_id})")
+    table.add_column("Kind", style="cyan")
+    table.add_column("Name", style="yellow")
+    table.add_column("Time (s)", justify="right", style="green")
+    table.add_column("Rows", justify="right")
+    table.add_column("Updated", justify="right", style="magenta")
+
+    for event in events:
+        if event["kind"] in ("warmup", "step", "iteration", "script"):
+            name = event["name"] if event["success"] else f"[red]{event['name']} ✗[/red]"
+            table.add_row(
+                event["kind"],
+                name,
+                f"{event['seconds']:.1f}",
+                f"{event['rows']:,}" if event.get("rows") else "-",
+                str(event["updated_count"]) if "updated_count" in event else "-",
+            )
+
+    # Fine-grained events are summarized as totals
+    for kind in ("statement", "convergence_check", "optimize"):
+        matching = [event for event in events if event["kind"] == kind]
+        if matching:
+            table.add_row(
+                kind,
+                f"{len(matching)} total",
+                f"{sum(event['seconds'] for event in matching):.1f}",
+                "-",
+                "-",
+            )
+
+    table.add_row("total", "run", f"{time.time() - report.started_at:.1f}", "-", "-")
+    console.print(table)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Execute Databricks SQL files in sequence"
@@ -518,13 +2301,109 @@ def main():
     parser.add_argument(
         "--optimize-tables",
         action="store_true",
-        help="Run OPTIMIZE on Delta tables after major operations",
+        help="Also consider OPTIMIZE for tables written by plan steps and read by later steps",
+    )
+    parser.add_argument(
+        "--optimize-mode",
+        choices=["auto", "always", "off"],
+        default="auto",
+        help="auto: OPTIMIZE only fragmented tables (from DESCRIBE DETAIL); "
+        "always: OPTIMIZE every candidate table; off: never (default: auto)",
+    )
+    parser.add_argument(
+        "--optimize-min-files",
+        type=int,
+        default=16,
+        help="Tables with fewer data files are never optimized in auto mode (default: 16)",
+    )
+    parser.add_argument(
+        "--optimize-fragmentation",
+        type=float,
+        default=4.0,
+        help="Optimize when a table has this many times more files than 128MB files "
+        "would need (default: 4.0)",
+    )
+    parser.add_argument(
+        "--client-loop",
+        action="store_true",
+        help="Run unify loop iterations from the client even if a loop script was generated",
+    )
+    parser.add_argument(
+        "--cold-start",
+        action="store_true",
+        help="Skip the generated warm-start seed and run the unify loop from the extracted edges only",
+    )
+    parser.add_argument(
+        "--no-loop-history-table",
+        action="store_true",
+        help="Do not append unify loop iteration counts to the <prefix>_loop_history table "
+        "(the local unify_loop_history.json export is still written)",
+    )
+    parser.add_argument(
+        "--loop-progress-interval",
+        type=float,
+        default=15.0,
+        help="Seconds between progress checks while the generated loop script runs (default: 15)",
+    )
+    parser.add_argument(
+        "--optimize-background",
+        action="store_true",
+        help="Run OPTIMIZE on a separate connection while execution continues",
     )
     parser.add_argument(
         "--config",
         type=pathlib.Path,
         help="Path to unify.yml config file (optional, will try to find it automatically)",
     )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume an interrupted run: skip completed steps and continue the unify loop",
+    )
+    parser.add_argument(
+        "--max-parallel",
+        type=int,
+        default=1,
+        help="Maximum number of independent steps to execute concurrently (default: 1)",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=3,
+        help="Retries for transient errors such as throttling or dropped connections (default: 3)",
+    )
+    parser.add_argument(
+        "--retry-backoff",
+        type=float,
+        default=2.0,
+        help="Initial retry delay in seconds, doubled on each attempt (default: 2.0)",
+    )
+    parser.add_argument(
+        "--max-result-rows",
+        type=int,
+        default=100_000,
+        help="Stop reading a statement's result set after this many rows (default: 100000)",
+    )
+    parser.add_argument(
+        "--exact-counts",
+        action="store_true",
+        help="Report exact row counts with COUNT(*) instead of table metadata",
+    )
+    parser.add_argument(
+        "--count-large-results",
+        action="store_true",
+        help="Count result sets larger than --max-result-rows with a server-side COUNT(*)",
+    )
+
+    parser.add_argument(
+        "--report",
+        type=pathlib.Path,
+        help="Path of the JSON run report (default: <sql_dir>/unify_run_report.json)",
+    )
+    parser.add_argument(
+        "--report-table",
+        help="Also append the run report to this table in the target schema",
+    )
 
     args = parser.parse_args()
 
@@ -560,18 +2439,59 @@ def main():
         if not access_token:
             access_token = getpass.getpass("Databricks Access Token: ")
 
+    # Connect and wake the warehouse while the run is planned below
+    executor = None
+    if not args.dry_run:
+        executor = DatabricksExecutor(
+            server_hostname=args.server_hostname,
+            http_path=args.http_path,
+            access_token=access_token,
+            catalog=args.catalog,
+            schema=args.schema,
+            auth_type=args.auth_type,
+            config=config,
+            # One pooled connection per parallel step plus one for stats/OPTIMIZE
+            # (and one more for background OPTIMIZE)
+            pool_size=max(1, args.max_parallel) + 1 + int(args.optimize_background),
+            retry_policy=RetryPolicy(max_retries=args.max_retries, backoff=args.retry_backoff),
+            report=RunReport(),
+            max_result_rows=args.max_result_rows,
+            count_large_results=args.count_large_results,
+            client_loop=args.client_loop,
+            loop_history_table=not args.no_loop_history_table,
+            cold_start=args.cold_start,
+            loop_progress_interval=args.loop_progress_interval,
+            optimize_policy=OptimizePolicy(
+                mode=args.optimize_mode,
+                min_files=args.optimize_min_files,
+                max_fragmentation=args.optimize_fragmentation,
+                background=args.optimize_background,
+            ),
+        )
+        executor.start_warmup()
+
     # Get SQL files in order
     sql_files = get_sql_files(args.sql_dir)
 
     if not sql_files:
         print(f"[red]Error:[/red] No SQL files found in {args.sql_dir}")
+        if executor:
+            executor.wait_for_warmup()
+            executor.disconnect()
         return 1
 
+    # Build step dependency graph
+    steps = build_execution_plan(sql_files, get_table_prefix(config), skip_loop=args.skip_loop)
+    step_dependencies = format_step_dependencies(steps)
+    loop_step = next((step for step in steps if step.kind == "loop"), None)
+
     # Show execution plan
     table = Table(title="Execution Plan")
     table.add_column("Order", style="cyan")
     table.add_column("File", style="yellow")
     table.add_column("Type", style="green")
+    table.add_column("Depends On", style="magenta")
+    table.add_column("Statements", justify="right")
 
     for order_name, file_path in sql_files:
         file_type = "Setup"
@@ -588,7 +2508,14 @@ def main():
         elif "meta" in order_name or "lookup" in order_name:
             file_type = "Metadata"            
 
-        table.add_row(order_name, file_path.name, file_type)
+        if order_name in step_dependencies:
+            depends_on = step_dependencies[order_name]
+        else:
+            depends_on = step_dependencies.get(loop_step.name, "-") if loop_step else "-"
+
+        # Parsing here fills the parse cache while the warehouse starts
+        statements = parse_sql(file_path.read_text(encoding="utf-8"))
+        table.add_row(order_name, file_path.name, file_type, depends_on, str(len(statements)))
 
     console.print(table)
 
@@ -597,81 +2524,24 @@ def main():
         print(f"[cyan]Target:[/cyan] {args.catalog}.{args.schema}")
         return 0
 
-    # Execute SQL files
-    executor = DatabricksExecutor(
-        server_hostname=args.server_hostname,
-        http_path=args.http_path,
-        access_token=access_token,
-        catalog=args.catalog,
-        schema=args.schema,
-        auth_type=args.auth_type,
-        config=config,
-    )
-
-    if not executor.connect():
+    if not executor.wait_for_warmup():
         return 1
 
     try:
-        success_count = 0
-
         print(f"\n[bold]Starting Databricks SQL Execution[/bold]")
         print(f"[cyan]•[/cyan] Catalog: {args.catalog}")
         print(f"[cyan]•[/cyan] Schema: {args.schema}")
         print(f"[cyan]•[/cyan] Delta tables: ✓ enabled")
 
-        # Execute unify loop before canonicalize step (after file 04_ files are skipped)
-        unify_loop_executed = False
-        user_chose_to_stop = False
-        
-        for order_name, file_path in sql_files:
-            # Skip loop iterations if we're handling them separately
-            if "loop_iteration" in order_name and not args.skip_loop:
-                continue
-            
-            # Execute unify loop before canonicalize step  
-            if "canonicalize" in order_name and not args.skip_loop and not unify_loop_executed:
-                print(f"\n[bold magenta]Executing Unify Loop Before Canonicalization[/bold magenta]")
-                executed_loops = execute_unify_loop(executor, args.sql_dir)
-                success_count += executed_loops
-                unify_loop_executed = True
-
-            print(f"\n[bold]Executing: {file_path.name}[/bold]")
-
-            sql_content = file_path.read_text(encoding="utf-8")
-            success, rows, message = executor.execute_sql(sql_content, file_path.name)
-
-            if success:
-                print(f"[green]✓[/green] {file_path.name}: {message}")
-                if rows is not None and rows > 0:
-                    print(f"[cyan]•[/cyan] Rows affected: {rows}")
-
-                # Optimize Delta tables if requested and this is a major operation
-                if args.optimize_tables and any(
-                    keyword in file_path.name.lower()
-                    for keyword in ["create", "merge", "extract", "canonicalize"]
-                ):
-                    # Extract table name from common patterns
-                    if "graph" in file_path.name.lower():
-                        executor.optimize_delta_table(f"{executor.table_prefix}_graph_unify_loop_0")
-                    elif "lookup" in file_path.name.lower():
-                        executor.optimize_delta_table(f"{executor.table_prefix}_lookup")
+        if args.max_parallel > 1:
+            print(f"[cyan]•[/cyan] Parallel steps: up to {args.max_parallel}")
 
-                success_count += 1
-            else:
-                print(f"[red]✗[/red] {file_path.name}: {message}")
+        # Execute steps in dependency order (unify loop runs before canonicalization)
+        run_state = RunState(args.sql_dir / ".unify_run_state.json", fresh=not args.resume)
+        if args.resume:
+            print(f"[cyan]•[/cyan] Resuming from run state: {run_state.path.name}")
 
-                # Ask user if they want to continue
-                response = input("Continue with remaining files? (y/n): ").lower()
-                if response != "y":
-                    user_chose_to_stop = True
-                    print(f"[yellow]•[/yellow] Execution stopped by user choice")
-                    break
-
-        # Execute unify loop separately (if not skipped and not already executed and user didn't choose to stop)
-        if not args.skip_loop and not unify_loop_executed and not user_chose_to_stop:
-            print(f"\n[bold magenta]Executing Unify Loop (Fallback)[/bold magenta]")
-            executed_loops = execute_unify_loop(executor, args.sql_dir)
-            success_count += executed_loops
+        success_count = run_execution_plan(executor, steps, args, run_state)
 
         print(f"\n[bold green]Execution Complete[/bold green]")
         print(f"[cyan]•[/cyan] Files processed: {success_count}/{len(sql_files)}")
@@ -679,15 +2549,23 @@ def main():
         # Show some final stats if possible
         try:
             lookup_table_name = f"{executor.table_prefix}_lookup"
-            lookup_info = executor.get_table_info(lookup_table_name)
+            lookup_info = executor.get_table_info(lookup_table_name, exact=args.exact_counts)
             if lookup_info:
-                print(
-                    f"[cyan]•[/cyan] Final {lookup_table_name} rows: {lookup_info['row_count']:,}"
-                )
+                print(f"[cyan]•[/cyan] Final {lookup_table_name}: {describe_table_info(lookup_info)}")
         except:
             pass
 
     finally:
+        # Keep the profile of every run, including failed and interrupted ones
+        report_path = args.report or args.sql_dir / "unify_run_report.json"
+        try:
+            executor.report.write_json(report_path)
+            print(f"[cyan]•[/cyan] Run report: {report_path}")
+            if args.report_table:
+                save_run_report_table(executor, executor.report, args.report_table)
+            print_run_report(executor.report)
+        except Exception as e:
+            print(f"[yellow]⚠[/yellow] Failed to write run report: {e}")
         executor.disconnect()
 
     return 0
@@ -25,9 +25,12 @@ Dependencies: pyyaml
 
 import argparse
 import datetime as dt
+import hashlib
+import json
+import math
 import pathlib
 import re
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any, Union
 
 import yaml
 
@@ -99,6 +102,16 @@ HASH_MASK = "59bd709807712b1b0e"
 MASK_LOW = HASH_MASK[:16]
 MASK_HIGH = HASH_MASK[16:]
 
+# Rendered by the executor for unify loop iterations beyond the generated files
+LOOP_TEMPLATE_FILE = "unify_loop_iteration.sql.tmpl"
+# Written by the SQL executor after each unify loop; sizes the next generated loop
+LOOP_HISTORY_FILE = "unify_loop_history.json"
+LOOP_HISTORY_RECENT_RUNS = 10
+MAX_LOOP_ITERATIONS = 30  # the executor's iteration limit
+LONG_CHAIN_ITERATIONS = 6
+FRONTIER_TAIL_RATIO = 0.1
+MAX_BITMASK_SOURCE_TABLES = 63  # bits of a non-negative BIGINT
+
 
 def apply_databricks_rules(sql: str, fix_syntax: bool = True) -> str:
     """Apply regex rules to convert to Databricks SQL"""
@@ -207,6 +220,39 @@ def get_merge_iterations(yaml_data: Dict[str, Any]) -> int:
     return None
 
 
+def get_key_fingerprint(
+    yaml_data: Dict[str, Any], surrogate_ids: bool = False, source_table_bitmask: bool = False
+) -> str:
+    """
+    Hash of the merge keys in priority order, their validation rules, the key
+    columns of each table and the graph layout flags; a graph built under another
+    fingerprint cannot seed the loop
+    """
+    merge_keys = get_merge_keys(yaml_data)
+    key_cfg_map = {k["name"]: k for k in yaml_data["keys"]}
+    fingerprint = {
+        "merge_by_keys": merge_keys,
+        "keys": [key_cfg_map.get(key, {}) for key in merge_keys],
+        "tables": [
+            {
+                "table": table["table"],
+                "key_columns": [kc for kc in table.get("key_columns", []) if kc["key"] in merge_keys],
+            }
+            for table in yaml_data["tables"]
+        ],
+    }
+    # Only non-default layouts are hashed, so graphs from before these flags still match
+    graph_layout = {
+        flag: True
+        for flag, enabled in (("surrogate_ids", surrogate_ids), ("source_table_bitmask", source_table_bitmask))
+        if enabled
+    }
+    if graph_layout:
+        fingerprint["graph_layout"] = graph_layout
+    payload = json.dumps(fingerprint, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
 def generate_key_mask_values(num_keys: int) -> List[str]:
     """Generate key_mask values for the specified number of merge keys"""
     # These are the key mask values from TD's implementation
@@ -230,6 +276,88 @@ def generate_key_mask_values(num_keys: int) -> List[str]:
     return base_masks[:num_keys]
 
 
+def load_loop_history(path: pathlib.Path) -> List[Dict[str, Any]]:
+    """Unify loop runs from the executor's loop history export (empty if missing or unreadable)"""
+    if not path.exists():
+        return []
+    try:
+        with open(path, "r") as f:
+            return json.load(f).get("runs", [])
+    except (OSError, ValueError) as e:
+        print(f"Warning: could not read loop history {path}: {e}")
+        return []
+
+
+def calibrate_loop_from_history(
+    runs: List[Dict[str, Any]], loop_mode: str, loop_tables: str
+) -> Tuple[Optional[int], str]:
+    """
+    Iteration budget and loop strategy from recent converged unify loop runs.
+    The budget is the most iterations any recent run of the chosen mode needed.
+    loop_mode "auto" picks the mode with the lowest average recorded loop time; with
+    history for one mode only, pointer-jumping for long leader chains, frontier when
+    later iterations re-point a small share of what the first one did, else full.
+    Returns (iterations, loop mode); iterations is None without usable history.
+    """
+    converged = [
+        run for run in runs[-LOOP_HISTORY_RECENT_RUNS:] if run.get("converged") and run.get("iterations")
+    ]
+    by_mode: Dict[str, List[Dict[str, Any]]] = {}
+    for run in converged:
+        mode = run.get("loop_mode", "full")
+        # Frontier keeps one in-place table, so ping-pong history cannot come from it
+        if loop_tables == "ping-pong" and mode == "frontier":
+            continue
+        by_mode.setdefault(mode, []).append(run)
+
+    def needed_iterations(mode_runs: List[Dict[str, Any]]) -> int:
+        return max(max(it["iteration"] for it in run["iterations"]) for run in mode_runs)
+
+    def loop_seconds(run: Dict[str, Any]) -> Optional[float]:
+        seconds = [it.get("seconds") for it in run["iterations"]]
+        return sum(seconds) if all(value is not None for value in seconds) else None
+
+    if loop_mode == "auto":
+        average_seconds = {}
+        for mode, mode_runs in by_mode.items():
+            timings = [value for value in map(loop_seconds, mode_runs) if value is not None]
+            if timings:
+                average_seconds[mode] = sum(timings) / len(timings)
+
+        if len(average_seconds) > 1:
+            loop_mode = min(average_seconds, key=average_seconds.get)
+        elif by_mode:
+            latest = [run for run in converged if run.get("loop_mode", "full") in by_mode][-1]
+            loop_mode = latest.get("loop_mode", "full")
+            counts = {it["iteration"]: it["updated_count"] for it in latest["iterations"]}
+            if loop_mode != "pointer-jumping" and needed_iterations(by_mode[loop_mode]) >= LONG_CHAIN_ITERATIONS:
+                loop_mode = "pointer-jumping"
+            elif (
+                loop_mode == "full"
+                and loop_tables != "ping-pong"
+                and counts.get(1)
+                and counts.get(2)
+                and counts[2] <= counts[1] * FRONTIER_TAIL_RATIO
+            ):
+                loop_mode = "frontier"
+        else:
+            loop_mode = "full"
+
+    if loop_mode in by_mode:
+        iterations = needed_iterations(by_mode[loop_mode])
+    else:
+        # Full and frontier converge in the same number of iterations; pointer-jumping
+        # roughly needs the log2 of that. Pointer-jumping history says little about the others.
+        chain_runs = by_mode.get("full", []) + by_mode.get("frontier", [])
+        if not chain_runs:
+            return None, loop_mode
+        iterations = needed_iterations(chain_runs)
+        if loop_mode == "pointer-jumping":
+            iterations = math.ceil(math.log2(max(iterations, 2))) + 2
+
+    return max(2, min(MAX_LOOP_ITERATIONS, iterations)), loop_mode
+
+
 def calculate_max_iterations(yaml_data: Dict[str, Any]) -> int:
     """Calculate required loop iterations based on YAML config"""
     # Check if merge_iterations is specified in YAML first
@@ -273,8 +401,12 @@ def generate_extract_sql_databricks(
     schema: str,
     src_catalog: str,
     src_schema: str,
+    watermarks_table: Optional[str] = None,
 ) -> str:
-    """Generate extract SQL block for a single table (only merge keys) - Databricks version"""
+    """
+    Generate extract SQL block for a single table (only merge keys) - Databricks version
+    With a watermarks table only rows at or after the table's stored watermark are read
+    """
     key_name_to_ns = {key: i + 1 for i, key in enumerate(merge_keys)}
     key_cfg_map = {k["name"]: k for k in keys_cfg}
 
@@ -313,6 +445,14 @@ def generate_extract_sql_databricks(
 
     case_str = ",\n                ".join(case_exprs)
 
+    where_sql = "TRUE"
+    if watermarks_table:
+        # Rows at the watermark itself are read again; merging them twice changes nothing
+        source_table = f"{src_catalog}.{src_schema}.{table['table']}"
+        where_sql = f"""COALESCE(time >= (
+            SELECT MAX(max_time) FROM {watermarks_table} WHERE source_table = '{source_table}'
+        ), TRUE)"""
+
     return f"""SELECT
             FILTER(ARRAY(
                 {case_str}
@@ -320,13 +460,828 @@ def generate_extract_sql_databricks(
             time,
             {table_id} as source_table_id
         FROM {src_catalog}.{src_schema}.{table['table']}
-        WHERE TRUE"""
+        WHERE {where_sql}"""
+
+
+def source_table_ids_merge_sql_databricks(column: str, bitmask: bool = False) -> str:
+    """Aggregate merging follower_source_table_ids: arrays are flattened, bitmasks OR-ed"""
+    if bitmask:
+        return f"BIT_OR({column})"
+    return f"ARRAY_DISTINCT(FLATTEN(COLLECT_LIST({column})))"
+
+
+def source_table_ids_contains_sql_databricks(column: str, table_id: int, bitmask: bool = False) -> str:
+    """Test whether follower_source_table_ids includes table_id (bit table_id - 1 of a bitmask)"""
+    if bitmask:
+        return f"({column} & {1 << (table_id - 1)}) <> 0"
+    return f"ARRAY_CONTAINS({column}, {table_id})"
+
+
+def generate_unify_loop_iteration_sql_databricks(
+    catalog: str,
+    schema: str,
+    canonical_id_name: str,
+    iteration: Union[int, str],
+    prev_table: str,
+    curr_table: str,
+    priority_case_sql: str,
+    pointer_jump: bool = False,
+    create_as_select: bool = False,
+    id_type: str = "STRING",
+    source_table_bitmask: bool = False,
+) -> str:
+    """
+    Generate one unify loop iteration; records its leader changes for cheap convergence checks.
+    id_type is BIGINT when the loop runs on surrogate ids; source_table_bitmask keeps
+    follower_source_table_ids as a BIGINT bitmask instead of an array
+    """
+    diff_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_unify_loop_leader_diff")
+    stats_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_unify_loop_stats")
+
+    jump_sql = ""
+    if pointer_jump:
+        # Leader-of-leader shortcut: each row jumps to the smallest leader of its own leader,
+        # halving chain lengths so the loop converges in O(log diameter) iterations
+        jump_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_unify_loop_jumped")
+        leader_case_sql = priority_case_sql.replace("leader_ns", "prev.leader_ns")
+        jump_sql = f"""
+-- Pointer jumping: re-point every row to its leader's own leader before the regular pass
+CREATE OR REPLACE TABLE {jump_table}
+USING DELTA
+AS
+WITH parents AS (
+    SELECT
+        follower_id, follower_ns,
+        MIN(STRUCT({priority_case_sql} AS ns_prio, leader_id AS id)) as parent
+    FROM {prev_table}
+    GROUP BY follower_id, follower_ns
+),
+jumps AS (
+    SELECT
+        prev.*,
+        COALESCE(
+            parents.parent < STRUCT({leader_case_sql} AS ns_prio, prev.leader_id AS id), FALSE
+        ) as jumped,
+        parents.parent
+    FROM {prev_table} prev
+    LEFT JOIN parents
+    ON prev.leader_id = parents.follower_id AND prev.leader_ns = parents.follower_ns
+)
+SELECT
+    follower_id, follower_ns,
+    CASE WHEN jumped THEN parent.id ELSE leader_id END as leader_id,
+    CASE WHEN jumped THEN parent.ns_prio ELSE leader_ns END as leader_ns,
+    follower_first_seen_at, follower_last_seen_at, follower_source_table_ids,
+    CASE WHEN jumped THEN UNIX_TIMESTAMP() ELSE follower_last_processed_at END as follower_last_processed_at
+FROM jumps;
+"""
+        prev_table = jump_table
+
+    leader_leader_cte = f"""WITH prev_table_with_leader_leader AS (
+    SELECT
+        follower_id, follower_ns, leader_id, leader_ns,
+        follower_first_seen_at, follower_last_seen_at,
+        follower_source_table_ids, follower_last_processed_at
+    FROM {prev_table}
+    
+    UNION ALL
+    
+    -- leader -> leader relationship (corrected mapping)
+    SELECT
+        follower_id, follower_ns, leader_id, leader_ns,
+        follower_first_seen_at, follower_last_seen_at,
+        follower_source_table_ids, follower_last_processed_at
+    FROM (
+        SELECT DISTINCT leader_id, leader_ns FROM {prev_table}
+    ) prev_leaders
+    INNER JOIN (
+        SELECT
+            follower_id, follower_ns,
+            follower_first_seen_at, follower_last_seen_at,
+            follower_source_table_ids, follower_last_processed_at
+        FROM {prev_table}
+    ) prev_followers
+    ON prev_leaders.leader_id = prev_followers.follower_id 
+    AND prev_leaders.leader_ns = prev_followers.follower_ns
+)"""
+
+    if create_as_select:
+        # One CTAS instead of CREATE + INSERT: a single commit per iteration
+        create_curr_sql = f"""CREATE OR REPLACE TABLE {curr_table}
+USING DELTA
+CLUSTER BY (follower_id)
+AS"""
+    else:
+        create_curr_sql = f"""CREATE OR REPLACE TABLE {curr_table} (
+    follower_id {id_type},
+    follower_ns BIGINT,
+    leader_id {id_type},
+    leader_ns BIGINT,
+    follower_first_seen_at BIGINT,
+    follower_last_seen_at BIGINT,
+    follower_source_table_ids {"BIGINT" if source_table_bitmask else "ARRAY<BIGINT>"},
+    follower_last_processed_at BIGINT
+) USING DELTA
+CLUSTER BY (follower_id);
+
+INSERT INTO {curr_table}"""
+
+    return f"""USE CATALOG {catalog};
+USE SCHEMA {schema};
+{jump_sql}
+-- Leaders re-pointed in this iteration (its row count drives convergence)
+CREATE OR REPLACE TABLE {diff_table}
+USING DELTA
+AS
+{leader_leader_cte}
+SELECT DISTINCT
+    older_leader.ns_prio as older_leader_ns,
+    older_leader.id as older_leader_id,
+    newer_leader.ns_prio as newer_leader_ns,
+    newer_leader.id as newer_leader_id
+FROM (
+    SELECT
+        older_leader,
+        MIN(newer_leader) as newer_leader
+    FROM (
+        SELECT
+            leader as older_leader,
+            MIN(leader) OVER (PARTITION BY follower_id, follower_ns) as newer_leader
+        FROM (
+            SELECT
+                follower_id, follower_ns,
+                STRUCT(
+                    {priority_case_sql} AS ns_prio, 
+                    leader_id AS id
+                ) as leader
+            FROM prev_table_with_leader_leader
+        ) rs
+    ) wsrs
+    WHERE older_leader > newer_leader
+    GROUP BY older_leader
+) diffrs;
+
+{create_curr_sql}
+{leader_leader_cte}
+SELECT
+    follower_id, follower_ns, leader_id, leader_ns,
+    MIN(follower_first_seen_at) as follower_first_seen_at,
+    MAX(follower_last_seen_at) as follower_last_seen_at,
+    {source_table_ids_merge_sql_databricks('follower_source_table_ids', source_table_bitmask)} as follower_source_table_ids,
+    MAX(follower_last_processed_at) as follower_last_processed_at
+FROM (
+    SELECT
+        prev.follower_id, prev.follower_ns,
+        COALESCE(diff.newer_leader_id, prev.leader_id) as leader_id,
+        COALESCE(diff.newer_leader_ns, prev.leader_ns) as leader_ns,
+        prev.follower_first_seen_at, prev.follower_last_seen_at,
+        prev.follower_source_table_ids,
+        CASE WHEN diff.newer_leader_id IS NULL 
+             THEN prev.follower_last_processed_at 
+             ELSE UNIX_TIMESTAMP() 
+        END as follower_last_processed_at
+    FROM prev_table_with_leader_leader prev
+    LEFT JOIN {diff_table} diff
+    ON prev.leader_id = diff.older_leader_id AND prev.leader_ns = diff.older_leader_ns
+) lp
+GROUP BY follower_id, follower_ns, leader_id, leader_ns;
+
+-- Record iteration stats (read by the executor instead of an EXCEPT scan)
+DELETE FROM {stats_table} WHERE iteration = {iteration};
+
+INSERT INTO {stats_table}
+SELECT {iteration} as iteration, COUNT(*) as updated_count, UNIX_TIMESTAMP() as time
+FROM {diff_table};"""
+
+
+def generate_unify_loop_header(
+    canonical_id_name: str, loop_mode: str, loop_tables: str, loop_runner: str = "client"
+) -> str:
+    """First line of every loop file; tells the executor how the loop tables are laid out and run"""
+    return (
+        f"-- unify_loop: prefix={canonical_id_name} mode={loop_mode} tables={loop_tables} "
+        f"runner={loop_runner}"
+    )
+
+
+def split_loop_statements(sql: str) -> List[str]:
+    """Split generated loop SQL into statements, dropping comment lines and USE statements"""
+    statements = []
+    for stmt in re.split(r";[ \t]*(?:\n|$)", sql):
+        stmt = "\n".join(
+            line for line in stmt.splitlines() if not line.strip().startswith("--")
+        ).strip()
+        if stmt and not re.match(r"USE\s", stmt, re.I):
+            statements.append(stmt)
+    return statements
+
+
+def generate_unify_loop_script_sql_databricks(
+    catalog: str,
+    schema: str,
+    canonical_id_name: str,
+    first_iteration_sql: str,
+    template_sql: str,
+    final_table: Optional[str] = None,
+) -> str:
+    """
+    SQL scripting block running the iterate/check/stop loop in a single submission.
+    Iteration 1 runs the generated first iteration, later ones the iteration template
+    rendered with the same tokens the executor uses (via EXECUTE IMMEDIATE); convergence
+    is read from the loop stats table. The executor fills in {{start_iteration}} and
+    {{max_iterations}}; the block returns (iteration, updated_count, time) of every
+    iteration it ran. With final_table, the last per-iteration table is copied there
+    before returning.
+    """
+    stats_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_unify_loop_stats")
+
+    def string_literal(sql: str) -> str:
+        return "'" + sql.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+    first_statements = "\n            ".join(
+        f"{stmt};".replace("\n", "\n            ") for stmt in split_loop_statements(first_iteration_sql)
+    )
+    template_statements = "\n            ".join(
+        f"""SET iteration_sql = REPLACE(REPLACE(REPLACE(REPLACE({string_literal(stmt)},
+                '{{{{iteration}}}}', CAST(current_iteration AS STRING)),
+                '{{{{prev_iteration}}}}', CAST(current_iteration - 1 AS STRING)),
+                '{{{{prev_slot}}}}', prev_slot),
+                '{{{{curr_slot}}}}', curr_slot);
+            EXECUTE IMMEDIATE iteration_sql;"""
+        for stmt in split_loop_statements(template_sql)
+    )
+
+    final_copy = ""
+    if final_table:
+        loop_table_prefix = format_catalog_table(catalog, schema, f"{canonical_id_name}_graph_unify_loop_")
+        final_copy = f"""
+
+    SET iteration_sql = 'CREATE OR REPLACE TABLE {final_table} AS SELECT * FROM {loop_table_prefix}'
+        || CAST(current_iteration - 1 AS STRING);
+    EXECUTE IMMEDIATE iteration_sql;"""
+
+    return f"""BEGIN
+    DECLARE current_iteration INT DEFAULT {{{{start_iteration}}}};
+    DECLARE changed BIGINT DEFAULT 1;
+    DECLARE iteration_sql STRING;
+    DECLARE prev_slot STRING;
+    DECLARE curr_slot STRING;
+
+    WHILE current_iteration <= {{{{max_iterations}}}} AND changed > 0 DO
+        IF current_iteration = 1 THEN
+            {first_statements}
+        ELSE
+            -- Ping-pong slots: odd iterations write ping and read pong
+            SET curr_slot = IF(current_iteration % 2 = 1, 'ping', 'pong');
+            SET prev_slot = IF(current_iteration % 2 = 1, 'pong', 'ping');
+            {template_statements}
+        END IF;
+
+        SET changed = (
+            SELECT COALESCE(MAX(updated_count), 0)
+            FROM {stats_table}
+            WHERE iteration = current_iteration
+        );
+        SET current_iteration = current_iteration + 1;
+    END WHILE;{final_copy}
+
+    SELECT iteration, updated_count, time
+    FROM {stats_table}
+    WHERE iteration BETWEEN {{{{start_iteration}}}} AND current_iteration - 1
+    ORDER BY iteration;
+END"""
+
+
+def generate_frontier_seed_sql_databricks(
+    catalog: str, schema: str, canonical_id_name: str, prev_table: str
+) -> str:
+    """Seed the frontier from the first (full) iteration: followers it re-pointed plus their new leaders"""
+    diff_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_unify_loop_leader_diff")
+    frontier_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_unify_loop_frontier_keys")
+    pending_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_unify_loop_frontier_pending")
+
+    return f"""-- Frontier for the next iteration: followers re-pointed above and the leaders they moved to
+CREATE OR REPLACE TABLE {pending_table}
+USING DELTA
+AS
+SELECT DISTINCT follower_id, follower_ns FROM (
+    SELECT prev.follower_id, prev.follower_ns
+    FROM {prev_table} prev
+    INNER JOIN {diff_table} diff
+    ON prev.leader_id = diff.older_leader_id AND prev.leader_ns = diff.older_leader_ns
+
+    UNION ALL
+
+    SELECT older_leader_id as follower_id, older_leader_ns as follower_ns FROM {diff_table}
+
+    UNION ALL
+
+    SELECT newer_leader_id as follower_id, newer_leader_ns as follower_ns FROM {diff_table}
+) frontier;
+
+CREATE OR REPLACE TABLE {frontier_table}
+USING DELTA
+AS SELECT * FROM {pending_table};"""
+
+
+def generate_frontier_loop_iteration_sql_databricks(
+    catalog: str,
+    schema: str,
+    canonical_id_name: str,
+    iteration: Union[int, str],
+    priority_case_sql: str,
+    source_table_bitmask: bool = False,
+) -> str:
+    """
+    Generate one frontier-mode unify loop iteration.
+
+    Only followers that could still change are touched: the leader diff is computed over the
+    frontier (followers re-pointed by the previous iteration and their new leaders), the
+    followers attached to a re-pointed leader are re-aggregated, and the result is merged into
+    the persistent final graph table. The next frontier is staged in a pending table before the
+    MERGE, and every iteration reads frontier and pending together, so re-running an
+    interrupted iteration never loses followers.
+    """
+    graph_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_graph_unify_loop_final")
+    diff_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_unify_loop_leader_diff")
+    rows_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_unify_loop_frontier_rows")
+    frontier_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_unify_loop_frontier_keys")
+    pending_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_unify_loop_frontier_pending")
+    stats_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_unify_loop_stats")
+
+    def rows_with_leader_leader_cte(name: str, keys_sql: str) -> str:
+        # Same shape as prev_table_with_leader_leader, restricted to the given followers
+        return f"""{name}_rows AS (
+    SELECT
+        graph.follower_id, graph.follower_ns, graph.leader_id, graph.leader_ns,
+        graph.follower_first_seen_at, graph.follower_last_seen_at,
+        graph.follower_source_table_ids, graph.follower_last_processed_at
+    FROM {graph_table} graph
+    INNER JOIN ({keys_sql}) selected_keys
+    ON graph.follower_id = selected_keys.follower_id AND graph.follower_ns = selected_keys.follower_ns
+),
+{name}_with_leader_leader AS (
+    SELECT
+        follower_id, follower_ns, leader_id, leader_ns,
+        follower_first_seen_at, follower_last_seen_at,
+        follower_source_table_ids, follower_last_processed_at
+    FROM {name}_rows
+
+    UNION ALL
+
+    -- leader -> leader relationship for followers that lead other followers
+    SELECT
+        follower_id, follower_ns, follower_id as leader_id, follower_ns as leader_ns,
+        follower_first_seen_at, follower_last_seen_at,
+        follower_source_table_ids, follower_last_processed_at
+    FROM {name}_rows followers
+    WHERE EXISTS (
+        SELECT 1 FROM {graph_table} leaders
+        WHERE leaders.leader_id = followers.follower_id AND leaders.leader_ns = followers.follower_ns
+    )
+)"""
+
+    frontier_keys_sql = f"""
+        SELECT follower_id, follower_ns FROM {frontier_table}
+        UNION
+        SELECT follower_id, follower_ns FROM {pending_table}
+    """
+    affected_keys_sql = f"""
+        SELECT attached.follower_id, attached.follower_ns
+        FROM {graph_table} attached
+        INNER JOIN {diff_table} diff
+        ON attached.leader_id = diff.older_leader_id AND attached.leader_ns = diff.older_leader_ns
+        UNION
+        SELECT older_leader_id, older_leader_ns FROM {diff_table}
+    """
+
+    return f"""USE CATALOG {catalog};
+USE SCHEMA {schema};
+
+-- Leaders re-pointed in this iteration, found among the frontier followers only
+CREATE OR REPLACE TABLE {diff_table}
+USING DELTA
+AS
+WITH {rows_with_leader_leader_cte("frontier", frontier_keys_sql)}
+SELECT DISTINCT
+    older_leader.ns_prio as older_leader_ns,
+    older_leader.id as older_leader_id,
+    newer_leader.ns_prio as newer_leader_ns,
+    newer_leader.id as newer_leader_id
+FROM (
+    SELECT
+        older_leader,
+        MIN(newer_leader) as newer_leader
+    FROM (
+        SELECT
+            leader as older_leader,
+            MIN(leader) OVER (PARTITION BY follower_id, follower_ns) as newer_leader
+        FROM (
+            SELECT
+                follower_id, follower_ns,
+                STRUCT(
+                    {priority_case_sql} AS ns_prio, 
+                    leader_id AS id
+                ) as leader
+            FROM frontier_with_leader_leader
+        ) rs
+    ) wsrs
+    WHERE older_leader > newer_leader
+    GROUP BY older_leader
+) diffrs;
+
+-- Re-aggregate every follower attached to a re-pointed leader
+CREATE OR REPLACE TABLE {rows_table}
+USING DELTA
+AS
+WITH {rows_with_leader_leader_cte("affected", affected_keys_sql)}
+SELECT
+    follower_id, follower_ns, leader_id, leader_ns,
+    MIN(follower_first_seen_at) as follower_first_seen_at,
+    MAX(follower_last_seen_at) as follower_last_seen_at,
+    {source_table_ids_merge_sql_databricks('follower_source_table_ids', source_table_bitmask)} as follower_source_table_ids,
+    MAX(follower_last_processed_at) as follower_last_processed_at
+FROM (
+    SELECT
+        prev.follower_id, prev.follower_ns,
+        COALESCE(diff.newer_leader_id, prev.leader_id) as leader_id,
+        COALESCE(diff.newer_leader_ns, prev.leader_ns) as leader_ns,
+        prev.follower_first_seen_at, prev.follower_last_seen_at,
+        prev.follower_source_table_ids,
+        CASE WHEN diff.newer_leader_id IS NULL 
+             THEN prev.follower_last_processed_at 
+             ELSE UNIX_TIMESTAMP() 
+        END as follower_last_processed_at
+    FROM affected_with_leader_leader prev
+    LEFT JOIN {diff_table} diff
+    ON prev.leader_id = diff.older_leader_id AND prev.leader_ns = diff.older_leader_ns
+) lp
+GROUP BY follower_id, follower_ns, leader_id, leader_ns;
+
+-- Stage the next frontier before touching the graph
+CREATE OR REPLACE TABLE {pending_table}
+USING DELTA
+AS
+SELECT follower_id, follower_ns FROM {rows_table}
+UNION
+SELECT newer_leader_id as follower_id, newer_leader_ns as follower_ns FROM {diff_table};
+
+-- Replace the rows of every re-aggregated follower in one atomic MERGE
+MERGE INTO {graph_table} graph
+USING (
+    SELECT
+        follower_id, follower_ns, leader_id, leader_ns,
+        follower_first_seen_at, follower_last_seen_at,
+        follower_source_table_ids, follower_last_processed_at,
+        FALSE as is_deleted
+    FROM {rows_table}
+
+    UNION ALL
+
+    SELECT
+        graph.follower_id, graph.follower_ns, graph.leader_id, graph.leader_ns,
+        graph.follower_first_seen_at, graph.follower_last_seen_at,
+        graph.follower_source_table_ids, graph.follower_last_processed_at,
+        TRUE as is_deleted
+    FROM {graph_table} graph
+    WHERE EXISTS (
+        SELECT 1 FROM {rows_table} staged
+        WHERE staged.follower_id = graph.follower_id AND staged.follower_ns = graph.follower_ns
+    )
+    AND NOT EXISTS (
+        SELECT 1 FROM {rows_table} staged
+        WHERE staged.follower_id = graph.follower_id AND staged.follower_ns = graph.follower_ns
+        AND staged.leader_id = graph.leader_id AND staged.leader_ns = graph.leader_ns
+    )
+) changes
+ON graph.follower_id = changes.follower_id AND graph.follower_ns = changes.follower_ns
+AND graph.leader_id = changes.leader_id AND graph.leader_ns = changes.leader_ns
+WHEN MATCHED AND changes.is_deleted THEN DELETE
+WHEN MATCHED THEN UPDATE SET
+    follower_first_seen_at = changes.follower_first_seen_at,
+    follower_last_seen_at = changes.follower_last_seen_at,
+    follower_source_table_ids = changes.follower_source_table_ids,
+    follower_last_processed_at = changes.follower_last_processed_at
+WHEN NOT MATCHED AND NOT changes.is_deleted THEN INSERT (
+    follower_id, follower_ns, leader_id, leader_ns,
+    follower_first_seen_at, follower_last_seen_at,
+    follower_source_table_ids, follower_last_processed_at
+) VALUES (
+    changes.follower_id, changes.follower_ns, changes.leader_id, changes.leader_ns,
+    changes.follower_first_seen_at, changes.follower_last_seen_at,
+    changes.follower_source_table_ids, changes.follower_last_processed_at
+);
+
+CREATE OR REPLACE TABLE {frontier_table}
+USING DELTA
+AS SELECT * FROM {pending_table};
+
+-- Record iteration stats (read by the executor instead of an EXCEPT scan)
+DELETE FROM {stats_table} WHERE iteration = {iteration};
+
+INSERT INTO {stats_table}
+SELECT {iteration} as iteration, COUNT(*) as updated_count, UNIX_TIMESTAMP() as time
+FROM {diff_table};"""
+
+
+def generate_lookup_select_sql_databricks(
+    graph_table: str,
+    keys_table: str,
+    key_mask_values: List[str],
+    source_table_count: Optional[int] = None,
+) -> str:
+    """
+    SELECT producing <canonical_id>_lookup rows from a converged graph table;
+    keys_table maps key_type to key_name. With source_table_count, the graph's
+    follower_source_table_ids is a bitmask and is expanded back into an array
+    """
+    source_table_ids_sql = "follower_source_table_ids"
+    if source_table_count:
+        source_table_ids_sql = (
+            f"FILTER(SEQUENCE(CAST(1 AS BIGINT), {source_table_count}), "
+            f"table_id -> (follower_source_table_ids & SHIFTLEFT(CAST(1 AS BIGINT), CAST(table_id - 1 AS INT))) <> 0)"
+        )
+    return f"""SELECT
+    -- Generate canonical_id using the same logic as Presto with proper BIGINT handling
+    replace(replace(replace(
+        base64(
+            concat(
+                -- First 8 bytes: XOR of hash with key_mask using bitwise operations on smaller chunks
+                unhex(concat(
+                    lpad(upper(conv(
+                        cast(conv(substr(sha2(graph.leader_id, 256), 1, 8), 16, 10) as long) ^
+                        cast(conv(substr(leader_keys.key_mask, 1, 8), 16, 10) as long), 10, 16
+                    )), 8, '0'),
+                    lpad(upper(conv(
+                        cast(conv(substr(sha2(graph.leader_id, 256), 9, 8), 16, 10) as long) ^
+                        cast(conv(substr(leader_keys.key_mask, 9, 8), 16, 10) as long), 10, 16
+                    )), 8, '0')
+                )),
+                -- Last byte: key_mask_high8b
+                unhex(substr(leader_keys.key_mask, 17, 2))
+            )
+        ), '+', '-'), '/', '_'), '=', ''
+    ) as canonical_id,
+    follower_id as id,
+    follower_ns as id_key_type,
+    canonical_id_first_seen_at,
+    canonical_id_last_seen_at,
+    follower_first_seen_at as id_first_seen_at,
+    follower_last_seen_at as id_last_seen_at,
+    {source_table_ids_sql} as id_source_table_ids,
+    follower_last_processed_at as id_last_processed_at
+FROM {graph_table} graph
+JOIN (
+    SELECT
+        keys.key_type,
+        keys.key_name,
+        masks.key_mask
+    FROM {keys_table} keys
+    JOIN (
+        SELECT * FROM VALUES
+            {', '.join(key_mask_values)}
+        AS t (key_type, key_mask)
+    ) masks ON keys.key_type = masks.key_type
+) leader_keys ON leader_keys.key_type = graph.leader_ns
+JOIN (
+    SELECT
+        leader_id, leader_ns,
+        MIN(follower_first_seen_at) AS canonical_id_first_seen_at,
+        MAX(follower_last_seen_at) AS canonical_id_last_seen_at
+    FROM {graph_table}
+    GROUP BY leader_id, leader_ns
+) canonical_ids ON canonical_ids.leader_id = graph.leader_id
+                AND canonical_ids.leader_ns = graph.leader_ns"""
+
+
+def build_enrich_key_cases_databricks(
+    table: Dict[str, Any], keys_config: List[Dict[str, Any]], merge_keys: List[str]
+) -> Optional[Tuple[str, str, str]]:
+    """
+    CASE branches picking a source row's first valid merge key, as used by the
+    enrich step: the hashed canonical id fallback, the id and the key type.
+    None when the table has no merge key columns
+    """
+    key_name_to_ns = {key: i + 1 for i, key in enumerate(merge_keys)}
+    key_name_to_config = {key["name"]: key for key in keys_config}
+
+    # Build conditions and lookup logic for all keys
+    key_conditions = []
+    key_hash_expressions = []
+    join_id_conditions = []
+    join_key_type_conditions = []
+    
+    # Generate key masks for all merge keys
+    key_masks = generate_key_mask_values(len(merge_keys))
+    key_name_to_mask = {}
+    for i, key_name in enumerate(merge_keys):
+        key_name_to_mask[key_name] = key_masks[i]
+
+    for key_col in table["key_columns"]:
+        if key_col["key"] in merge_keys:
+            column = key_col["column"]
+            key_name = key_col["key"]
+            key_config = key_name_to_config.get(key_name, {})
+            key_ns = key_name_to_ns.get(key_name)
+            key_mask = key_name_to_mask.get(key_name)
+
+            # Use proper validation with regexp and invalid_texts
+            condition = format_validation_condition(
+                column, 
+                key_config.get("invalid_texts", []),
+                key_config.get("valid_regexp")
+            )
+            
+            # Build WHEN clause for canonical_id CASE statement with key-specific mask
+            hash_expr = build_id_hash_expression_databricks(
+                f"CAST(p.{column} AS STRING)",
+                key_mask
+            )
+            key_hash_expressions.append(f"WHEN {condition}\n      THEN {hash_expr}")
+            
+            # Build WHEN clauses for JOIN conditions
+            join_id_conditions.append(f"WHEN {condition}\n    THEN CAST(p.{column} AS STRING)")
+            join_key_type_conditions.append(f"WHEN {condition}\n    THEN {key_ns}")
+
+    if not key_hash_expressions:
+        return None
+
+    canonical_id_case = "\n      ".join(key_hash_expressions) + "\n      ELSE NULL"
+    join_id_case = "\n    ".join(join_id_conditions) + "\n    ELSE NULL"
+    join_key_type_case = "\n    ".join(join_key_type_conditions) + "\n    ELSE NULL"
+    return canonical_id_case, join_id_case, join_key_type_case
+
+
+def build_master_select_parts_databricks(
+    master: Dict[str, Any], tables_config: List[Dict[str, Any]], catalog: str, schema: str
+) -> Optional[Tuple[str, str]]:
+    """
+    UNION ALL over the enriched tables and the per-attribute aggregates of a
+    master table. None when no enriched table feeds its attributes
+    """
+    canonical_id = master["canonical_id"]
+    attributes = master.get("attributes", [])
+
+    # Build mapping of all tables that have enriched versions
+    enriched_table_map = {}
+    for table in tables_config:
+        table_name = table["table"]
+        # Handle table name mapping for enriched tables
+        clean_table_name = table_name.split('.')[-1]
+        if clean_table_name == 'kris_src_orders':
+            clean_table_name = 'orders'  # Match TD's naming
+        enriched_table_map[clean_table_name] = format_catalog_table(catalog, schema, f"enriched_{table_name}")
+        enriched_table_map[table_name] = format_catalog_table(catalog, schema, f"enriched_{table_name}")
+
+    # Build attribute column mapping - collect all attr_name + priority combinations
+    all_attr_columns = []
+    for attr in attributes:
+        attr_name = attr["name"]
+        source_columns = attr.get("source_columns", [])
+        
+        for i, source_col in enumerate(source_columns):
+            priority = source_col.get("priority", i + 1)
+            all_attr_columns.append(f"{attr_name}_p{priority}_attr")
+            all_attr_columns.append(f"{attr_name}_p{priority}_order")
+
+    # Build UNION ALL queries for each enriched table
+    union_queries = []
+    
+    # Get all unique table names from attributes
+    tables_with_attributes = set()
+    for attr in attributes:
+        for source_col in attr.get("source_columns", []):
+            tables_with_attributes.add(source_col["table"])
+
+    for table_name in tables_with_attributes:
+        if table_name not in enriched_table_map:
+            continue
+            
+        enriched_table = enriched_table_map[table_name]
+        
+        # Build SELECT columns for this table
+        select_columns = [canonical_id]
+        
+        for attr in attributes:
+            attr_name = attr["name"]
+            source_columns = attr.get("source_columns", [])
+            
+            for i, source_col in enumerate(source_columns):
+                priority = source_col.get("priority", i + 1)
+                attr_col = f"{attr_name}_p{priority}_attr"
+                order_col = f"{attr_name}_p{priority}_order"
+                
+                if source_col["table"] == table_name:
+                    # This table contributes to this attribute at this priority
+                    column_name = source_col["column"]
+                    order_by = source_col.get("order_by", "time")
+                    select_columns.append(f"{column_name} as {attr_col}")
+                    select_columns.append(f"{order_by} as {order_col}")
+                else:
+                    # This table doesn't contribute to this attribute at this priority
+                    select_columns.append(f"CAST(NULL AS STRING) as {attr_col}")
+                    select_columns.append(f"CAST(NULL AS BIGINT) as {order_col}")
+        
+        select_columns_str = ',\n            '.join(select_columns)
+        union_query = f"""SELECT
+            {select_columns_str}
+        FROM {enriched_table}
+        WHERE {canonical_id} IS NOT NULL"""
+        
+        union_queries.append(union_query)
+
+    if not union_queries:
+        return None
+
+    union_sql = "\n\n        UNION ALL\n        \n        ".join(union_queries)
+
+    # Build attribute selection logic
+    attr_selections = [canonical_id]
+    
+    for attr in attributes:
+        attr_name = attr["name"]
+        source_columns = attr.get("source_columns", [])
+        array_elements = attr.get("array_elements")
+        
+        if array_elements:
+            # Array attribute (e.g., top_3_emails)
+            array_parts = []
+            for i, source_col in enumerate(source_columns):
+                priority = source_col.get("priority", i + 1)
+                attr_col = f"{attr_name}_p{priority}_attr"
+                order_col = f"{attr_name}_p{priority}_order"
+                
+                array_parts.append(f"""COALESCE(
+                    FILTER(
+                        TRANSFORM(
+                            COLLECT_LIST(CASE WHEN {attr_col} IS NOT NULL THEN NAMED_STRUCT('order_val', {order_col}, 'attr_val', {attr_col}) END),
+                            x -> x.attr_val
+                        ),
+                        x -> x IS NOT NULL
+                    ),
+                    ARRAY()
+                )""")
+            
+            array_parts_str = ',\n                '.join(array_parts)
+            attr_selection = f"""SLICE(
+            CONCAT(
+                {array_parts_str}
+            ),
+            1, {array_elements}
+        ) AS {attr_name}"""
+        else:
+            # Single value attribute
+            if len(source_columns) == 1:
+                # Single source
+                priority = source_columns[0].get("priority", 1)
+                attr_col = f"{attr_name}_p{priority}_attr"
+                order_col = f"{attr_name}_p{priority}_order"
+                attr_selection = f"MAX(CASE WHEN {attr_col} IS NOT NULL THEN NAMED_STRUCT('order_val', {order_col}, 'attr_val', {attr_col}) END).attr_val AS {attr_name}"
+            else:
+                # Multiple sources with COALESCE
+                coalesce_parts = []
+                for i, source_col in enumerate(source_columns):
+                    priority = source_col.get("priority", i + 1)
+                    attr_col = f"{attr_name}_p{priority}_attr"
+                    order_col = f"{attr_name}_p{priority}_order"
+                    coalesce_parts.append(f"MAX(CASE WHEN {attr_col} IS NOT NULL THEN NAMED_STRUCT('order_val', {order_col}, 'attr_val', {attr_col}) END).attr_val")
+                
+                coalesce_parts_str = ',\n            '.join(coalesce_parts)
+                attr_selection = f"""COALESCE(
+            {coalesce_parts_str}
+        ) AS {attr_name}"""
+        
+        attr_selections.append(attr_selection)
+
+    attr_selections_str = ',\n        '.join(attr_selections)
+    return union_sql, attr_selections_str
 
 
 def generate_workflow_sql_databricks(
-    yaml_data: Dict[str, Any], catalog: str, schema: str, src_catalog: str, src_schema: str, fix_syntax: bool = True
+    yaml_data: Dict[str, Any],
+    catalog: str,
+    schema: str,
+    src_catalog: str,
+    src_schema: str,
+    fix_syntax: bool = True,
+    loop_mode: str = "full",
+    loop_tables: str = "per-iteration",
+    loop_runner: str = "client",
+    loop_iterations: Optional[int] = None,
+    incremental: bool = False,
+    warm_start: bool = False,
+    surrogate_ids: bool = False,
+    source_table_bitmask: bool = False,
 ) -> List[Tuple[str, str]]:
-    """Generate all Databricks SQL steps based on YAML configuration"""
+    """
+    Generate all Databricks SQL steps based on YAML configuration
+    incremental keeps the graph between runs and only extracts source rows
+    newer than the per-table watermarks of the previous run; warm_start seeds
+    iteration 0 with the previous run's converged graph; surrogate_ids runs the
+    unify loop on BIGINT ids and joins the string ids back in canonicalization;
+    source_table_bitmask carries follower_source_table_ids as a BIGINT bitmask
+    through the graph tables, expanded back into an array in the lookup
+    """
     sql_files: List[Tuple[str, str]] = []
 
     keys_config = yaml_data["keys"]
@@ -336,28 +1291,83 @@ def generate_workflow_sql_databricks(
     canonical_id_name = get_canonical_id_name(yaml_data)
 
     # Calculate max iterations dynamically
-    max_iterations = calculate_max_iterations(yaml_data)
+    max_iterations = loop_iterations or calculate_max_iterations(yaml_data)
 
     # Assign table IDs
     for idx, table in enumerate(tables_config, 1):
         table["table_id"] = idx
+    if source_table_bitmask and len(tables_config) > MAX_BITMASK_SOURCE_TABLES:
+        raise ValueError(
+            f"A source table bitmask holds at most {MAX_BITMASK_SOURCE_TABLES} tables, "
+            f"the configuration has {len(tables_config)}"
+        )
+    if source_table_bitmask:
+        source_table_ids_type = "BIGINT"
+        source_table_ids_agg = "BIT_OR(SHIFTLEFT(CAST(1 AS BIGINT), follower_source_table_id - 1))"
+        source_table_ids_union = "graph.follower_source_table_ids | edges.follower_source_table_ids"
+    else:
+        source_table_ids_type = "ARRAY<BIGINT>"
+        source_table_ids_agg = "COLLECT_LIST(DISTINCT follower_source_table_id)"
+        source_table_ids_union = "ARRAY_UNION(graph.follower_source_table_ids, edges.follower_source_table_ids)"
 
     # 01: Create main graph table using Delta
     graph_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_graph_unify_loop_0")
+    loop_stats_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_unify_loop_stats")
+    watermarks_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_watermarks")
+    create_graph = "CREATE TABLE IF NOT EXISTS" if incremental else "CREATE OR REPLACE TABLE"
     create_graph_sql = f"""USE CATALOG {catalog};
 USE SCHEMA {schema};
 
-CREATE OR REPLACE TABLE {graph_table} (
+{create_graph} {graph_table} (
     follower_id STRING,
     follower_ns BIGINT,
     leader_id STRING,
     leader_ns BIGINT,
     follower_first_seen_at BIGINT,
     follower_last_seen_at BIGINT,
-    follower_source_table_ids ARRAY<BIGINT>,
+    follower_source_table_ids {source_table_ids_type},
     follower_last_processed_at BIGINT
 ) USING DELTA
-CLUSTER BY (follower_id);"""
+CLUSTER BY (follower_id);
+
+CREATE OR REPLACE TABLE {loop_stats_table} (
+    iteration INT,
+    updated_count BIGINT,
+    time BIGINT
+) USING DELTA;"""
+
+    if incremental:
+        create_graph_sql += f"""
+
+CREATE TABLE IF NOT EXISTS {watermarks_table} (
+    source_table STRING,
+    source_table_id BIGINT,
+    max_time BIGINT,
+    updated_at BIGINT
+) USING DELTA;"""
+
+    # Pairs a warm start adds to the edge table are recorded so they can be taken out again
+    warm_start_seed_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_warm_start_seed")
+    if warm_start:
+        create_graph_sql += f"""
+
+CREATE TABLE IF NOT EXISTS {warm_start_seed_table} (
+    follower_id STRING,
+    follower_ns BIGINT,
+    leader_id STRING,
+    leader_ns BIGINT
+) USING DELTA;
+
+-- Drop pairs an interrupted warm start left in the edge table
+MERGE INTO {graph_table} graph
+USING {warm_start_seed_table} seeded
+ON graph.follower_id = seeded.follower_id
+    AND graph.follower_ns = seeded.follower_ns
+    AND graph.leader_id = seeded.leader_id
+    AND graph.leader_ns = seeded.leader_ns
+WHEN MATCHED THEN DELETE;
+
+DELETE FROM {warm_start_seed_table};"""
 
     sql_files.append(("01_create_graph", create_graph_sql))
 
@@ -366,7 +1376,8 @@ CLUSTER BY (follower_id);"""
     for table in tables_config:
         extract_blocks.append(
             generate_extract_sql_databricks(
-                table, keys_config, merge_keys, table["table_id"], catalog, schema, src_catalog, src_schema
+                table, keys_config, merge_keys, table["table_id"], catalog, schema, src_catalog, src_schema,
+                watermarks_table if incremental else None,
             )
         )
 
@@ -376,12 +1387,9 @@ CLUSTER BY (follower_id);"""
         )
     )
 
-    extract_merge_sql = f"""USE CATALOG {catalog};
-USE SCHEMA {schema};
-
--- Task: Extract and merge data
-INSERT INTO {graph_table}
-SELECT
+    def edges_sql(records_sql: str) -> str:
+        # One row per (follower, leader) pair: every id of a record follows the record's first id
+        return f"""SELECT
     follower_id,
     follower_ns,
     exploded_leaders.id as leader_id,
@@ -395,7 +1403,7 @@ FROM (
         follower_id,
         follower_ns,
         COLLECT_LIST(DISTINCT STRUCT(leader_id AS id, leader_ns AS ns)) as leaders,
-        COLLECT_LIST(DISTINCT follower_source_table_id) as follower_source_table_ids,
+        {source_table_ids_agg} as follower_source_table_ids,
         MIN(follower_first_seen_at) as follower_first_seen_at,
         MAX(follower_last_seen_at) as follower_last_seen_at,
         MAX(follower_last_processed_at) as follower_last_processed_at
@@ -409,18 +1417,123 @@ FROM (
             time as follower_last_seen_at,
             source_table_id as follower_source_table_id,
             UNIX_TIMESTAMP() as follower_last_processed_at
-        FROM (
-            {union_sql}
-        ) extracted_records_id_arrays
+        FROM {records_sql} extracted_records_id_arrays
         LATERAL VIEW EXPLODE(id_ns_array) exploded_table AS f
         WHERE SIZE(id_ns_array) > 0
     ) extracted_flat_leader_follower_pairs
     GROUP BY follower_id, follower_ns
 ) followers
-LATERAL VIEW EXPLODE(leaders) exploded_leaders_table AS exploded_leaders;"""
+LATERAL VIEW EXPLODE(leaders) exploded_leaders_table AS exploded_leaders"""
+
+    if not incremental:
+        records_sql = f"""(
+            {union_sql}
+        )"""
+        extract_merge_sql = f"""USE CATALOG {catalog};
+USE SCHEMA {schema};
+
+-- Task: Extract and merge data
+INSERT INTO {graph_table}
+{edges_sql(records_sql)};"""
+    else:
+        delta_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_extract_delta")
+        source_table_cases = "\n        ".join(
+            f"WHEN {table['table_id']} THEN '{src_catalog}.{src_schema}.{table['table']}'"
+            for table in tables_config
+        )
+        extract_merge_sql = f"""USE CATALOG {catalog};
+USE SCHEMA {schema};
+
+-- Task: Extract source rows at or after each table's watermark
+CREATE OR REPLACE TABLE {delta_table}
+USING DELTA
+AS
+SELECT id_ns_array, time, source_table_id
+FROM (
+            {union_sql}
+) extracted_records;
+
+-- Task: Merge the new edges into the graph kept from previous runs
+MERGE INTO {graph_table} graph
+USING (
+{edges_sql(delta_table)}
+) edges
+ON graph.follower_id = edges.follower_id
+    AND graph.follower_ns = edges.follower_ns
+    AND graph.leader_id = edges.leader_id
+    AND graph.leader_ns = edges.leader_ns
+WHEN MATCHED THEN UPDATE SET
+    follower_first_seen_at = LEAST(graph.follower_first_seen_at, edges.follower_first_seen_at),
+    follower_last_seen_at = GREATEST(graph.follower_last_seen_at, edges.follower_last_seen_at),
+    follower_source_table_ids = {source_table_ids_union},
+    follower_last_processed_at = edges.follower_last_processed_at
+WHEN NOT MATCHED THEN INSERT (
+    follower_id, follower_ns, leader_id, leader_ns, follower_first_seen_at,
+    follower_last_seen_at, follower_source_table_ids, follower_last_processed_at
+) VALUES (
+    edges.follower_id, edges.follower_ns, edges.leader_id, edges.leader_ns, edges.follower_first_seen_at,
+    edges.follower_last_seen_at, edges.follower_source_table_ids, edges.follower_last_processed_at
+);
+
+-- Task: Advance each source table's watermark to the newest row extracted above
+MERGE INTO {watermarks_table} watermarks
+USING (
+    SELECT
+        CASE source_table_id
+        {source_table_cases}
+        END as source_table,
+        source_table_id,
+        MAX(time) as max_time
+    FROM {delta_table}
+    GROUP BY source_table_id
+    HAVING MAX(time) IS NOT NULL
+) extracted
+ON watermarks.source_table = extracted.source_table
+WHEN MATCHED THEN UPDATE SET
+    source_table_id = extracted.source_table_id,
+    max_time = GREATEST(watermarks.max_time, extracted.max_time),
+    updated_at = UNIX_TIMESTAMP()
+WHEN NOT MATCHED THEN INSERT (source_table, source_table_id, max_time, updated_at)
+VALUES (extracted.source_table, extracted.source_table_id, extracted.max_time, UNIX_TIMESTAMP());"""
 
     sql_files.append(("02_extract_merge", extract_merge_sql))
 
+    # 02: Warm start - the executor skips this step when the previous graph is missing
+    # or was built with other keys or priorities (see the fingerprint header)
+    key_fingerprint = get_key_fingerprint(yaml_data, surrogate_ids, source_table_bitmask)
+    if warm_start:
+        previous_graph_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_graph")
+        warm_start_sql = f"""-- warm_start: fingerprint={key_fingerprint}
+USE CATALOG {catalog};
+USE SCHEMA {schema};
+
+-- Task: Record the previous run's pairs that are not extracted edges; 05_canonicalize removes them
+INSERT INTO {warm_start_seed_table}
+SELECT previous.follower_id, previous.follower_ns, previous.leader_id, previous.leader_ns
+FROM {previous_graph_table} previous
+LEFT ANTI JOIN {graph_table} graph
+    ON graph.follower_id = previous.follower_id
+    AND graph.follower_ns = previous.follower_ns
+    AND graph.leader_id = previous.leader_id
+    AND graph.leader_ns = previous.leader_ns;
+
+-- Task: Seed iteration 0 with the previous run's converged follower -> leader pairs
+MERGE INTO {graph_table} graph
+USING {previous_graph_table} previous
+ON graph.follower_id = previous.follower_id
+    AND graph.follower_ns = previous.follower_ns
+    AND graph.leader_id = previous.leader_id
+    AND graph.leader_ns = previous.leader_ns
+WHEN NOT MATCHED THEN INSERT (
+    follower_id, follower_ns, leader_id, leader_ns, follower_first_seen_at,
+    follower_last_seen_at, follower_source_table_ids, follower_last_processed_at
+) VALUES (
+    previous.follower_id, previous.follower_ns, previous.leader_id, previous.leader_ns,
+    previous.follower_first_seen_at, previous.follower_last_seen_at,
+    previous.follower_source_table_ids, previous.follower_last_processed_at
+);"""
+        sql_files.append(("02_warm_start_seed", warm_start_sql))
+
     # 03: Source key statistics - matching TD Presto structure
     source_stats_table = format_catalog_table(
         catalog, schema, f"{canonical_id_name}_source_key_stats"
@@ -436,7 +1549,10 @@ LATERAL VIEW EXPLODE(leaders) exploded_leaders_table AS exploded_leaders;"""
         table_id = table["table_id"]
         table_name = table["table"]
         table_names.append(table_name)
-        table_flag_exprs.append(f"BOOL_OR(ARRAY_CONTAINS(follower_source_table_ids, {table_id})) as from_{table_name}")
+        table_flag_exprs.append(
+            f"BOOL_OR({source_table_ids_contains_sql_databricks('follower_source_table_ids', table_id, source_table_bitmask)})"
+            f" as from_{table_name}"
+        )
         grouping_sets_items.append(f"(from_{table_name})")
         case_conditions.append(f"WHEN from_{table_name} THEN '{table_name}'")
     
@@ -524,12 +1640,79 @@ ON leader_stats.from_table = follower_stats.from_table;"""
 
     sql_files.append(("03_source_key_stats", source_stats_sql))
 
+    # 03: Surrogate id dictionary - the loop joins, groups and compares BIGINTs instead of strings
+    id_dictionary_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_id_dictionary")
+    surrogate_graph_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_graph_surrogate_0")
+    id_type = "BIGINT" if surrogate_ids else "STRING"
+    if surrogate_ids:
+        id_dictionary_sql = f"""USE CATALOG {catalog};
+USE SCHEMA {schema};
+
+-- Surrogates are ranks in (id, ns) order, so the loop picks the same leaders as on the
+-- strings. Ranks are numbered per two-character prefix and offset by the sizes of the
+-- preceding prefixes, which keeps the numbering distributed
+CREATE OR REPLACE TABLE {id_dictionary_table}
+USING DELTA
+CLUSTER BY (id)
+AS
+WITH ids AS (
+    SELECT follower_id AS id, follower_ns AS ns FROM {graph_table}
+    UNION
+    SELECT leader_id AS id, leader_ns AS ns FROM {graph_table}
+),
+buckets AS (
+    SELECT SUBSTR(id, 1, 2) AS bucket, COUNT(*) AS bucket_size
+    FROM ids
+    GROUP BY SUBSTR(id, 1, 2)
+),
+offsets AS (
+    SELECT bucket, SUM(bucket_size) OVER (ORDER BY bucket) - bucket_size AS bucket_offset
+    FROM buckets
+)
+SELECT
+    offsets.bucket_offset
+        + ROW_NUMBER() OVER (PARTITION BY offsets.bucket ORDER BY ids.id, ids.ns) AS surrogate_id,
+    ids.id,
+    ids.ns
+FROM ids
+JOIN offsets ON offsets.bucket = SUBSTR(ids.id, 1, 2);
+
+-- Iteration 0 on surrogate ids
+CREATE OR REPLACE TABLE {surrogate_graph_table}
+USING DELTA
+CLUSTER BY (follower_id)
+AS
+SELECT
+    followers.surrogate_id AS follower_id,
+    graph.follower_ns,
+    leaders.surrogate_id AS leader_id,
+    graph.leader_ns,
+    graph.follower_first_seen_at,
+    graph.follower_last_seen_at,
+    graph.follower_source_table_ids,
+    graph.follower_last_processed_at
+FROM {graph_table} graph
+JOIN {id_dictionary_table} followers
+    ON followers.id = graph.follower_id AND followers.ns = graph.follower_ns
+JOIN {id_dictionary_table} leaders
+    ON leaders.id = graph.leader_id AND leaders.ns = graph.leader_ns;"""
+
+        sql_files.append(("03_id_dictionary", id_dictionary_sql))
+
     # 04: Unification loop iterations (dynamic count)
-    prev_table = graph_table
+    final_loop_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_graph_unify_loop_final")
+    loop_header = generate_unify_loop_header(canonical_id_name, loop_mode, loop_tables, loop_runner)
+    prev_table = surrogate_graph_table if surrogate_ids else graph_table
     for i in range(1, max_iterations + 1):
-        curr_table = format_catalog_table(
-            catalog, schema, f"{canonical_id_name}_graph_unify_loop_{i}"
-        )
+        if loop_tables == "ping-pong":
+            # Alternate between two working tables instead of one table per iteration
+            curr_table = format_catalog_table(
+                catalog, schema, f"{canonical_id_name}_graph_unify_loop_{'ping' if i % 2 else 'pong'}"
+            )
+        else:
+            curr_table = format_catalog_table(
+                catalog, schema, f"{canonical_id_name}_graph_unify_loop_{i}"
+            )
 
         # Build priority array mapping to replicate TD's array[1,2,3][leader_ns] logic
         # TD's array[1,2,3] means: ns=1→priority=1, ns=2→priority=2, ns=3→priority=3
@@ -548,102 +1731,74 @@ ON leader_stats.from_table = follower_stats.from_table;"""
                 ELSE leader_ns 
             END"""
 
-        loop_sql = f"""USE CATALOG {catalog};
-USE SCHEMA {schema};
-
-CREATE OR REPLACE TABLE {curr_table} (
-    follower_id STRING,
-    follower_ns BIGINT,
-    leader_id STRING,
-    leader_ns BIGINT,
-    follower_first_seen_at BIGINT,
-    follower_last_seen_at BIGINT,
-    follower_source_table_ids ARRAY<BIGINT>,
-    follower_last_processed_at BIGINT
-) USING DELTA
-CLUSTER BY (follower_id);
-
-INSERT INTO {curr_table}
-WITH prev_table_with_leader_leader AS (
-    SELECT
-        follower_id, follower_ns, leader_id, leader_ns,
-        follower_first_seen_at, follower_last_seen_at,
-        follower_source_table_ids, follower_last_processed_at
-    FROM {prev_table}
-    
-    UNION ALL
-    
-    -- leader -> leader relationship (corrected mapping)
-    SELECT
-        follower_id, follower_ns, leader_id, leader_ns,
-        follower_first_seen_at, follower_last_seen_at,
-        follower_source_table_ids, follower_last_processed_at
-    FROM (
-        SELECT DISTINCT leader_id, leader_ns FROM {prev_table}
-    ) prev_leaders
-    INNER JOIN (
-        SELECT
-            follower_id, follower_ns,
-            follower_first_seen_at, follower_last_seen_at,
-            follower_source_table_ids, follower_last_processed_at
-        FROM {prev_table}
-    ) prev_followers
-    ON prev_leaders.leader_id = prev_followers.follower_id 
-    AND prev_leaders.leader_ns = prev_followers.follower_ns
-)
-SELECT
-    follower_id, follower_ns, leader_id, leader_ns,
-    MIN(follower_first_seen_at) as follower_first_seen_at,
-    MAX(follower_last_seen_at) as follower_last_seen_at,
-    ARRAY_DISTINCT(FLATTEN(COLLECT_LIST(follower_source_table_ids))) as follower_source_table_ids,
-    MAX(follower_last_processed_at) as follower_last_processed_at
-FROM (
-    SELECT
-        prev.follower_id, prev.follower_ns,
-        COALESCE(diff.newer_leader_id, prev.leader_id) as leader_id,
-        COALESCE(diff.newer_leader_ns, prev.leader_ns) as leader_ns,
-        prev.follower_first_seen_at, prev.follower_last_seen_at,
-        prev.follower_source_table_ids,
-        CASE WHEN diff.newer_leader_id IS NULL 
-             THEN prev.follower_last_processed_at 
-             ELSE UNIX_TIMESTAMP() 
-        END as follower_last_processed_at
-    FROM prev_table_with_leader_leader prev
-    LEFT JOIN (
-        SELECT DISTINCT
-            older_leader.ns_prio as older_leader_ns,
-            older_leader.id as older_leader_id,
-            newer_leader.ns_prio as newer_leader_ns,
-            newer_leader.id as newer_leader_id
-        FROM (
-            SELECT
-                older_leader,
-                MIN(newer_leader) as newer_leader
-            FROM (
-                SELECT
-                    leader as older_leader,
-                    MIN(leader) OVER (PARTITION BY follower_id, follower_ns) as newer_leader
-                FROM (
-                    SELECT
-                        follower_id, follower_ns,
-                        STRUCT(
-                            {priority_case_sql} AS ns_prio, 
-                            leader_id AS id
-                        ) as leader
-                    FROM prev_table_with_leader_leader
-                ) rs
-            ) wsrs
-            WHERE older_leader > newer_leader
-            GROUP BY older_leader
-        ) diffrs
-    ) diff
-    ON prev.leader_id = diff.older_leader_id AND prev.leader_ns = diff.older_leader_ns
-) lp
-GROUP BY follower_id, follower_ns, leader_id, leader_ns;"""
+        if loop_mode == "frontier" and i == 1:
+            # First pass is a full iteration written straight into the persistent graph
+            loop_sql = generate_unify_loop_iteration_sql_databricks(
+                catalog, schema, canonical_id_name, i, prev_table, final_loop_table, priority_case_sql,
+                id_type=id_type,
+                source_table_bitmask=source_table_bitmask,
+            )
+            loop_sql += "\n\n" + generate_frontier_seed_sql_databricks(catalog, schema, canonical_id_name, prev_table)
+        elif loop_mode == "frontier":
+            loop_sql = generate_frontier_loop_iteration_sql_databricks(
+                catalog, schema, canonical_id_name, i, priority_case_sql,
+                source_table_bitmask=source_table_bitmask,
+            )
+        else:
+            loop_sql = generate_unify_loop_iteration_sql_databricks(
+                catalog,
+                schema,
+                canonical_id_name,
+                i,
+                prev_table,
+                curr_table,
+                priority_case_sql,
+                pointer_jump=loop_mode == "pointer-jumping",
+                create_as_select=loop_tables == "ping-pong",
+                id_type=id_type,
+                source_table_bitmask=source_table_bitmask,
+            )
 
-        sql_files.append((f"04_unify_loop_iteration_{i:02d}", loop_sql))
+        sql_files.append((f"04_unify_loop_iteration_{i:02d}", f"{loop_header}\n{loop_sql}"))
+        if i == 1:
+            first_loop_sql = loop_sql
         prev_table = curr_table
 
+    # Template the executor renders for iterations beyond the generated files
+    if loop_mode == "frontier":
+        template_sql = generate_frontier_loop_iteration_sql_databricks(
+            catalog, schema, canonical_id_name, "{{iteration}}", priority_case_sql,
+            source_table_bitmask=source_table_bitmask,
+        )
+    else:
+        # Ping-pong slots are rendered by the executor from the iteration number
+        prev_suffix, curr_suffix = (
+            ("{{prev_slot}}", "{{curr_slot}}")
+            if loop_tables == "ping-pong"
+            else ("{{prev_iteration}}", "{{iteration}}")
+        )
+        template_sql = generate_unify_loop_iteration_sql_databricks(
+            catalog,
+            schema,
+            canonical_id_name,
+            "{{iteration}}",
+            format_catalog_table(catalog, schema, f"{canonical_id_name}_graph_unify_loop_{prev_suffix}"),
+            format_catalog_table(catalog, schema, f"{canonical_id_name}_graph_unify_loop_{curr_suffix}"),
+            priority_case_sql,
+            pointer_jump=loop_mode == "pointer-jumping",
+            create_as_select=loop_tables == "ping-pong",
+            id_type=id_type,
+            source_table_bitmask=source_table_bitmask,
+        )
+    if loop_runner == "script":
+        sql_files.append((
+            "04_unify_loop_script",
+            generate_unify_loop_script_sql_databricks(
+                catalog, schema, canonical_id_name, first_loop_sql, template_sql
+            ),
+        ))
+    sql_files.append((LOOP_TEMPLATE_FILE, f"{loop_header}\n{template_sql}"))
+
     # 05: Canonicalization using the final loop table - matching Presto exactly
     lookup_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_lookup")
     keys_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_keys")
@@ -684,76 +1839,58 @@ GROUP BY follower_id, follower_ns, leader_id, leader_ns;"""
     tables_table_name = tables_table.split('.')[-1]
     final_graph_table_name = final_graph_table.split('.')[-1]
     
-    canonicalize_sql = f"""USE CATALOG {catalog};
-USE SCHEMA {schema};
-
--- Create temporary reference tables
-CREATE OR REPLACE TABLE {keys_table_tmp} 
-USING DELTA AS
-SELECT * FROM VALUES
-    {', '.join(key_values)}
-AS t (key_type, key_name);
-
-CREATE OR REPLACE TABLE {tables_table_tmp}
-USING DELTA AS
-SELECT * FROM VALUES
-    {', '.join(table_values)}
-AS t (table_id, table_name);
-
--- Create the canonicalized lookup table using the final loop table
-CREATE OR REPLACE TABLE {lookup_table_tmp}
-USING DELTA AS
+    # With surrogate ids, canonicalize a copy of the converged graph with the string ids joined back
+    canonical_graph_table = final_loop_table
+    join_back_sql = ""
+    drop_loop_graph_sql = ""
+    if surrogate_ids:
+        canonical_graph_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_graph_tmp")
+        join_back_sql = f"""-- Join the string ids back onto the converged graph
+CREATE OR REPLACE TABLE {canonical_graph_table}
+USING DELTA
+CLUSTER BY (follower_id)
+AS
 SELECT
-    -- Generate canonical_id using the same logic as Presto with proper BIGINT handling
-    replace(replace(replace(
-        base64(
-            concat(
-                -- First 8 bytes: XOR of hash with key_mask using bitwise operations on smaller chunks
-                unhex(concat(
-                    lpad(upper(conv(
-                        cast(conv(substr(sha2(graph.leader_id, 256), 1, 8), 16, 10) as long) ^
-                        cast(conv(substr(leader_keys.key_mask, 1, 8), 16, 10) as long), 10, 16
-                    )), 8, '0'),
-                    lpad(upper(conv(
-                        cast(conv(substr(sha2(graph.leader_id, 256), 9, 8), 16, 10) as long) ^
-                        cast(conv(substr(leader_keys.key_mask, 9, 8), 16, 10) as long), 10, 16
-                    )), 8, '0')
-                )),
-                -- Last byte: key_mask_high8b
-                unhex(substr(leader_keys.key_mask, 17, 2))
-            )
-        ), '+', '-'), '/', '_'), '=', ''
-    ) as canonical_id,
-    follower_id as id,
-    follower_ns as id_key_type,
-    canonical_id_first_seen_at,
-    canonical_id_last_seen_at,
-    follower_first_seen_at as id_first_seen_at,
-    follower_last_seen_at as id_last_seen_at,
-    follower_source_table_ids as id_source_table_ids,
-    follower_last_processed_at as id_last_processed_at
+    followers.id AS follower_id,
+    followers.ns AS follower_ns,
+    leaders.id AS leader_id,
+    leaders.ns AS leader_ns,
+    graph.follower_first_seen_at,
+    graph.follower_last_seen_at,
+    graph.follower_source_table_ids,
+    graph.follower_last_processed_at
 FROM {final_loop_table} graph
-JOIN (
-    SELECT
-        keys.key_type,
-        keys.key_name,
-        masks.key_mask
-    FROM {keys_table_tmp} keys
-    JOIN (
-        SELECT * FROM VALUES
-            {', '.join(key_mask_values)}
-        AS t (key_type, key_mask)
-    ) masks ON keys.key_type = masks.key_type
-) leader_keys ON leader_keys.key_type = graph.leader_ns
-JOIN (
-    SELECT
-        leader_id, leader_ns,
-        MIN(follower_first_seen_at) AS canonical_id_first_seen_at,
-        MAX(follower_last_seen_at) AS canonical_id_last_seen_at
-    FROM {final_loop_table}
-    GROUP BY leader_id, leader_ns
-) canonical_ids ON canonical_ids.leader_id = graph.leader_id
-                AND canonical_ids.leader_ns = graph.leader_ns;
+JOIN {id_dictionary_table} followers ON followers.surrogate_id = graph.follower_id
+JOIN {id_dictionary_table} leaders ON leaders.surrogate_id = graph.leader_id;
+
+"""
+        drop_loop_graph_sql = f"\nDROP TABLE IF EXISTS {final_loop_table};"
+
+    lookup_select_sql = generate_lookup_select_sql_databricks(
+        canonical_graph_table, keys_table_tmp, key_mask_values,
+        source_table_count=len(tables_config) if source_table_bitmask else None,
+    )
+
+    canonicalize_sql = f"""USE CATALOG {catalog};
+USE SCHEMA {schema};
+
+{join_back_sql}-- Create temporary reference tables
+CREATE OR REPLACE TABLE {keys_table_tmp} 
+USING DELTA AS
+SELECT * FROM VALUES
+    {', '.join(key_values)}
+AS t (key_type, key_name);
+
+CREATE OR REPLACE TABLE {tables_table_tmp}
+USING DELTA AS
+SELECT * FROM VALUES
+    {', '.join(table_values)}
+AS t (table_id, table_name);
+
+-- Create the canonicalized lookup table using the final loop table
+CREATE OR REPLACE TABLE {lookup_table_tmp}
+USING DELTA AS
+{lookup_select_sql};
 
 -- Commit lookup tables
 DROP TABLE IF EXISTS {lookup_table};
@@ -763,7 +1900,27 @@ ALTER TABLE {keys_table_tmp} RENAME TO {keys_table_name};
 DROP TABLE IF EXISTS {tables_table};
 ALTER TABLE {tables_table_tmp} RENAME TO {tables_table_name};
 DROP TABLE IF EXISTS {final_graph_table};
-ALTER TABLE {final_loop_table} RENAME TO {final_graph_table_name};"""
+ALTER TABLE {canonical_graph_table} RENAME TO {final_graph_table_name};{drop_loop_graph_sql}"""
+
+    if warm_start:
+        fingerprint_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_graph_fingerprint")
+        canonicalize_sql += f"""
+
+-- Take the seeded pairs back out so the edge table only holds extracted edges
+MERGE INTO {graph_table} graph
+USING {warm_start_seed_table} seeded
+ON graph.follower_id = seeded.follower_id
+    AND graph.follower_ns = seeded.follower_ns
+    AND graph.leader_id = seeded.leader_id
+    AND graph.leader_ns = seeded.leader_ns
+WHEN MATCHED THEN DELETE;
+
+DELETE FROM {warm_start_seed_table};
+
+-- Keys and priorities the graph was built with, checked before the next warm start
+CREATE OR REPLACE TABLE {fingerprint_table}
+USING DELTA AS
+SELECT '{key_fingerprint}' AS key_fingerprint, UNIX_TIMESTAMP() AS time;"""
 
     sql_files.append(("05_canonicalize", canonicalize_sql))
 
@@ -787,7 +1944,10 @@ ALTER TABLE {final_loop_table} RENAME TO {final_graph_table_name};"""
             clean_table_name = 'orders'  # Match TD's naming
         
         clean_table_names.append(clean_table_name)
-        table_flag_exprs.append(f"BOOL_OR(ARRAY_CONTAINS(follower_source_table_ids, {table_id})) as from_{clean_table_name}")
+        table_flag_exprs.append(
+            f"BOOL_OR({source_table_ids_contains_sql_databricks('follower_source_table_ids', table_id, source_table_bitmask)})"
+            f" as from_{clean_table_name}"
+        )
         case_conditions.append(f"WHEN from_{clean_table_name} THEN '{clean_table_name}'")
         grouping_sets_items.append(f"(from_{clean_table_name})")
     
@@ -870,46 +2030,11 @@ FROM (
     # 10+ Enrichments (for each source table)
     for table in tables_config:
         table_name = table["table"]
-        key_name_to_ns = {key: i + 1 for i, key in enumerate(merge_keys)}
-        key_name_to_config = {key["name"]: key for key in keys_config}
-
-        # Build conditions and lookup logic for all keys
-        key_conditions = []
-        key_hash_expressions = []
-        join_id_conditions = []
-        join_key_type_conditions = []
-        
-        # Generate key masks for all merge keys
-        key_masks = generate_key_mask_values(len(merge_keys))
-        key_name_to_mask = {}
-        for i, key_name in enumerate(merge_keys):
-            key_name_to_mask[key_name] = key_masks[i]
-
-        for key_col in table["key_columns"]:
-            if key_col["key"] in merge_keys:
-                column = key_col["column"]
-                key_name = key_col["key"]
-                key_config = key_name_to_config.get(key_name, {})
-                key_ns = key_name_to_ns.get(key_name)
-                key_mask = key_name_to_mask.get(key_name)
-
-                # Use proper validation with regexp and invalid_texts
-                condition = format_validation_condition(
-                    column, 
-                    key_config.get("invalid_texts", []),
-                    key_config.get("valid_regexp")
-                )
-                
-                # Build WHEN clause for canonical_id CASE statement with key-specific mask
-                hash_expr = build_id_hash_expression_databricks(
-                    f"CAST(p.{column} AS STRING)",
-                    key_mask
-                )
-                key_hash_expressions.append(f"WHEN {condition}\n      THEN {hash_expr}")
-                
-                # Build WHEN clauses for JOIN conditions
-                join_id_conditions.append(f"WHEN {condition}\n    THEN CAST(p.{column} AS STRING)")
-                join_key_type_conditions.append(f"WHEN {condition}\n    THEN {key_ns}")
+        key_cases = build_enrich_key_cases_databricks(table, keys_config, merge_keys)
+        # Skip if no key expressions were built
+        if not key_cases:
+            continue
+        canonical_id_case, join_id_case, join_key_type_case = key_cases
 
         enriched_table = format_catalog_table(catalog, schema, f"enriched_{table_name}")
         enriched_table_tmp = format_catalog_table(
@@ -918,11 +2043,6 @@ FROM (
         source_table = f"{src_catalog}.{src_schema}.{table['table']}"
         enriched_table_name = enriched_table.split('.')[-1]
 
-        # Build the CASE statements
-        canonical_id_case = "\n      ".join(key_hash_expressions) + "\n      ELSE NULL"
-        join_id_case = "\n    ".join(join_id_conditions) + "\n    ELSE NULL"
-        join_key_type_case = "\n    ".join(join_key_type_conditions) + "\n    ELSE NULL"
-
         enrich_sql = f"""USE CATALOG {catalog};
 USE SCHEMA {schema};
 
@@ -954,155 +2074,25 @@ LEFT JOIN {lookup_table} k0
 DROP TABLE IF EXISTS {enriched_table};
 ALTER TABLE {enriched_table_tmp} RENAME TO {enriched_table_name};"""
 
-        # Skip if no key expressions were built
-        if not key_hash_expressions:
-            continue
-            
         sql_files.append((f"10_enrich_{table_name}", enrich_sql))
 
     # 20+ Master tables - Dynamic generation based on YAML attributes
     for master in master_tables_config:
         master_name = master["name"]
         canonical_id = master["canonical_id"]
-        attributes = master.get("attributes", [])
 
         master_table = format_catalog_table(catalog, schema, master_name)
         master_table_tmp = format_catalog_table(catalog, schema, f"{master_name}_tmp")
         master_table_name = master_table.split('.')[-1]
 
-        # Build mapping of all tables that have enriched versions
-        enriched_table_map = {}
-        for table in tables_config:
-            table_name = table["table"]
-            # Handle table name mapping for enriched tables
-            clean_table_name = table_name.split('.')[-1]
-            if clean_table_name == 'kris_src_orders':
-                clean_table_name = 'orders'  # Match TD's naming
-            enriched_table_map[clean_table_name] = format_catalog_table(catalog, schema, f"enriched_{table_name}")
-            enriched_table_map[table_name] = format_catalog_table(catalog, schema, f"enriched_{table_name}")
-
-        # Build attribute column mapping - collect all attr_name + priority combinations
-        all_attr_columns = []
-        for attr in attributes:
-            attr_name = attr["name"]
-            source_columns = attr.get("source_columns", [])
-            
-            for i, source_col in enumerate(source_columns):
-                priority = source_col.get("priority", i + 1)
-                all_attr_columns.append(f"{attr_name}_p{priority}_attr")
-                all_attr_columns.append(f"{attr_name}_p{priority}_order")
-
-        # Build UNION ALL queries for each enriched table
-        union_queries = []
-        
-        # Get all unique table names from attributes
-        tables_with_attributes = set()
-        for attr in attributes:
-            for source_col in attr.get("source_columns", []):
-                tables_with_attributes.add(source_col["table"])
-
-        for table_name in tables_with_attributes:
-            if table_name not in enriched_table_map:
-                continue
-                
-            enriched_table = enriched_table_map[table_name]
-            
-            # Build SELECT columns for this table
-            select_columns = [canonical_id]
-            
-            for attr in attributes:
-                attr_name = attr["name"]
-                source_columns = attr.get("source_columns", [])
-                
-                for i, source_col in enumerate(source_columns):
-                    priority = source_col.get("priority", i + 1)
-                    attr_col = f"{attr_name}_p{priority}_attr"
-                    order_col = f"{attr_name}_p{priority}_order"
-                    
-                    if source_col["table"] == table_name:
-                        # This table contributes to this attribute at this priority
-                        column_name = source_col["column"]
-                        order_by = source_col.get("order_by", "time")
-                        select_columns.append(f"{column_name} as {attr_col}")
-                        select_columns.append(f"{order_by} as {order_col}")
-                    else:
-                        # This table doesn't contribute to this attribute at this priority
-                        select_columns.append(f"CAST(NULL AS STRING) as {attr_col}")
-                        select_columns.append(f"CAST(NULL AS BIGINT) as {order_col}")
-            
-            select_columns_str = ',\n            '.join(select_columns)
-            union_query = f"""SELECT
-            {select_columns_str}
-        FROM {enriched_table}
-        WHERE {canonical_id} IS NOT NULL"""
-            
-            union_queries.append(union_query)
-
-        if not union_queries:
+        master_parts = build_master_select_parts_databricks(
+            master, tables_config, catalog, schema
+        )
+        if not master_parts:
             # Skip if no enriched tables found
             continue
+        union_sql, attr_selections_str = master_parts
 
-        union_sql = "\n\n        UNION ALL\n        \n        ".join(union_queries)
-
-        # Build attribute selection logic
-        attr_selections = [canonical_id]
-        
-        for attr in attributes:
-            attr_name = attr["name"]
-            source_columns = attr.get("source_columns", [])
-            array_elements = attr.get("array_elements")
-            
-            if array_elements:
-                # Array attribute (e.g., top_3_emails)
-                array_parts = []
-                for i, source_col in enumerate(source_columns):
-                    priority = source_col.get("priority", i + 1)
-                    attr_col = f"{attr_name}_p{priority}_attr"
-                    order_col = f"{attr_name}_p{priority}_order"
-                    
-                    array_parts.append(f"""COALESCE(
-                    FILTER(
-                        TRANSFORM(
-                            COLLECT_LIST(CASE WHEN {attr_col} IS NOT NULL THEN NAMED_STRUCT('order_val', {order_col}, 'attr_val', {attr_col}) END),
-                            x -> x.attr_val
-                        ),
-                        x -> x IS NOT NULL
-                    ),
-                    ARRAY()
-                )""")
-                
-                array_parts_str = ',\n                '.join(array_parts)
-                attr_selection = f"""SLICE(
-            CONCAT(
-                {array_parts_str}
-            ),
-            1, {array_elements}
-        ) AS {attr_name}"""
-            else:
-                # Single value attribute
-                if len(source_columns) == 1:
-                    # Single source
-                    priority = source_columns[0].get("priority", 1)
-                    attr_col = f"{attr_name}_p{priority}_attr"
-                    order_col = f"{attr_name}_p{priority}_order"
-                    attr_selection = f"MAX(CASE WHEN {attr_col} IS NOT NULL THEN NAMED_STRUCT('order_val', {order_col}, 'attr_val', {attr_col}) END).attr_val AS {attr_name}"
-                else:
-                    # Multiple sources with COALESCE
-                    coalesce_parts = []
-                    for i, source_col in enumerate(source_columns):
-                        priority = source_col.get("priority", i + 1)
-                        attr_col = f"{attr_name}_p{priority}_attr"
-                        order_col = f"{attr_name}_p{priority}_order"
-                        coalesce_parts.append(f"MAX(CASE WHEN {attr_col} IS NOT NULL THEN NAMED_STRUCT('order_val', {order_col}, 'attr_val', {attr_col}) END).attr_val")
-                    
-                    coalesce_parts_str = ',\n            '.join(coalesce_parts)
-                    attr_selection = f"""COALESCE(
-            {coalesce_parts_str}
-        ) AS {attr_name}"""
-            
-            attr_selections.append(attr_selection)
-
-        attr_selections_str = ',\n        '.join(attr_selections)
         master_sql = f"""USE CATALOG {catalog};
 USE SCHEMA {schema};
 
@@ -1245,6 +2235,280 @@ AS t(database_name, table_name, column_name, key_name);"""
     return sql_files
 
 
+def generate_suppression_sql_databricks(
+    yaml_data: Dict[str, Any],
+    catalog: str,
+    schema: str,
+    suppressions_table: str,
+    fix_syntax: bool = True,
+    source_table_bitmask: bool = False,
+) -> List[Tuple[str, str]]:
+    """
+    Generate the SQL steps that remove suppressed ids (opt-outs, deletions) from an
+    existing unification without a full rebuild. suppressions_table holds (id, key_name)
+    rows; only the canonical ids containing one of them are re-split, by a unify loop over
+    their remaining edges, and their lookup, enriched and master rows are rewritten in place.
+    source_table_bitmask must match the workflow that built the graph
+    """
+    sql_files: List[Tuple[str, str]] = []
+
+    keys_config = yaml_data["keys"]
+    tables_config = yaml_data["tables"]
+    master_tables_config = yaml_data.get("master_tables", [])
+    merge_keys = get_merge_keys(yaml_data)
+    canonical_id_name = get_canonical_id_name(yaml_data)
+    prefix = f"{canonical_id_name}_suppress"
+
+    if "." not in suppressions_table:
+        suppressions_table = format_catalog_table(catalog, schema, suppressions_table)
+
+    edges_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_graph_unify_loop_0")
+    graph_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_graph")
+    lookup_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_lookup")
+    keys_table = format_catalog_table(catalog, schema, f"{canonical_id_name}_keys")
+    ids_table = format_catalog_table(catalog, schema, f"{prefix}_ids")
+    followers_table = format_catalog_table(catalog, schema, f"{prefix}_followers")
+    loop_start_table = format_catalog_table(catalog, schema, f"{prefix}_graph_unify_loop_0")
+    loop_stats_table = format_catalog_table(catalog, schema, f"{prefix}_unify_loop_stats")
+    split_graph_table = format_catalog_table(catalog, schema, f"{prefix}_graph")
+    split_lookup_table = format_catalog_table(catalog, schema, f"{prefix}_lookup")
+    changes_table = format_catalog_table(catalog, schema, f"{prefix}_lookup_changes")
+    canonical_ids_table = format_catalog_table(catalog, schema, f"{prefix}_canonical_ids")
+
+    # 01: Affected components and their remaining edges
+    components_sql = f"""USE CATALOG {catalog};
+USE SCHEMA {schema};
+
+-- Suppressed ids with their key type
+CREATE OR REPLACE TABLE {ids_table}
+USING DELTA AS
+SELECT DISTINCT CAST(s.id AS STRING) AS id, keys.key_type AS ns
+FROM {suppressions_table} s
+JOIN {keys_table} keys ON keys.key_name = s.key_name;
+
+-- Every id of a canonical id that contains a suppressed id
+CREATE OR REPLACE TABLE {followers_table}
+USING DELTA AS
+SELECT
+    graph.follower_id,
+    graph.follower_ns,
+    lookup.canonical_id AS old_canonical_id,
+    ids.id IS NOT NULL AS suppressed
+FROM {graph_table} graph
+JOIN (
+    SELECT DISTINCT graph.leader_id, graph.leader_ns
+    FROM {graph_table} graph
+    JOIN {ids_table} ids ON ids.id = graph.follower_id AND ids.ns = graph.follower_ns
+) components ON components.leader_id = graph.leader_id
+            AND components.leader_ns = graph.leader_ns
+LEFT JOIN {ids_table} ids ON ids.id = graph.follower_id AND ids.ns = graph.follower_ns
+LEFT JOIN {lookup_table} lookup ON lookup.id = graph.follower_id
+                                AND lookup.id_key_type = graph.follower_ns;
+
+-- Drop edges from or to a suppressed id
+DELETE FROM {edges_table}
+WHERE EXISTS (
+    SELECT 1 FROM {ids_table} ids
+    WHERE (ids.id = follower_id AND ids.ns = follower_ns)
+       OR (ids.id = leader_id AND ids.ns = leader_ns)
+);
+
+-- Ids only linked through a suppressed id lead themselves
+INSERT INTO {edges_table}
+SELECT
+    graph.follower_id, graph.follower_ns, graph.follower_id AS leader_id, graph.follower_ns AS leader_ns,
+    graph.follower_first_seen_at, graph.follower_last_seen_at,
+    graph.follower_source_table_ids, graph.follower_last_processed_at
+FROM {graph_table} graph
+JOIN {followers_table} followers ON followers.follower_id = graph.follower_id
+                                 AND followers.follower_ns = graph.follower_ns
+WHERE NOT followers.suppressed
+AND NOT EXISTS (
+    SELECT 1 FROM {edges_table} edges
+    WHERE edges.follower_id = graph.follower_id AND edges.follower_ns = graph.follower_ns
+);
+
+-- Iteration 0 of the component-local unify loop
+CREATE OR REPLACE TABLE {loop_start_table}
+USING DELTA AS
+SELECT edges.*
+FROM {edges_table} edges
+JOIN {followers_table} followers ON followers.follower_id = edges.follower_id
+                                 AND followers.follower_ns = edges.follower_ns
+WHERE NOT followers.suppressed;
+
+CREATE OR REPLACE TABLE {loop_stats_table} (
+    iteration INT,
+    updated_count BIGINT,
+    time BIGINT
+) USING DELTA;"""
+
+    sql_files.append(("01_suppress_components", components_sql))
+
+    # 02: Re-split the affected components in one scripting block
+    priority_case_conditions = [f"WHEN {ns} THEN {ns}" for ns in range(1, len(merge_keys) + 1)]
+    priority_case_sql = f"""CASE leader_ns 
+                {' '.join(priority_case_conditions)} 
+                ELSE leader_ns 
+            END"""
+    first_loop_sql = generate_unify_loop_iteration_sql_databricks(
+        catalog,
+        schema,
+        prefix,
+        1,
+        loop_start_table,
+        format_catalog_table(catalog, schema, f"{prefix}_graph_unify_loop_1"),
+        priority_case_sql,
+        pointer_jump=True,
+        source_table_bitmask=source_table_bitmask,
+    )
+    template_sql = generate_unify_loop_iteration_sql_databricks(
+        catalog,
+        schema,
+        prefix,
+        "{{iteration}}",
+        format_catalog_table(catalog, schema, f"{prefix}_graph_unify_loop_{{{{prev_iteration}}}}"),
+        format_catalog_table(catalog, schema, f"{prefix}_graph_unify_loop_{{{{iteration}}}}"),
+        priority_case_sql,
+        pointer_jump=True,
+        source_table_bitmask=source_table_bitmask,
+    )
+    loop_script_sql = generate_unify_loop_script_sql_databricks(
+        catalog, schema, prefix, first_loop_sql, template_sql, final_table=split_graph_table
+    )
+    loop_script_sql = loop_script_sql.replace("{{start_iteration}}", "1").replace(
+        "{{max_iterations}}", str(MAX_LOOP_ITERATIONS)
+    )
+    sql_files.append(("02_suppress_unify_loop", f"""USE CATALOG {catalog};
+USE SCHEMA {schema};
+
+{loop_script_sql}"""))
+
+    # 03: New canonical ids of the affected ids
+    key_mask_values = [
+        f"({i + 1}, '{mask}')" for i, mask in enumerate(generate_key_mask_values(len(merge_keys)))
+    ]
+    lookup_select_sql = generate_lookup_select_sql_databricks(
+        split_graph_table, keys_table, key_mask_values,
+        source_table_count=len(tables_config) if source_table_bitmask else None,
+    )
+    lookup_sql = f"""USE CATALOG {catalog};
+USE SCHEMA {schema};
+
+CREATE OR REPLACE TABLE {split_lookup_table}
+USING DELTA AS
+{lookup_select_sql};
+
+-- New canonical id of every affected id (NULL once suppressed)
+CREATE OR REPLACE TABLE {changes_table}
+USING DELTA AS
+SELECT
+    followers.follower_id AS id,
+    followers.follower_ns AS id_key_type,
+    lookup.canonical_id
+FROM {followers_table} followers
+LEFT JOIN {split_lookup_table} lookup ON lookup.id = followers.follower_id
+                                      AND lookup.id_key_type = followers.follower_ns;
+
+-- Canonical ids whose master rows are recomputed
+CREATE OR REPLACE TABLE {canonical_ids_table}
+USING DELTA AS
+SELECT old_canonical_id AS canonical_id FROM {followers_table} WHERE old_canonical_id IS NOT NULL
+UNION
+SELECT canonical_id FROM {split_lookup_table};
+
+-- Replace the affected ids in the lookup and the graph
+MERGE INTO {lookup_table} lookup
+USING {followers_table} followers
+ON lookup.id = followers.follower_id AND lookup.id_key_type = followers.follower_ns
+WHEN MATCHED THEN DELETE;
+
+INSERT INTO {lookup_table}
+SELECT * FROM {split_lookup_table};
+
+MERGE INTO {graph_table} graph
+USING {followers_table} followers
+ON graph.follower_id = followers.follower_id AND graph.follower_ns = followers.follower_ns
+WHEN MATCHED THEN DELETE;
+
+INSERT INTO {graph_table}
+SELECT * FROM {split_graph_table};"""
+
+    sql_files.append(("03_suppress_lookup", lookup_sql))
+
+    # 10+ Re-assign canonical ids in the enriched tables
+    for table in tables_config:
+        table_name = table["table"]
+        key_cases = build_enrich_key_cases_databricks(table, keys_config, merge_keys)
+        if not key_cases:
+            continue
+        canonical_id_case, join_id_case, join_key_type_case = key_cases
+        enriched_table = format_catalog_table(catalog, schema, f"enriched_{table_name}")
+
+        enrich_sql = f"""USE CATALOG {catalog};
+USE SCHEMA {schema};
+
+-- Suppressed ids fall back to their own hashed id, as in the enrich step
+MERGE INTO {enriched_table} p
+USING {changes_table} k0
+ON k0.id = CASE
+    {join_id_case}
+    END
+    AND k0.id_key_type = CASE
+    {join_key_type_case}
+    END
+WHEN MATCHED THEN UPDATE SET {canonical_id_name} = COALESCE(
+    k0.canonical_id,
+    CASE
+      {canonical_id_case}
+    END
+);"""
+
+        sql_files.append((f"10_suppress_enrich_{table_name}", enrich_sql))
+
+    # 20+ Recompute master rows of the affected canonical ids
+    for master in master_tables_config:
+        master_name = master["name"]
+        canonical_id = master["canonical_id"]
+        master_parts = build_master_select_parts_databricks(master, tables_config, catalog, schema)
+        if not master_parts:
+            continue
+        union_sql, attr_selections_str = master_parts
+        master_table = format_catalog_table(catalog, schema, master_name)
+
+        master_sql = f"""USE CATALOG {catalog};
+USE SCHEMA {schema};
+
+DELETE FROM {master_table}
+WHERE {canonical_id} IN (SELECT canonical_id FROM {canonical_ids_table});
+
+INSERT INTO {master_table}
+WITH us AS (
+    {union_sql}
+),
+attrs AS (
+    SELECT
+        {attr_selections_str}
+    FROM us
+    WHERE {canonical_id} IN (SELECT canonical_id FROM {canonical_ids_table})
+    GROUP BY {canonical_id}
+)
+SELECT * FROM attrs id_attrs
+WHERE EXISTS (
+    SELECT 1 FROM {lookup_table} ids 
+    WHERE ids.canonical_id = id_attrs.{canonical_id}
+);"""
+
+        sql_files.append((f"20_suppress_master_{master_name}", master_sql))
+
+    # Apply conversion rules to all SQL
+    sql_files = [
+        (name, apply_databricks_rules(sql, fix_syntax)) for name, sql in sql_files
+    ]
+
+    return sql_files
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Generate complete Databricks SQL from YAML unification configuration"
@@ -1276,8 +2540,76 @@ def main():
         action="store_true",
         help="Skip Presto/Snowflake→Databricks conversion rules",
     )
+    parser.add_argument(
+        "--loop-mode",
+        choices=["full", "frontier", "pointer-jumping", "auto"],
+        default="full",
+        help="Unify loop strategy: full rewrites the graph every iteration, "
+        "frontier only re-aggregates followers whose leader changed, "
+        "pointer-jumping shortcuts leader chains to converge in fewer iterations, "
+        "auto picks one from the recorded loop history (default: full)",
+    )
+    parser.add_argument(
+        "--loop-tables",
+        choices=["per-iteration", "ping-pong"],
+        default="per-iteration",
+        help="Loop table layout: a new table per iteration, or two alternating tables built with "
+        "one CTAS each and promoted to the final table by rename (default: per-iteration)",
+    )
+    parser.add_argument(
+        "--loop-script",
+        action="store_true",
+        help="Also generate a SQL scripting block that runs the whole unify loop in one submission; "
+        "the executor submits it instead of running iterations one by one",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Keep the graph between runs and only extract source rows at or after each table's "
+        "watermark (the max time processed so far); assumes rows arrive in time order",
+    )
+    parser.add_argument(
+        "--warm-start",
+        action="store_true",
+        help="Seed the unify loop with the previous run's <canonical_id>_graph; the executor "
+        "falls back to a cold start when the merge keys or their priority changed",
+    )
+    parser.add_argument(
+        "--surrogate-ids",
+        action="store_true",
+        help="Map every (key, id) to a BIGINT surrogate before the unify loop so it joins and "
+        "compares integers instead of strings; string ids are joined back in canonicalization",
+    )
+    parser.add_argument(
+        "--source-table-bitmask",
+        action="store_true",
+        help=f"Carry follower_source_table_ids as a BIGINT bitmask (at most {MAX_BITMASK_SOURCE_TABLES} "
+        "tables) so the unify loop ORs integers instead of merging arrays; the lookup still gets "
+        "an array. Switching it needs a non-incremental run; --warm-start falls back to a cold start",
+    )
+    parser.add_argument(
+        "--suppress",
+        metavar="TABLE",
+        help="Instead of the workflow, generate SQL that removes the ids listed in TABLE "
+        "(columns id, key_name) from the existing unification, re-splitting only the "
+        "canonical ids that contain them; written to <outdir>/<yaml name>_suppress",
+    )
+    parser.add_argument(
+        "--loop-history",
+        type=pathlib.Path,
+        help="Unify loop history exported by the SQL executor, used to size the loop "
+        f"(default: <outdir>/<yaml name>/{LOOP_HISTORY_FILE} if present)",
+    )
+    parser.add_argument(
+        "--ignore-loop-history",
+        action="store_true",
+        help="Size the unify loop from the YAML configuration only",
+    )
     args = parser.parse_args()
 
+    if args.loop_mode == "frontier" and args.loop_tables == "ping-pong":
+        parser.error("--loop-tables ping-pong does not apply to --loop-mode frontier")
+
     if not args.yaml_file.exists():
         print(f"Error: {args.yaml_file} not found.")
         return 1
@@ -1292,17 +2624,49 @@ def main():
     # Set src_schema (default to target schema if not provided)
     src_schema = args.src_schema if args.src_schema else args.schema
 
-    # Generate SQL files
-    sql_files = generate_workflow_sql_databricks(
-        yaml_data, args.catalog, args.schema, src_catalog, src_schema, fix_syntax=not args.no_fix_syntax
-    )
-
-    # Create output directory
-    output_dir = args.outdir / args.yaml_file.stem
-    output_dir.mkdir(parents=True, exist_ok=True)
+    if args.suppress:
+        output_dir = args.outdir / f"{args.yaml_file.stem}_suppress"
+        output_dir.mkdir(parents=True, exist_ok=True)
+        sql_files = generate_suppression_sql_databricks(
+            yaml_data, args.catalog, args.schema, args.suppress, fix_syntax=not args.no_fix_syntax,
+            source_table_bitmask=args.source_table_bitmask,
+        )
+    else:
+        # Create output directory
+        output_dir = args.outdir / args.yaml_file.stem
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        # Size the unify loop from previous runs; merge_iterations in the YAML still wins
+        loop_mode = args.loop_mode
+        loop_iterations = None
+        if not args.ignore_loop_history:
+            history_path = args.loop_history or output_dir / LOOP_HISTORY_FILE
+            runs = load_loop_history(history_path)
+            loop_iterations, loop_mode = calibrate_loop_from_history(runs, args.loop_mode, args.loop_tables)
+            if get_merge_iterations(yaml_data) is not None:
+                loop_iterations = None
+            if loop_iterations:
+                print(f"Using {loop_iterations} loop iterations from {len(runs)} recorded runs in {history_path}")
+        elif loop_mode == "auto":
+            loop_mode = "full"
+        if args.loop_mode == "auto":
+            print(f"Loop mode: {loop_mode}")
+
+        # Generate SQL files
+        sql_files = generate_workflow_sql_databricks(
+            yaml_data, args.catalog, args.schema, src_catalog, src_schema, fix_syntax=not args.no_fix_syntax,
+            loop_mode=loop_mode,
+            loop_tables=args.loop_tables,
+            loop_runner="script" if args.loop_script else "client",
+            loop_iterations=loop_iterations,
+            incremental=args.incremental,
+            warm_start=args.warm_start,
+            surrogate_ids=args.surrogate_ids,
+            source_table_bitmask=args.source_table_bitmask,
+        )
 
     # Clean up existing SQL files in the output directory
-    existing_sql_files = list(output_dir.glob("*.sql"))
+    existing_sql_files = list(output_dir.glob("*.sql")) + list(output_dir.glob("*.sql.tmpl"))
     if existing_sql_files:
         print(f"Cleaning up {len(existing_sql_files)} existing SQL files...")
         for existing_file in existing_sql_files:
@@ -1312,7 +2676,7 @@ def main():
 
     # Write SQL files
     for filename, sql_content in sql_files:
-        file_path = output_dir / f"{filename}.sql"
+        file_path = output_dir / (filename if filename == LOOP_TEMPLATE_FILE else f"{filename}.sql")
         with open(file_path, "w") as f:
             f.write(sql_content)
         print(f"✓ {file_path.relative_to(args.outdir)}")
@@ -1323,7 +2687,8 @@ def main():
 
     # Show execution order
     print(f"\nExecution order:")
-    for i, (filename, _) in enumerate(sql_files, 1):
+    sql_steps = [filename for filename, _ in sql_files if filename != LOOP_TEMPLATE_FILE]
+    for i, filename in enumerate(sql_steps, 1):
         print(f"  {i:2d}. {filename}")
 
     print(f"\nDelta table benefits enabled:")
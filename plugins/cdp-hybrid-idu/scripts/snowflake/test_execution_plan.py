@@ -0,0 +1,90 @@
+"""
+Tests for the step dependency graph snowflake_sql_executor.py builds from a
+directory generated by yaml_unification_to_snowflake.py.
+
+ $ python -m pytest plugins/cdp-hybrid-idu/scripts/snowflake/test_execution_plan.py
+"""
+
+import pytest
+
+pytest.importorskip("rich")
+pytest.importorskip("dotenv")
+
+from snowflake_sql_executor import build_execution_plan, get_sql_files
+from yaml_unification_to_snowflake import LOOP_TEMPLATE_FILE, generate_workflow_sql_snowflake
+
+UNIFY_YAML = {
+    "name": "test",
+    "keys": [
+        {"name": "email", "invalid_texts": ["", None]},
+        {"name": "customer_id", "invalid_texts": [""]},
+    ],
+    "tables": [
+        {
+            "table": "customers",
+            "key_columns": [
+                {"column": "email", "key": "email"},
+                {"column": "customer_id", "key": "customer_id"},
+            ],
+        },
+        {"table": "orders", "key_columns": [{"column": "email_address", "key": "email"}]},
+    ],
+    "canonical_ids": [{"name": "unified_id", "merge_by_keys": ["email", "customer_id"]}],
+    "master_tables": [
+        {
+            "name": "customer_master",
+            "canonical_id": "unified_id",
+            "attributes": [
+                {
+                    "name": "best_email",
+                    "source_columns": [
+                        {"table": "customers", "column": "email", "priority": 1},
+                        {"table": "orders", "column": "email_address", "priority": 2},
+                    ],
+                }
+            ],
+        }
+    ],
+}
+
+
+@pytest.fixture
+def plan(tmp_path):
+    """Plan of a freshly generated SQL directory plus a hand-written 99_ script"""
+    for filename, sql in generate_workflow_sql_snowflake(UNIFY_YAML, "db", "sch", "db", "src"):
+        (tmp_path / (filename if filename == LOOP_TEMPLATE_FILE else f"{filename}.sql")).write_text(sql)
+    (tmp_path / "99_custom.sql").write_text("UPDATE db.sch.customer_master SET best_email = NULL;")
+    return {step.name: step for step in build_execution_plan(get_sql_files(tmp_path), "unified_id")}
+
+
+def test_loop_iterations_fold_into_one_step(plan):
+    assert not [name for name in plan if "loop_iteration" in name]
+    loop = plan["04_unify_loop"]
+    assert loop.kind == "loop"
+    assert "unified_id_graph_unify_loop_final" in loop.writes
+    assert loop.deps == {"01_create_graph", "02_extract_merge"}
+    assert plan["05_canonicalize"].deps == {"04_unify_loop"}
+
+
+def test_enrich_depends_only_on_canonicalize(plan):
+    enrich = [name for name in plan if name.startswith("10_enrich_")]
+    assert sorted(enrich) == ["10_enrich_customers", "10_enrich_orders"]
+    for name in enrich:
+        assert plan[name].deps == {"05_canonicalize"}
+
+
+def test_master_waits_for_the_enriched_tables(plan):
+    assert plan["20_master_customer_master"].deps == {
+        "05_canonicalize",
+        "10_enrich_customers",
+        "10_enrich_orders",
+    }
+
+
+def test_metadata_steps_are_independent(plan):
+    for name in ("30_unification_metadata", "31_filter_lookup", "32_column_lookup"):
+        assert plan[name].deps == set()
+
+
+def test_99_step_is_a_barrier(plan):
+    assert plan["99_custom"].deps == set(plan) - {"99_custom"}
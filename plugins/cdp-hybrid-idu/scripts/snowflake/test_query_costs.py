@@ -0,0 +1,162 @@
+"""
+Tests for the query cost collection of snowflake_sql_executor.py, run against a
+local SQLite stand-in for QUERY_HISTORY.
+
+ $ python -m pytest plugins/cdp-hybrid-idu/scripts/snowflake/test_query_costs.py
+"""
+
+import re
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("rich")
+pytest.importorskip("dotenv")
+
+from snowflake_sql_executor import (
+    QUERY_COST_COLUMNS,
+    SnowflakeExecutor,
+    build_query_cost_sql,
+    summarize_query_costs,
+)
+
+RUN_ID = "20260101T000000-ab12"
+TENANT = "db.sch.unified_id"
+STARTED_AT = 1_700_000_000
+
+
+def make_tag(description: str, run_id: str = RUN_ID, tenant: str = TENANT) -> str:
+    """QUERY_TAG exactly as the executor sets it on the session"""
+    database, schema, table_prefix = tenant.split(".")
+    fake_executor = SimpleNamespace(
+        report=SimpleNamespace(run_id=run_id), database=database, schema=schema, table_prefix=table_prefix
+    )
+    return SnowflakeExecutor.query_tag(fake_executor, description)
+
+
+def history_row(query_tag, **metrics) -> dict:
+    row = {
+        "query_tag": query_tag,
+        "total_elapsed_time": 2000,
+        "execution_time": 1800,
+        "bytes_scanned": 1024,
+        "bytes_spilled_to_local_storage": 0,
+        "bytes_spilled_to_remote_storage": 0,
+        "warehouse_size": "X-Small",
+        "credits_used_cloud_services": 0.0,
+        "start_time": STARTED_AT + 10,
+    }
+    row.update(metrics)
+    return row
+
+
+def run_against_stand_in(rows, history_source: str = "query_history") -> list:
+    """Run the generated cost SQL on an in-memory SQLite table shaped like QUERY_HISTORY"""
+    connection = sqlite3.connect(":memory:")
+    connection.create_function("TO_TIMESTAMP_LTZ", 1, lambda seconds: seconds)
+    columns = QUERY_COST_COLUMNS + ["start_time"]
+    connection.execute(f"CREATE TABLE {history_source} ({', '.join(columns)})")
+    connection.executemany(
+        f"INSERT INTO {history_source} VALUES ({', '.join('?' for _ in columns)})",
+        [[row[column] for column in columns] for row in rows],
+    )
+    cursor = connection.execute(build_query_cost_sql(RUN_ID, STARTED_AT, history_source))
+    names = [column[0].lower() for column in cursor.description]
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+
+def like_to_regex(pattern: str) -> str:
+    return "^" + ".*".join(re.escape(part) for part in pattern.split("%")) + "$"
+
+
+def test_default_source_is_user_query_history():
+    sql = build_query_cost_sql(RUN_ID, STARTED_AT + 0.9)
+    assert "FROM TABLE(INFORMATION_SCHEMA.QUERY_HISTORY_BY_USER(" in sql
+    assert f"END_TIME_RANGE_START => TO_TIMESTAMP_LTZ({STARTED_AT})" in sql
+    assert f"start_time >= TO_TIMESTAMP_LTZ({STARTED_AT})" in sql
+    for column in QUERY_COST_COLUMNS:
+        assert column in sql
+
+
+def test_custom_source_replaces_query_history():
+    sql = build_query_cost_sql(RUN_ID, STARTED_AT, "audit.query_history_copy")
+    assert "FROM audit.query_history_copy" in sql
+    assert "QUERY_HISTORY_BY_USER" not in sql
+
+
+def test_like_pattern_matches_the_session_tag():
+    """The LIKE filter relies on the compact JSON the executor writes into QUERY_TAG"""
+    pattern = re.search(r"query_tag LIKE '([^']*)'", build_query_cost_sql(RUN_ID, STARTED_AT)).group(1)
+    assert re.match(like_to_regex(pattern), make_tag("05_canonicalize"))
+    assert re.match(like_to_regex(pattern), make_tag("iteration_3"))
+    assert not re.match(like_to_regex(pattern), make_tag("05_canonicalize", run_id="other-run"))
+
+
+def test_summarize_filters_foreign_and_malformed_tags():
+    rows = [
+        history_row(make_tag("02_extract_merge"), execution_time=3_600_000, credits_used_cloud_services=0.5),
+        history_row(make_tag("02_extract_merge"), bytes_spilled_to_remote_storage=4096),
+        history_row(make_tag("iteration_2"), warehouse_size="MEDIUM"),
+        history_row(make_tag("iteration_2", tenant="db.sch.other_id")),
+        history_row(make_tag("iteration_2", run_id="other-run")),
+        history_row('{"run_id": "' + RUN_ID + '", unterminated'),
+        history_row(None),
+    ]
+    costs = {step["step"]: step for step in summarize_query_costs(rows, RUN_ID, TENANT)}
+
+    assert set(costs) == {"02_extract_merge", "iteration_2"}
+    extract = costs["02_extract_merge"]
+    assert extract["class"] == "extract"
+    assert extract["queries"] == 2
+    assert extract["elapsed_seconds"] == 4.0
+    assert extract["bytes_scanned"] == 2048
+    assert extract["bytes_spilled"] == 4096
+    assert extract["credits"] == round(1.5 + 1800 / 3_600_000, 6)
+    loop = costs["iteration_2"]
+    assert loop["class"] == "loop"
+    assert loop["queries"] == 1
+    assert loop["credits"] == round(1800 / 3_600_000 * 4, 6)
+
+
+def test_summarize_treats_null_metrics_as_zero():
+    row = history_row(
+        make_tag("10_enrich_orders"),
+        total_elapsed_time=None,
+        execution_time=None,
+        bytes_scanned=None,
+        bytes_spilled_to_local_storage=None,
+        bytes_spilled_to_remote_storage=None,
+        warehouse_size=None,
+        credits_used_cloud_services=None,
+    )
+    [step] = summarize_query_costs([row], RUN_ID, TENANT)
+    assert step == {
+        "step": "10_enrich_orders",
+        "class": "enrich",
+        "queries": 1,
+        "elapsed_seconds": 0.0,
+        "bytes_scanned": 0,
+        "bytes_spilled": 0,
+        "credits": 0.0,
+    }
+
+
+def test_stand_in_history_end_to_end():
+    rows = [
+        history_row(make_tag("05_canonicalize"), execution_time=7_200_000, warehouse_size="Small"),
+        history_row(make_tag("05_canonicalize", tenant="db.sch.other_id")),
+        history_row(make_tag("05_canonicalize", run_id="other-run")),
+        history_row(make_tag("05_canonicalize"), start_time=STARTED_AT - 60),
+        history_row("not json"),
+        history_row(None),
+    ]
+    fetched = run_against_stand_in(rows)
+    # SQL narrows by run and start time; the tenant and JSON checks happen in Python
+    assert len(fetched) == 2
+
+    [step] = summarize_query_costs(fetched, RUN_ID, TENANT)
+    assert step["step"] == "05_canonicalize"
+    assert step["class"] == "canonicalize"
+    assert step["queries"] == 1
+    assert step["credits"] == 4.0
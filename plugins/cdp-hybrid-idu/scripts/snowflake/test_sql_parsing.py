@@ -0,0 +1,123 @@
+"""
+Tests for the statement splitting of snowflake_sql_executor.py.
+
+ $ python -m pytest plugins/cdp-hybrid-idu/scripts/snowflake/test_sql_parsing.py
+"""
+
+import pytest
+
+pytest.importorskip("rich")
+pytest.importorskip("dotenv")
+
+from snowflake_sql_executor import parse_sql, split_sql
+
+
+def texts(sql: str) -> list:
+    return [text for text, _ in split_sql(sql)]
+
+
+def test_semicolons_inside_quotes_do_not_split():
+    sql = """
+    INSERT INTO t VALUES ('a;b', 'it''s; fine');
+    SELECT "odd;name" FROM t;
+    """
+    assert texts(sql) == [
+        "INSERT INTO t VALUES ('a;b', 'it''s; fine')",
+        'SELECT "odd;name" FROM t',
+    ]
+
+
+def test_backslash_escaped_quote_stays_in_the_string():
+    sql = r"SELECT 'a\';b' AS x; SELECT 2"
+    assert texts(sql) == [r"SELECT 'a\';b' AS x", "SELECT 2"]
+
+
+def test_comments_are_kept_in_text_and_dropped_from_code():
+    sql = """
+    -- setup; not a statement
+    CREATE TABLE t (id NUMBER); /* trailing; comment */
+    SELECT 1 -- done;
+    """
+    statements = split_sql(sql)
+    assert len(statements) == 2
+    text, code = statements[0]
+    assert text.startswith("-- setup; not a statement")
+    assert code == "CREATE TABLE t (id NUMBER)"
+    assert statements[1][1] == "SELECT 1"
+
+
+def test_comment_only_tail_is_not_a_statement():
+    assert texts("SELECT 1;\n-- the end;\n/* really */") == ["SELECT 1"]
+
+
+def test_dollar_quoted_body_is_one_statement():
+    sql = """
+    CREATE OR REPLACE PROCEDURE p()
+    RETURNS VARCHAR
+    LANGUAGE SQL
+    AS
+    $$
+    BEGIN
+        INSERT INTO t VALUES (1);
+        RETURN 'done;';
+    END;
+    $$;
+    CALL p();
+    """
+    statements = parse_sql(sql)
+    assert [stmt.keyword for stmt in statements] == ["CREATE", "CALL"]
+    assert statements[0].text.rstrip().endswith("$$")
+
+
+def test_scripting_block_with_nested_end_while():
+    sql = """
+    BEGIN
+        LET i INT := 1;
+        WHILE (i <= 3) DO
+            INSERT INTO t VALUES (:i);
+            i := i + 1;
+        END WHILE;
+        IF (i > 3) THEN
+            RETURN i;
+        END IF;
+    END;
+    SELECT COUNT(*) FROM t;
+    """
+    statements = parse_sql(sql)
+    assert [stmt.keyword for stmt in statements] == ["BEGIN", "SELECT"]
+    assert statements[0].kind == "script"
+    assert statements[0].code.endswith("END")
+
+
+def test_case_end_does_not_close_anything():
+    sql = """
+    SELECT CASE WHEN a > 0 THEN 'pos;' ELSE 'neg' END AS sign,
+           CASE b WHEN 1 THEN 'one' END AS b_name
+    FROM t;
+    UPDATE t SET c = 1
+    """
+    assert [stmt.keyword for stmt in parse_sql(sql)] == ["SELECT", "UPDATE"]
+
+
+def test_begin_transaction_is_not_a_block():
+    sql = "BEGIN TRANSACTION; DELETE FROM t; COMMIT; BEGIN; ROLLBACK"
+    assert [stmt.keyword for stmt in parse_sql(sql)] == [
+        "BEGIN", "DELETE", "COMMIT", "BEGIN", "ROLLBACK"
+    ]
+
+
+def test_statement_kinds():
+    sql = """
+    USE SCHEMA s;
+    ALTER SESSION SET QUERY_TAG = 'x';
+    CREATE OR REPLACE TABLE t AS SELECT 1 AS id;
+    MERGE INTO t USING u ON t.id = u.id WHEN MATCHED THEN DELETE;
+    WITH x AS (SELECT 1) SELECT * FROM x
+    """
+    assert [(stmt.keyword, stmt.kind) for stmt in parse_sql(sql)] == [
+        ("USE", "context"),
+        ("ALTER", "config"),
+        ("CREATE", "ddl"),
+        ("MERGE", "dml"),
+        ("WITH", "query"),
+    ]
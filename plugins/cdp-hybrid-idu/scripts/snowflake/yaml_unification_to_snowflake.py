@@ -24,9 +24,12 @@ Dependencies: pyyaml
 
 import argparse
 import datetime as dt
+import hashlib
+import json
+import math
 import pathlib
 import re
-from typing import Dict, List, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any, Union
 
 import yaml
 
@@ -85,6 +88,16 @@ HASH_MASK = "59bd709807712b1b0e"
 MASK_LOW = HASH_MASK[:16]
 MASK_HIGH = HASH_MASK[16:]
 
+# Rendered by the executor for unify loop iterations beyond the generated files
+LOOP_TEMPLATE_FILE = "unify_loop_iteration.sql.tmpl"
+# Written by the SQL executor after each unify loop; sizes the next generated loop
+LOOP_HISTORY_FILE = "unify_loop_history.json"
+LOOP_HISTORY_RECENT_RUNS = 10
+MAX_LOOP_ITERATIONS = 30  # the executor's iteration limit
+LONG_CHAIN_ITERATIONS = 6
+FRONTIER_TAIL_RATIO = 0.1
+MAX_BITMASK_SOURCE_TABLES = 63  # bits of a non-negative 64-bit integer
+
 
 def apply_snowflake_rules(sql: str, fix_syntax: bool = True) -> str:
     """Apply regex rules to convert to Snowflake SQL"""
@@ -188,6 +201,39 @@ def get_merge_iterations(yaml_data: Dict[str, Any]) -> int:
     return None
 
 
+def get_key_fingerprint(
+    yaml_data: Dict[str, Any], surrogate_ids: bool = False, source_table_bitmask: bool = False
+) -> str:
+    """
+    Hash of the merge keys in priority order, their validation rules, the key
+    columns of each table and the graph layout flags; a graph built under another
+    fingerprint cannot seed the loop
+    """
+    merge_keys = get_merge_keys(yaml_data)
+    key_cfg_map = {k["name"]: k for k in yaml_data["keys"]}
+    fingerprint = {
+        "merge_by_keys": merge_keys,
+        "keys": [key_cfg_map.get(key, {}) for key in merge_keys],
+        "tables": [
+            {
+                "table": table["table"],
+                "key_columns": [kc for kc in table.get("key_columns", []) if kc["key"] in merge_keys],
+            }
+            for table in yaml_data["tables"]
+        ],
+    }
+    # Only non-default layouts are hashed, so graphs from before these flags still match
+    graph_layout = {
+        flag: True
+        for flag, enabled in (("surrogate_ids", surrogate_ids), ("source_table_bitmask", source_table_bitmask))
+        if enabled
+    }
+    if graph_layout:
+        fingerprint["graph_layout"] = graph_layout
+    payload = json.dumps(fingerprint, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
 def generate_key_mask_values(num_keys: int) -> List[str]:
     """Generate key_mask values for the specified number of merge keys"""
     # These are the key mask values from TD's implementation
@@ -232,6 +278,88 @@ def get_key_priority_array(yaml_data: Dict[str, Any]) -> List[int]:
         return list(range(1, len(merge_keys) + 1))
 
 
+def load_loop_history(path: pathlib.Path) -> List[Dict[str, Any]]:
+    """Unify loop runs from the executor's loop history export (empty if missing or unreadable)"""
+    if not path.exists():
+        return []
+    try:
+        with open(path, "r") as f:
+            return json.load(f).get("runs", [])
+    except (OSError, ValueError) as e:
+        print(f"Warning: could not read loop history {path}: {e}")
+        return []
+
+
+def calibrate_loop_from_history(
+    runs: List[Dict[str, Any]], loop_mode: str, loop_tables: str
+) -> Tuple[Optional[int], str]:
+    """
+    Iteration budget and loop strategy from recent converged unify loop runs.
+    The budget is the most iterations any recent run of the chosen mode needed.
+    loop_mode "auto" picks the mode with the lowest average recorded loop time; with
+    history for one mode only, pointer-jumping for long leader chains, frontier when
+    later iterations re-point a small share of what the first one did, else full.
+    Returns (iterations, loop mode); iterations is None without usable history.
+    """
+    converged = [
+        run for run in runs[-LOOP_HISTORY_RECENT_RUNS:] if run.get("converged") and run.get("iterations")
+    ]
+    by_mode: Dict[str, List[Dict[str, Any]]] = {}
+    for run in converged:
+        mode = run.get("loop_mode", "full")
+        # Frontier keeps one in-place table, so ping-pong history cannot come from it
+        if loop_tables == "ping-pong" and mode == "frontier":
+            continue
+        by_mode.setdefault(mode, []).append(run)
+
+    def needed_iterations(mode_runs: List[Dict[str, Any]]) -> int:
+        return max(max(it["iteration"] for it in run["iterations"]) for run in mode_runs)
+
+    def loop_seconds(run: Dict[str, Any]) -> Optional[float]:
+        seconds = [it.get("seconds") for it in run["iterations"]]
+        return sum(seconds) if all(value is not None for value in seconds) else None
+
+    if loop_mode == "auto":
+        average_seconds = {}
+        for mode, mode_runs in by_mode.items():
+            timings = [value for value in map(loop_seconds, mode_runs) if value is not None]
+            if timings:
+                average_seconds[mode] = sum(timings) / len(timings)
+
+        if len(average_seconds) > 1:
+            loop_mode = min(average_seconds, key=average_seconds.get)
+        elif by_mode:
+            latest = [run for run in converged if run.get("loop_mode", "full") in by_mode][-1]
+            loop_mode = latest.get("loop_mode", "full")
+            counts = {it["iteration"]: it["updated_count"] for it in latest["iterations"]}
+            if loop_mode != "pointer-jumping" and needed_iterations(by_mode[loop_mode]) >= LONG_CHAIN_ITERATIONS:
+                loop_mode = "pointer-jumping"
+            elif (
+                loop_mode == "full"
+                and loop_tables != "ping-pong"
+                and counts.get(1)
+                and counts.get(2)
+                and counts[2] <= counts[1] * FRONTIER_TAIL_RATIO
+            ):
+                loop_mode = "frontier"
+        else:
+            loop_mode = "full"
+
+    if loop_mode in by_mode:
+        iterations = needed_iterations(by_mode[loop_mode])
+    else:
+        # Full and frontier converge in the same number of iterations; pointer-jumping
+        # roughly needs the log2 of that. Pointer-jumping history says little about the others.
+        chain_runs = by_mode.get("full", []) + by_mode.get("frontier", [])
+        if not chain_runs:
+            return None, loop_mode
+        iterations = needed_iterations(chain_runs)
+        if loop_mode == "pointer-jumping":
+            iterations = math.ceil(math.log2(max(iterations, 2))) + 2
+
+    return max(2, min(MAX_LOOP_ITERATIONS, iterations)), loop_mode
+
+
 def calculate_max_iterations(yaml_data: Dict[str, Any]) -> int:
     """Calculate required loop iterations based on YAML config"""
     # Check if merge_iterations is specified in YAML first
@@ -275,8 +403,12 @@ def generate_extract_sql_snowflake(
     schema: str,
     src_database: str,
     src_schema: str,
+    watermarks_table: Optional[str] = None,
 ) -> str:
-    """Generate extract SQL block for a single table (only merge keys) - Snowflake version"""
+    """
+    Generate extract SQL block for a single table (only merge keys) - Snowflake version
+    With a watermarks table only rows at or after the table's stored watermark are read
+    """
     key_name_to_ns = {key: i + 1 for i, key in enumerate(merge_keys)}
     key_cfg_map = {k["name"]: k for k in keys_cfg}
 
@@ -319,6 +451,13 @@ def generate_extract_sql_snowflake(
     # Use the provided src_schema parameter instead of inferring from YAML
     table_ref = f"{src_database}.{src_schema}.{table['table']}"
 
+    where_sql = "TRUE"
+    if watermarks_table:
+        # Rows at the watermark itself are read again; merging them twice changes nothing
+        where_sql = f"""COALESCE(time >= (
+            SELECT MAX(max_time) FROM {watermarks_table} WHERE source_table = '{table_ref}'
+        ), TRUE)"""
+
     return f"""SELECT
             ARRAY_COMPACT(ARRAY_CONSTRUCT(
                 {case_str}
@@ -326,248 +465,121 @@ def generate_extract_sql_snowflake(
             time,
             {table_id} as source_table_id
         FROM {table_ref}
-        WHERE TRUE"""
+        WHERE {where_sql}"""
 
 
-def generate_workflow_sql_snowflake(
-    yaml_data: Dict[str, Any], database: str, schema: str, src_database: str, src_schema: str, fix_syntax: bool = True
-) -> List[Tuple[str, str]]:
-    """Generate all Snowflake SQL steps based on YAML configuration"""
-    sql_files: List[Tuple[str, str]] = []
+# Leader keys pack (priority, id) into one comparable value; surrogate ids use the high digits for the priority
+SURROGATE_KEY_SCALE = "1000000000000000000"
 
-    keys_config = yaml_data["keys"]
-    tables_config = yaml_data["tables"]
-    master_tables_config = yaml_data.get("master_tables", [])
-    merge_keys = get_merge_keys(yaml_data)
-    canonical_id_name = get_canonical_id_name(yaml_data)
 
-    # Calculate max iterations dynamically
-    max_iterations = calculate_max_iterations(yaml_data)
+def leader_key_sql_snowflake(priority_sql: str, id_sql: str, id_type: str = "VARCHAR") -> str:
+    """Leader key ordering leaders by priority, then id"""
+    if id_type == "VARCHAR":
+        return f"LPAD({priority_sql}::VARCHAR, 3, '0') || '|' || {id_sql}"
+    return f"({priority_sql}) * {SURROGATE_KEY_SCALE} + {id_sql}"
 
-    # Assign table IDs
-    for idx, table in enumerate(tables_config, 1):
-        table["table_id"] = idx
 
-    # 01: Create main graph table using Snowflake syntax
-    graph_table = format_database_table(database, schema, f"{canonical_id_name}_graph_unify_loop_0")
-    create_graph_sql = f"""USE DATABASE {database};
-USE SCHEMA {schema};
+def leader_key_id_sql_snowflake(key_sql: str, id_type: str = "VARCHAR") -> str:
+    """Leader id unpacked from a leader key"""
+    if id_type == "VARCHAR":
+        return f"SPLIT_PART({key_sql}, '|', 2)"
+    return f"MOD({key_sql}, {SURROGATE_KEY_SCALE})"
 
-CREATE OR REPLACE TABLE {graph_table} (
-    follower_id VARCHAR,
-    follower_ns NUMBER,
-    leader_id VARCHAR,
-    leader_ns NUMBER,
-    follower_first_seen_at NUMBER,
-    follower_last_seen_at NUMBER,
-    follower_source_table_ids ARRAY,
-    follower_last_processed_at NUMBER
-)
-CLUSTER BY (follower_id);"""
 
-    sql_files.append(("01_create_graph", create_graph_sql))
+def leader_key_ns_sql_snowflake(key_sql: str, id_type: str = "VARCHAR") -> str:
+    """Leader namespace (the priority part) unpacked from a leader key"""
+    if id_type == "VARCHAR":
+        return f"TO_NUMBER(SPLIT_PART({key_sql}, '|', 1))"
+    return f"TRUNC({key_sql} / {SURROGATE_KEY_SCALE})"
 
-    # 02: Extract and merge (following the working pattern)
-    extract_blocks = []
-    for table in tables_config:
-        extract_blocks.append(
-            generate_extract_sql_snowflake(
-                table, keys_config, merge_keys, table["table_id"], database, schema, src_database, src_schema
-            )
-        )
 
-    union_sql = (
-        "\n            \n            UNION ALL\n            \n            ".join(
-            extract_blocks
-        )
+def source_table_ids_merge_sql_snowflake(bitmask: bool = False) -> Tuple[str, str]:
+    """
+    Aggregate merging lp.follower_source_table_ids and the FROM clause suffix it needs:
+    arrays are flattened and re-aggregated, bitmasks OR-ed
+    """
+    if bitmask:
+        return "BITOR_AGG(follower_source_table_ids)", ""
+    return (
+        """ARRAY_DISTINCT(
+        ARRAY_AGG(DISTINCT flattened_table_ids.value)
+    )""",
+        ",\nLATERAL FLATTEN(input => lp.follower_source_table_ids) flattened_table_ids",
     )
 
-    extract_merge_sql = f"""USE DATABASE {database};
-USE SCHEMA {schema};
 
--- Task: Extract and merge data
-INSERT INTO {graph_table}
-SELECT
-    follower_id,
-    follower_ns,
-    exploded_leaders.value:id::VARCHAR as leader_id,
-    exploded_leaders.value:ns::NUMBER as leader_ns,
-    follower_first_seen_at,
-    follower_last_seen_at,
-    follower_source_table_ids,
-    follower_last_processed_at
-FROM (
-    SELECT
-        follower_id,
-        follower_ns,
-        ARRAY_AGG(DISTINCT OBJECT_CONSTRUCT('id', leader_id, 'ns', leader_ns)) as leaders,
-        ARRAY_AGG(DISTINCT follower_source_table_id) as follower_source_table_ids,
-        MIN(follower_first_seen_at) as follower_first_seen_at,
-        MAX(follower_last_seen_at) as follower_last_seen_at,
-        MAX(follower_last_processed_at) as follower_last_processed_at
-    FROM (
-        SELECT
-            f.value:id::VARCHAR as follower_id,
-            f.value:ns::NUMBER as follower_ns,
-            id_ns_array[0]:id::VARCHAR as leader_id,
-            id_ns_array[0]:ns::NUMBER as leader_ns,
-            time as follower_first_seen_at,
-            time as follower_last_seen_at,
-            source_table_id as follower_source_table_id,
-            DATE_PART(epoch_second, CURRENT_TIMESTAMP()) as follower_last_processed_at
-        FROM (
-            {union_sql}
-        ) extracted_records_id_arrays,
-        LATERAL FLATTEN(input => id_ns_array) f
-        WHERE ARRAY_SIZE(id_ns_array) > 0
-    ) extracted_flat_leader_follower_pairs
-    GROUP BY follower_id, follower_ns
-) followers,
-LATERAL FLATTEN(input => leaders) exploded_leaders;"""
+def source_table_ids_contains_sql_snowflake(column: str, table_id: int, bitmask: bool = False) -> str:
+    """Test whether follower_source_table_ids includes table_id (bit table_id - 1 of a bitmask)"""
+    if bitmask:
+        return f"BITAND({column}, {1 << (table_id - 1)}) <> 0"
+    return f"ARRAYS_OVERLAP({column}, ARRAY_CONSTRUCT({table_id}))"
 
-    sql_files.append(("02_extract_merge", extract_merge_sql))
 
-    # 03: Source key statistics - matching TD Presto structure
-    source_stats_table = format_database_table(
-        database, schema, f"{canonical_id_name}_source_key_stats"
+def generate_unify_loop_iteration_sql_snowflake(
+    database: str,
+    schema: str,
+    canonical_id_name: str,
+    iteration: Union[int, str],
+    prev_table: str,
+    curr_table: str,
+    priority_case_sql: str,
+    pointer_jump: bool = False,
+    create_as_select: bool = False,
+    id_type: str = "VARCHAR",
+    source_table_bitmask: bool = False,
+) -> str:
+    """
+    Generate one unify loop iteration; records its leader changes for cheap convergence checks.
+    id_type is NUMBER when the loop runs on surrogate ids; source_table_bitmask keeps
+    follower_source_table_ids as a NUMBER bitmask instead of an array
+    """
+    source_table_ids_merge_sql, source_table_ids_from_sql = source_table_ids_merge_sql_snowflake(
+        source_table_bitmask
     )
-    
-    # Build table flag expressions for leader and follower stats
-    table_flag_exprs = []
-    table_names = []
-    grouping_sets_items = []
-    case_conditions = []
-    
-    for table in tables_config:
-        table_id = table["table_id"]
-        table_name = table["table"]
-        table_names.append(table_name)
-        table_flag_exprs.append(f"BOOLOR_AGG(ARRAYS_OVERLAP(follower_source_table_ids, ARRAY_CONSTRUCT({table_id}))) as from_{table_name}")
-        grouping_sets_items.append(f"(from_{table_name})")
-        case_conditions.append(f"WHEN from_{table_name} THEN '{table_name}'")
-    
-    # Add empty grouping set for totals
-    grouping_sets_items.append("()")
-    case_conditions_str = " ".join(case_conditions)
-    grouping_sets_str = ", ".join(grouping_sets_items)
-    
-    # Build dynamic distinct columns based on merge keys
-    key_name_to_ns = {key: i + 1 for i, key in enumerate(merge_keys)}
-    distinct_key_columns = []
-    for key_name in merge_keys:
-        key_ns = key_name_to_ns[key_name]
-        distinct_key_columns.append(f"COUNT_IF(follower_ns = {key_ns}) as distinct_{key_name}")
-    
-    # HAVING condition to match TD logic
-    having_conditions = " AND ".join([f"COALESCE(from_{name}, TRUE)" for name in table_names])
-
-    # Create dynamic column definitions for the table
-    distinct_column_defs = [f"distinct_{key} NUMBER" for key in merge_keys]
-    
-    source_stats_sql = f"""USE DATABASE {database};
-USE SCHEMA {schema};
-
-CREATE OR REPLACE TABLE {source_stats_table} (
-    from_table VARCHAR,
-    total_distinct NUMBER,
-    {', '.join(distinct_column_defs)},
-    time NUMBER
-);
-
-INSERT INTO {source_stats_table}
-SELECT
-    leader_stats.from_table,
-    total_distinct,
-    {', '.join([f'distinct_{key}' for key in merge_keys])},
-    DATE_PART(epoch_second, CURRENT_TIMESTAMP()) as time
-FROM (
+    diff_table = format_database_table(database, schema, f"{canonical_id_name}_unify_loop_leader_diff")
+    stats_table = format_database_table(database, schema, f"{canonical_id_name}_unify_loop_stats")
+
+    jump_sql = ""
+    if pointer_jump:
+        # Leader-of-leader shortcut: each row jumps to the smallest leader of its own leader,
+        # halving chain lengths so the loop converges in O(log diameter) iterations
+        jump_table = format_database_table(database, schema, f"{canonical_id_name}_unify_loop_jumped")
+        leader_case_sql = priority_case_sql.replace("leader_ns", "prev.leader_ns")
+        jump_sql = f"""
+-- Pointer jumping: re-point every row to its leader's own leader before the regular pass
+CREATE OR REPLACE TRANSIENT TABLE {jump_table} AS
+WITH parents AS (
     SELECT
-        CASE
-            {case_conditions_str}
-            ELSE '*'
-        END as from_table,
-        total_distinct
-    FROM (
-        SELECT
-            {', '.join([f'from_{name}' for name in table_names])},
-            COUNT(*) as total_distinct
-        FROM (
-            SELECT
-                leader_id,
-                leader_ns,
-                {', '.join(table_flag_exprs)}
-            FROM {graph_table}
-            GROUP BY leader_id, leader_ns
-        ) distinct_leaders
-        GROUP BY GROUPING SETS ({grouping_sets_str})
-        HAVING {having_conditions}
-    ) source_leader_stats
-) leader_stats
-JOIN (
+        follower_id, follower_ns,
+        MIN({leader_key_sql_snowflake(priority_case_sql, 'leader_id', id_type)}) as parent_key
+    FROM {prev_table}
+    GROUP BY follower_id, follower_ns
+),
+jumps AS (
     SELECT
-        CASE
-            {case_conditions_str}
-            ELSE '*'
-        END as from_table,
-        {', '.join([f'distinct_{key}' for key in merge_keys])}
-    FROM (
-        SELECT
-            {', '.join([f'from_{name}' for name in table_names])},
-            {', '.join(distinct_key_columns)}
-        FROM (
-            SELECT
-                follower_id,
-                follower_ns,
-                {', '.join(table_flag_exprs)}
-            FROM {graph_table}
-            GROUP BY follower_id, follower_ns
-        ) distinct_followers
-        GROUP BY GROUPING SETS ({grouping_sets_str})
-        HAVING {having_conditions}
-    ) source_follower_stats
-) follower_stats
-ON leader_stats.from_table = follower_stats.from_table;"""
-
-    sql_files.append(("03_source_key_stats", source_stats_sql))
-
-    # 04: Unification loop iterations (dynamic count)
-    prev_table = graph_table
-    for i in range(1, max_iterations + 1):
-        curr_table = format_database_table(
-            database, schema, f"{canonical_id_name}_graph_unify_loop_{i}"
-        )
-
-        # Build priority array mapping to replicate TD's array[1,2,3][leader_ns] logic
-        priority_array = get_key_priority_array(yaml_data)  # Configurable priority array
-        
-        # Build CASE statement that replicates array[1,2,3][leader_ns] in Snowflake
-        priority_case_conditions = []
-        for ns_idx, priority in enumerate(priority_array):
-            ns = ns_idx + 1  # Convert 0-based to 1-based namespace
-            priority_case_conditions.append(f"WHEN {ns} THEN {priority}")
-        
-        priority_case_sql = f"""CASE leader_ns 
-                {' '.join(priority_case_conditions)} 
-                ELSE leader_ns 
-            END"""
-
-        loop_sql = f"""USE DATABASE {database};
-USE SCHEMA {schema};
-
-CREATE OR REPLACE TABLE {curr_table} (
-    follower_id VARCHAR,
-    follower_ns NUMBER,
-    leader_id VARCHAR,
-    leader_ns NUMBER,
-    follower_first_seen_at NUMBER,
-    follower_last_seen_at NUMBER,
-    follower_source_table_ids ARRAY,
-    follower_last_processed_at NUMBER
+        prev.*,
+        COALESCE(
+            parents.parent_key < {leader_key_sql_snowflake(leader_case_sql, 'prev.leader_id', id_type)}, FALSE
+        ) as jumped,
+        parents.parent_key
+    FROM {prev_table} prev
+    LEFT JOIN parents
+    ON prev.leader_id = parents.follower_id AND prev.leader_ns = parents.follower_ns
 )
-CLUSTER BY (follower_id);
+SELECT
+    follower_id, follower_ns,
+    CASE WHEN jumped THEN {leader_key_id_sql_snowflake('parent_key', id_type)} ELSE leader_id END as leader_id,
+    CASE WHEN jumped THEN {leader_key_ns_sql_snowflake('parent_key', id_type)} ELSE leader_ns END as leader_ns,
+    follower_first_seen_at, follower_last_seen_at, follower_source_table_ids,
+    CASE WHEN jumped
+         THEN DATE_PART(epoch_second, CURRENT_TIMESTAMP())
+         ELSE follower_last_processed_at
+    END as follower_last_processed_at
+FROM jumps;
+"""
+        prev_table = jump_table
 
-INSERT INTO {curr_table}
-WITH prev_table_with_leader_leader AS (
+    leader_leader_cte = f"""WITH prev_table_with_leader_leader AS (
     SELECT
         follower_id, follower_ns, leader_id, leader_ns,
         follower_first_seen_at, follower_last_seen_at,
@@ -593,20 +605,70 @@ WITH prev_table_with_leader_leader AS (
     ) prev_followers
     ON prev_leaders.leader_id = prev_followers.follower_id 
     AND prev_leaders.leader_ns = prev_followers.follower_ns
+)"""
+
+    if create_as_select:
+        # One CTAS instead of CREATE + INSERT: a single commit per iteration
+        create_curr_sql = f"""CREATE OR REPLACE TABLE {curr_table}
+CLUSTER BY (follower_id)
+AS"""
+    else:
+        create_curr_sql = f"""CREATE OR REPLACE TABLE {curr_table} (
+    follower_id {id_type},
+    follower_ns NUMBER,
+    leader_id {id_type},
+    leader_ns NUMBER,
+    follower_first_seen_at NUMBER,
+    follower_last_seen_at NUMBER,
+    follower_source_table_ids {"NUMBER" if source_table_bitmask else "ARRAY"},
+    follower_last_processed_at NUMBER
 )
+CLUSTER BY (follower_id);
+
+INSERT INTO {curr_table}"""
+
+    return f"""USE DATABASE {database};
+USE SCHEMA {schema};
+{jump_sql}
+-- Leaders re-pointed in this iteration (its row count drives convergence)
+CREATE OR REPLACE TRANSIENT TABLE {diff_table} AS
+{leader_leader_cte}
+SELECT DISTINCT
+    {leader_key_id_sql_snowflake('older_leader_key', id_type)} as older_leader_id,
+    {leader_key_ns_sql_snowflake('older_leader_key', id_type)} as older_leader_ns,
+    newer_leader_key
+FROM (
+    SELECT
+        older_leader_key,
+        MIN(newer_leader_key) as newer_leader_key
+    FROM (
+        SELECT
+            leader_key as older_leader_key,
+            MIN(leader_key) OVER (PARTITION BY follower_id, follower_ns) as newer_leader_key
+        FROM (
+            SELECT
+                follower_id, follower_ns,
+                {leader_key_sql_snowflake(priority_case_sql, 'leader_id', id_type)} as leader_key
+            FROM prev_table_with_leader_leader
+        ) rs
+    ) wsrs
+    WHERE older_leader_key > newer_leader_key
+    GROUP BY older_leader_key
+) diffrs;
+
+{create_curr_sql}
+{leader_leader_cte}
 SELECT
     follower_id, follower_ns, leader_id, leader_ns,
     MIN(follower_first_seen_at) as follower_first_seen_at,
     MAX(follower_last_seen_at) as follower_last_seen_at,
-    ARRAY_DISTINCT(
-        ARRAY_AGG(DISTINCT flattened_table_ids.value)
-    ) as follower_source_table_ids,
+    {source_table_ids_merge_sql} as follower_source_table_ids,
     MAX(follower_last_processed_at) as follower_last_processed_at
 FROM (
     SELECT
         prev.follower_id, prev.follower_ns,
-        COALESCE(SPLIT_PART(diff.newer_leader_key, '|', 2), prev.leader_id) as leader_id,
-        COALESCE(TO_NUMBER(SPLIT_PART(diff.newer_leader_key, '|', 1)), prev.leader_ns) as leader_ns,
+        COALESCE({leader_key_id_sql_snowflake('diff.newer_leader_key', id_type)}, prev.leader_id) as leader_id,
+        COALESCE({leader_key_ns_sql_snowflake('diff.newer_leader_key', id_type)}, prev.leader_ns) as leader_ns,
         prev.follower_first_seen_at, prev.follower_last_seen_at,
         prev.follower_source_table_ids,
         CASE WHEN diff.newer_leader_key IS NULL 
@@ -614,99 +676,354 @@ FROM (
              ELSE DATE_PART(epoch_second, CURRENT_TIMESTAMP()) 
         END as follower_last_processed_at
     FROM prev_table_with_leader_leader prev
-    LEFT JOIN (
-        SELECT DISTINCT
-            SPLIT_PART(older_leader_key, '|', 2) as older_leader_id,
-            TO_NUMBER(SPLIT_PART(older_leader_key, '|', 1)) as older_leader_ns,
-            newer_leader_key
-        FROM (
-            SELECT
-                older_leader_key,
-                MIN(newer_leader_key) as newer_leader_key
-            FROM (
-                SELECT
-                    leader_key as older_leader_key,
-                    MIN(leader_key) OVER (PARTITION BY follower_id, follower_ns) as newer_leader_key
-                FROM (
-                    SELECT
-                        follower_id, follower_ns,
-                        LPAD({priority_case_sql}::VARCHAR, 3, '0') || '|' || leader_id as leader_key
-                    FROM prev_table_with_leader_leader
-                ) rs
-            ) wsrs
-            WHERE older_leader_key > newer_leader_key
-            GROUP BY older_leader_key
-        ) diffrs
-    ) diff
+    LEFT JOIN {diff_table} diff
     ON prev.leader_id = diff.older_leader_id AND prev.leader_ns = diff.older_leader_ns
-) lp,
-LATERAL FLATTEN(input => lp.follower_source_table_ids) flattened_table_ids
-GROUP BY follower_id, follower_ns, leader_id, leader_ns;"""
+) lp{source_table_ids_from_sql}
+GROUP BY follower_id, follower_ns, leader_id, leader_ns;
 
-        sql_files.append((f"04_unify_loop_iteration_{i:02d}", loop_sql))
-        prev_table = curr_table
+-- Record iteration stats (read by the executor instead of an EXCEPT scan)
+DELETE FROM {stats_table} WHERE iteration = {iteration};
 
-    # 05: Simple canonicalization using the final loop table
-    lookup_table = format_database_table(database, schema, f"{canonical_id_name}_lookup")
-    keys_table = format_database_table(database, schema, f"{canonical_id_name}_keys")
-    tables_table = format_database_table(database, schema, f"{canonical_id_name}_tables")
-    final_graph_table = format_database_table(database, schema, f"{canonical_id_name}_graph")
-    
-    # Use the final loop table (created by SQL executor as an alias to the actual final iteration)
-    final_loop_table = format_database_table(database, schema, f"{canonical_id_name}_graph_unify_loop_final")
+INSERT INTO {stats_table}
+SELECT {iteration} as iteration, COUNT(*) as updated_count, DATE_PART(epoch_second, CURRENT_TIMESTAMP()) as time
+FROM {diff_table};"""
 
-    key_values = []
-    table_values = []
-    
-    for i, key in enumerate(merge_keys):
-        key_ns = i + 1
-        key_values.append(f"({key_ns}, '{key}')")
-    
-    for i, table in enumerate(tables_config):
-        # Fix table name to match TD exactly (remove database prefix)
-        table_name = table['table'].split('.')[-1]  # Remove any database prefix
-        if table_name == 'kris_src_orders':
-            table_name = 'orders'  # Match TD's naming
-        table_values.append(f"({i+1}, '{table_name}')")
 
-    # Canonicalization step using dynamic key mask generation
-    keys_table_tmp = format_database_table(database, schema, f"{canonical_id_name}_keys_tmp")
-    tables_table_tmp = format_database_table(database, schema, f"{canonical_id_name}_tables_tmp")
-    lookup_table_tmp = format_database_table(database, schema, f"{canonical_id_name}_lookup_tmp")
-    
-    # Generate dynamic key mask values based on number of merge keys
-    key_masks = generate_key_mask_values(len(merge_keys))
-    key_mask_values = []
-    for i, mask in enumerate(key_masks):
-        key_mask_values.append(f"({i+1}, '{mask}')")
-    
-    # Extract table names to avoid f-string backslash issues
-    lookup_table_name = lookup_table.split('.')[-1]
-    keys_table_name = keys_table.split('.')[-1]
-    tables_table_name = tables_table.split('.')[-1]
-    final_graph_table_name = final_graph_table.split('.')[-1]
-    
-    canonicalize_sql = f"""USE DATABASE {database};
-USE SCHEMA {schema};
+def generate_unify_loop_header(
+    canonical_id_name: str, loop_mode: str, loop_tables: str, loop_runner: str = "client"
+) -> str:
+    """First line of every loop file; tells the executor how the loop tables are laid out and run"""
+    return (
+        f"-- unify_loop: prefix={canonical_id_name} mode={loop_mode} tables={loop_tables} "
+        f"runner={loop_runner}"
+    )
 
--- Create temporary reference tables matching Presto exactly
-DROP TABLE IF EXISTS {keys_table_tmp};
-CREATE TABLE {keys_table_tmp} AS
-SELECT * FROM VALUES
-    {', '.join(key_values)}
-AS t (key_type, key_name);
 
-DROP TABLE IF EXISTS {tables_table_tmp};
-CREATE TABLE {tables_table_tmp} AS
-SELECT * FROM VALUES
-    {', '.join(table_values)}
-AS t (table_id, table_name);
+def generate_unify_loop_procedure_sql_snowflake(
+    database: str,
+    schema: str,
+    canonical_id_name: str,
+    first_iteration_sql: str,
+    template_sql: str,
+    final_table: Optional[str] = None,
+) -> str:
+    """
+    Stored procedure running the iterate/check/stop loop inside Snowflake.
+    Iteration 1 runs the generated first iteration, later ones the iteration template
+    rendered with the same tokens the executor uses; convergence is read from the
+    loop stats table. Returns (iteration, updated_count, time) for every iteration it ran.
+    With final_table, the last per-iteration table is copied there before returning.
+    """
+    procedure = format_database_table(database, schema, f"{canonical_id_name}_unify_loop")
+    stats_table = format_database_table(database, schema, f"{canonical_id_name}_unify_loop_stats")
+
+    def string_literal(sql: str) -> str:
+        if "$$" in sql:
+            raise ValueError("Unify loop SQL containing $$ cannot be embedded in the loop procedure")
+        # USE is not allowed in Snowflake Scripting blocks; loop tables are fully qualified
+        sql = re.sub(r"^USE\s+(?:DATABASE|SCHEMA)\s+[^;]+;\s*\n?", "", sql, flags=re.I | re.M)
+        return "'" + sql.replace("\\", "\\\\").replace("'", "''") + "'"
+
+    final_copy = ""
+    if final_table:
+        loop_table_prefix = format_database_table(database, schema, f"{canonical_id_name}_graph_unify_loop_")
+        final_copy = f"""
+
+    iteration_sql := 'CREATE OR REPLACE TABLE {final_table} AS SELECT * FROM {loop_table_prefix}'
+        || (current_iteration - 1)::VARCHAR;
+    EXECUTE IMMEDIATE :iteration_sql;"""
+
+    return f"""CREATE OR REPLACE PROCEDURE {procedure}(START_ITERATION INTEGER, MAX_ITERATIONS INTEGER)
+RETURNS TABLE (iteration INTEGER, updated_count INTEGER, time INTEGER)
+LANGUAGE SQL
+EXECUTE AS CALLER
+AS
+$$
+DECLARE
+    current_iteration INTEGER;
+    changed INTEGER DEFAULT 1;
+    iteration_sql VARCHAR;
+    first_iteration_sql VARCHAR DEFAULT {string_literal(first_iteration_sql)};
+    iteration_template VARCHAR DEFAULT {string_literal(template_sql)};
+    iteration_stats RESULTSET;
+BEGIN
+    current_iteration := START_ITERATION;
+    WHILE (current_iteration <= MAX_ITERATIONS AND changed > 0) DO
+        IF (current_iteration = 1) THEN
+            iteration_sql := first_iteration_sql;
+        ELSE
+            -- Ping-pong slots: odd iterations write ping and read pong
+            iteration_sql := REPLACE(REPLACE(REPLACE(REPLACE(iteration_template,
+                '{{{{iteration}}}}', current_iteration::VARCHAR),
+                '{{{{prev_iteration}}}}', (current_iteration - 1)::VARCHAR),
+                '{{{{prev_slot}}}}', IFF(MOD(current_iteration, 2) = 1, 'pong', 'ping')),
+                '{{{{curr_slot}}}}', IFF(MOD(current_iteration, 2) = 1, 'ping', 'pong'));
+        END IF;
+
+        iteration_sql := 'BEGIN' || CHR(10) || iteration_sql || CHR(10) || 'END;';
+        EXECUTE IMMEDIATE :iteration_sql;
+
+        SELECT COALESCE(MAX(updated_count), 0) INTO :changed
+        FROM {stats_table}
+        WHERE iteration = :current_iteration;
+
+        current_iteration := current_iteration + 1;
+    END WHILE;{final_copy}
+
+    iteration_stats := (
+        SELECT iteration, updated_count, time
+        FROM {stats_table}
+        WHERE iteration BETWEEN :START_ITERATION AND :current_iteration - 1
+        ORDER BY iteration
+    );
+    RETURN TABLE(iteration_stats);
+END;
+$$;"""
+
+
+def generate_frontier_seed_sql_snowflake(
+    database: str, schema: str, canonical_id_name: str, prev_table: str, id_type: str = "VARCHAR"
+) -> str:
+    """Seed the frontier from the first (full) iteration: followers it re-pointed plus their new leaders"""
+    diff_table = format_database_table(database, schema, f"{canonical_id_name}_unify_loop_leader_diff")
+    frontier_table = format_database_table(database, schema, f"{canonical_id_name}_unify_loop_frontier_keys")
+    pending_table = format_database_table(database, schema, f"{canonical_id_name}_unify_loop_frontier_pending")
+
+    return f"""-- Frontier for the next iteration: followers re-pointed above and the leaders they moved to
+CREATE OR REPLACE TRANSIENT TABLE {pending_table} AS
+SELECT DISTINCT follower_id, follower_ns FROM (
+    SELECT prev.follower_id, prev.follower_ns
+    FROM {prev_table} prev
+    INNER JOIN {diff_table} diff
+    ON prev.leader_id = diff.older_leader_id AND prev.leader_ns = diff.older_leader_ns
 
--- Canonicalized canonical ID lookup table matching Presto exactly
-DROP TABLE IF EXISTS {lookup_table_tmp};
-CREATE TABLE {lookup_table_tmp}
-CLUSTER BY (id) AS
+    UNION ALL
+
+    SELECT older_leader_id as follower_id, older_leader_ns as follower_ns FROM {diff_table}
+
+    UNION ALL
+
+    SELECT
+        {leader_key_id_sql_snowflake('newer_leader_key', id_type)} as follower_id,
+        {leader_key_ns_sql_snowflake('newer_leader_key', id_type)} as follower_ns
+    FROM {diff_table}
+) frontier;
+
+CREATE OR REPLACE TRANSIENT TABLE {frontier_table} AS
+SELECT * FROM {pending_table};"""
+
+
+def generate_frontier_loop_iteration_sql_snowflake(
+    database: str,
+    schema: str,
+    canonical_id_name: str,
+    iteration: Union[int, str],
+    priority_case_sql: str,
+    id_type: str = "VARCHAR",
+    source_table_bitmask: bool = False,
+) -> str:
+    """
+    Generate one frontier-mode unify loop iteration.
+
+    Only followers that could still change are touched: the leader diff is computed over the
+    frontier (followers re-pointed by the previous iteration and their new leaders), the
+    followers attached to a re-pointed leader are re-aggregated, and the result is merged into
+    the persistent final graph table. The next frontier is staged in a pending table before the
+    MERGE, and every iteration reads frontier and pending together, so re-running an
+    interrupted iteration never loses followers.
+    """
+    graph_table = format_database_table(database, schema, f"{canonical_id_name}_graph_unify_loop_final")
+    diff_table = format_database_table(database, schema, f"{canonical_id_name}_unify_loop_leader_diff")
+    rows_table = format_database_table(database, schema, f"{canonical_id_name}_unify_loop_frontier_rows")
+    frontier_table = format_database_table(database, schema, f"{canonical_id_name}_unify_loop_frontier_keys")
+    pending_table = format_database_table(database, schema, f"{canonical_id_name}_unify_loop_frontier_pending")
+    stats_table = format_database_table(database, schema, f"{canonical_id_name}_unify_loop_stats")
+    source_table_ids_merge_sql, source_table_ids_from_sql = source_table_ids_merge_sql_snowflake(
+        source_table_bitmask
+    )
+
+    def rows_with_leader_leader_cte(name: str, keys_sql: str) -> str:
+        # Same shape as prev_table_with_leader_leader, restricted to the given followers
+        return f"""{name}_rows AS (
+    SELECT
+        graph.follower_id, graph.follower_ns, graph.leader_id, graph.leader_ns,
+        graph.follower_first_seen_at, graph.follower_last_seen_at,
+        graph.follower_source_table_ids, graph.follower_last_processed_at
+    FROM {graph_table} graph
+    INNER JOIN ({keys_sql}) selected_keys
+    ON graph.follower_id = selected_keys.follower_id AND graph.follower_ns = selected_keys.follower_ns
+),
+{name}_with_leader_leader AS (
+    SELECT
+        follower_id, follower_ns, leader_id, leader_ns,
+        follower_first_seen_at, follower_last_seen_at,
+        follower_source_table_ids, follower_last_processed_at
+    FROM {name}_rows
+
+    UNION ALL
+
+    -- leader -> leader relationship for followers that lead other followers
+    SELECT
+        follower_id, follower_ns, follower_id as leader_id, follower_ns as leader_ns,
+        follower_first_seen_at, follower_last_seen_at,
+        follower_source_table_ids, follower_last_processed_at
+    FROM {name}_rows followers
+    WHERE EXISTS (
+        SELECT 1 FROM {graph_table} leaders
+        WHERE leaders.leader_id = followers.follower_id AND leaders.leader_ns = followers.follower_ns
+    )
+)"""
+
+    frontier_keys_sql = f"""
+        SELECT follower_id, follower_ns FROM {frontier_table}
+        UNION
+        SELECT follower_id, follower_ns FROM {pending_table}
+    """
+    affected_keys_sql = f"""
+        SELECT attached.follower_id, attached.follower_ns
+        FROM {graph_table} attached
+        INNER JOIN {diff_table} diff
+        ON attached.leader_id = diff.older_leader_id AND attached.leader_ns = diff.older_leader_ns
+        UNION
+        SELECT older_leader_id, older_leader_ns FROM {diff_table}
+    """
+
+    return f"""USE DATABASE {database};
+USE SCHEMA {schema};
+
+-- Leaders re-pointed in this iteration, found among the frontier followers only
+CREATE OR REPLACE TRANSIENT TABLE {diff_table} AS
+WITH {rows_with_leader_leader_cte("frontier", frontier_keys_sql)}
+SELECT DISTINCT
+    {leader_key_id_sql_snowflake('older_leader_key', id_type)} as older_leader_id,
+    {leader_key_ns_sql_snowflake('older_leader_key', id_type)} as older_leader_ns,
+    newer_leader_key
+FROM (
+    SELECT
+        older_leader_key,
+        MIN(newer_leader_key) as newer_leader_key
+    FROM (
+        SELECT
+            leader_key as older_leader_key,
+            MIN(leader_key) OVER (PARTITION BY follower_id, follower_ns) as newer_leader_key
+        FROM (
+            SELECT
+                follower_id, follower_ns,
+                {leader_key_sql_snowflake(priority_case_sql, 'leader_id', id_type)} as leader_key
+            FROM frontier_with_leader_leader
+        ) rs
+    ) wsrs
+    WHERE older_leader_key > newer_leader_key
+    GROUP BY older_leader_key
+) diffrs;
+
+-- Re-aggregate every follower attached to a re-pointed leader
+CREATE OR REPLACE TRANSIENT TABLE {rows_table} AS
+WITH {rows_with_leader_leader_cte("affected", affected_keys_sql)}
+SELECT
+    follower_id, follower_ns, leader_id, leader_ns,
+    MIN(follower_first_seen_at) as follower_first_seen_at,
+    MAX(follower_last_seen_at) as follower_last_seen_at,
+    {source_table_ids_merge_sql} as follower_source_table_ids,
+    MAX(follower_last_processed_at) as follower_last_processed_at
+FROM (
+    SELECT
+        prev.follower_id, prev.follower_ns,
+        COALESCE({leader_key_id_sql_snowflake('diff.newer_leader_key', id_type)}, prev.leader_id) as leader_id,
+        COALESCE({leader_key_ns_sql_snowflake('diff.newer_leader_key', id_type)}, prev.leader_ns) as leader_ns,
+        prev.follower_first_seen_at, prev.follower_last_seen_at,
+        prev.follower_source_table_ids,
+        CASE WHEN diff.newer_leader_key IS NULL 
+             THEN prev.follower_last_processed_at 
+             ELSE DATE_PART(epoch_second, CURRENT_TIMESTAMP()) 
+        END as follower_last_processed_at
+    FROM affected_with_leader_leader prev
+    LEFT JOIN {diff_table} diff
+    ON prev.leader_id = diff.older_leader_id AND prev.leader_ns = diff.older_leader_ns
+) lp{source_table_ids_from_sql}
+GROUP BY follower_id, follower_ns, leader_id, leader_ns;
+
+-- Stage the next frontier before touching the graph
+CREATE OR REPLACE TRANSIENT TABLE {pending_table} AS
+SELECT follower_id, follower_ns FROM {rows_table}
+UNION
 SELECT
+    {leader_key_id_sql_snowflake('newer_leader_key', id_type)} as follower_id,
+    {leader_key_ns_sql_snowflake('newer_leader_key', id_type)} as follower_ns
+FROM {diff_table};
+
+-- Replace the rows of every re-aggregated follower in one atomic MERGE
+MERGE INTO {graph_table} graph
+USING (
+    SELECT
+        follower_id, follower_ns, leader_id, leader_ns,
+        follower_first_seen_at, follower_last_seen_at,
+        follower_source_table_ids, follower_last_processed_at,
+        FALSE as is_deleted
+    FROM {rows_table}
+
+    UNION ALL
+
+    SELECT
+        graph.follower_id, graph.follower_ns, graph.leader_id, graph.leader_ns,
+        graph.follower_first_seen_at, graph.follower_last_seen_at,
+        graph.follower_source_table_ids, graph.follower_last_processed_at,
+        TRUE as is_deleted
+    FROM {graph_table} graph
+    WHERE EXISTS (
+        SELECT 1 FROM {rows_table} staged
+        WHERE staged.follower_id = graph.follower_id AND staged.follower_ns = graph.follower_ns
+    )
+    AND NOT EXISTS (
+        SELECT 1 FROM {rows_table} staged
+        WHERE staged.follower_id = graph.follower_id AND staged.follower_ns = graph.follower_ns
+        AND staged.leader_id = graph.leader_id AND staged.leader_ns = graph.leader_ns
+    )
+) changes
+ON graph.follower_id = changes.follower_id AND graph.follower_ns = changes.follower_ns
+AND graph.leader_id = changes.leader_id AND graph.leader_ns = changes.leader_ns
+WHEN MATCHED AND changes.is_deleted THEN DELETE
+WHEN MATCHED THEN UPDATE SET
+    follower_first_seen_at = changes.follower_first_seen_at,
+    follower_last_seen_at = changes.follower_last_seen_at,
+    follower_source_table_ids = changes.follower_source_table_ids,
+    follower_last_processed_at = changes.follower_last_processed_at
+WHEN NOT MATCHED AND NOT changes.is_deleted THEN INSERT (
+    follower_id, follower_ns, leader_id, leader_ns,
+    follower_first_seen_at, follower_last_seen_at,
+    follower_source_table_ids, follower_last_processed_at
+) VALUES (
+    changes.follower_id, changes.follower_ns, changes.leader_id, changes.leader_ns,
+    changes.follower_first_seen_at, changes.follower_last_seen_at,
+    changes.follower_source_table_ids, changes.follower_last_processed_at
+);
+
+CREATE OR REPLACE TRANSIENT TABLE {frontier_table} AS
+SELECT * FROM {pending_table};
+
+-- Record iteration stats (read by the executor instead of an EXCEPT scan)
+DELETE FROM {stats_table} WHERE iteration = {iteration};
+
+INSERT INTO {stats_table}
+SELECT {iteration} as iteration, COUNT(*) as updated_count, DATE_PART(epoch_second, CURRENT_TIMESTAMP()) as time
+FROM {diff_table};"""
+
+
+def generate_lookup_select_sql_snowflake(
+    graph_table: str, keys_table: str, key_mask_values: List[str], source_table_count: Optional[int] = None
+) -> str:
+    """
+    SELECT producing <canonical_id>_lookup rows from a converged graph table;
+    keys_table maps key_type to key_name. With source_table_count set,
+    follower_source_table_ids is a bitmask and is expanded back into an array
+    """
+    source_table_ids_sql = "follower_source_table_ids"
+    if source_table_count is not None:
+        source_table_ids_sql = "ARRAY_CONSTRUCT_COMPACT({})".format(", ".join(
+            f"IFF(BITAND(follower_source_table_ids, {1 << (table_id - 1)}) <> 0, {table_id}, NULL)"
+            for table_id in range(1, source_table_count + 1)
+        ))
+    return f"""SELECT
     BASE64_ENCODE(
         CONCAT(
             TO_BINARY(
@@ -731,16 +1048,16 @@ SELECT
     canonical_id_last_seen_at,
     follower_first_seen_at as id_first_seen_at,
     follower_last_seen_at as id_last_seen_at,
-    follower_source_table_ids as id_source_table_ids,
+    {source_table_ids_sql} as id_source_table_ids,
     follower_last_processed_at as id_last_processed_at
-FROM {final_loop_table} graph
+FROM {graph_table} graph
 JOIN (
     SELECT
         keys.key_type,
         keys.key_name,
         TO_NUMBER(SUBSTR(masks.key_mask, 1, 16), 'XXXXXXXXXXXXXXXX') as key_mask_low64i,
         TO_BINARY(SUBSTR(masks.key_mask, 17, 2), 'HEX') as key_mask_high8b
-    FROM {keys_table_tmp} keys
+    FROM {keys_table} keys
     JOIN (
         SELECT * FROM VALUES
             {', '.join(key_mask_values)}
@@ -752,10 +1069,883 @@ JOIN (
         leader_id, leader_ns,
         MIN(follower_first_seen_at) AS canonical_id_first_seen_at,
         MAX(follower_last_seen_at) AS canonical_id_last_seen_at
-    FROM {final_loop_table}
+    FROM {graph_table}
     GROUP BY leader_id, leader_ns
 ) canonical_ids ON canonical_ids.leader_id = graph.leader_id
-                AND canonical_ids.leader_ns = graph.leader_ns;
+                AND canonical_ids.leader_ns = graph.leader_ns"""
+
+
+def build_enrich_key_cases_snowflake(
+    table: Dict[str, Any], keys_config: List[Dict[str, Any]], merge_keys: List[str]
+) -> Optional[Tuple[str, str, str, str]]:
+    """
+    Expressions picking a source row's first valid merge key, as used by the
+    enrich step: the validity condition, the hashed canonical id fallback, the
+    id and the key type. None when the table has no merge key columns
+    """
+    key_name_to_ns = {key: i + 1 for i, key in enumerate(merge_keys)}
+    key_name_to_config = {key["name"]: key for key in keys_config}
+
+    # Build prioritized key columns for this table (following extract_merge pattern)
+    table_key_columns = []
+    
+    for key_col in table["key_columns"]:
+        if key_col["key"] in merge_keys:
+            column = key_col["column"]
+            key_name = key_col["key"]
+            key_config = key_name_to_config.get(key_name, {})
+            key_ns = key_name_to_ns.get(key_name)
+
+            # Use proper NULL handling and valid_regexp
+            condition = format_invalid_values_condition(
+                column, key_config.get("invalid_texts", []), key_config.get("valid_regexp")
+            )
+            
+            table_key_columns.append({
+                'column': column,
+                'key_name': key_name,
+                'key_ns': key_ns,
+                'condition': condition,
+                'key_config': key_config
+            })
+
+    if not table_key_columns:
+        return None
+        
+    # Sort by merge_keys order to match extract_merge priority
+    def get_merge_key_priority(key_col):
+        return merge_keys.index(key_col['key_name'])
+    
+    table_key_columns.sort(key=get_merge_key_priority)
+
+    # Build CASE statements for lookup JOIN (id and id_key_type)
+    lookup_id_cases = []
+    lookup_key_type_cases = []
+    
+    # Build CASE statements for fallback hash generation
+    hash_cases = []
+    
+    for key_col in table_key_columns:
+        column = key_col['column']
+        key_ns = key_col['key_ns']
+        condition = key_col['condition']
+        
+        lookup_id_cases.append(f"""WHEN {condition}
+                THEN CAST(p.{column} AS VARCHAR)""")
+        
+        lookup_key_type_cases.append(f"""WHEN {condition}
+                THEN {key_ns}""")
+        
+        hash_expr = build_id_hash_expression_snowflake(
+            f"CAST(p.{column} AS VARCHAR)", key_ns, len(merge_keys)
+        )
+        hash_cases.append(f"""WHEN {condition}
+                THEN {hash_expr}""")
+
+    # Combine all conditions for the WHEN clause in COALESCE
+    all_valid_conditions = " OR ".join([f"({key_col['condition']})" for key_col in table_key_columns])
+    
+    # Build complete CASE statements
+    lookup_id_case = f"""CASE
+            {chr(10).join(lookup_id_cases)}
+            ELSE NULL
+        END"""
+    
+    lookup_key_type_case = f"""CASE
+            {chr(10).join(lookup_key_type_cases)}
+            ELSE NULL
+        END"""
+    
+    hash_case = f"""CASE
+            {chr(10).join(hash_cases)}
+            ELSE NULL
+        END"""
+    return all_valid_conditions, hash_case, lookup_id_case, lookup_key_type_case
+
+
+def build_master_select_parts_snowflake(
+    master: Dict[str, Any], tables_config: List[Dict[str, Any]], database: str, schema: str
+) -> Optional[Tuple[str, str]]:
+    """
+    UNION ALL over the enriched tables and the per-attribute aggregates of a
+    master table. None when no enriched table feeds its attributes
+    """
+    canonical_id = master["canonical_id"]
+    attributes = master.get("attributes", [])
+
+    # Build mapping of all tables that have enriched versions
+    enriched_table_map = {}
+    for table in tables_config:
+        table_name = table["table"]
+        # Handle table name mapping for enriched tables
+        clean_table_name = table_name.split('.')[-1]
+        
+        # Map table names to match Presto/TD naming conventions
+        if clean_table_name == 'kris_orders' or clean_table_name == 'kris_src_orders':
+            clean_table_name = 'orders'  # Match TD's naming
+        
+        enriched_table = format_database_table(database, schema, f"enriched_{table_name}")
+        
+        # Add mappings for both original and clean names
+        enriched_table_map[clean_table_name] = enriched_table
+        enriched_table_map[table_name] = enriched_table
+        
+        # Also add the full table name without database prefix
+        enriched_table_map[table_name.split('.')[-1]] = enriched_table
+
+    # Build UNION ALL queries for each enriched table
+    union_queries = []
+    
+    # Get all unique table names from attributes
+    tables_with_attributes = set()
+    for attr in attributes:
+        for source_col in attr.get("source_columns", []):
+            tables_with_attributes.add(source_col["table"])
+
+    for table_name in tables_with_attributes:
+        if table_name not in enriched_table_map:
+            continue
+            
+        enriched_table = enriched_table_map[table_name]
+        
+        # Build SELECT columns for this table
+        select_columns = [canonical_id]
+        
+        for attr in attributes:
+            attr_name = attr["name"]
+            source_columns = attr.get("source_columns", [])
+            
+            for i, source_col in enumerate(source_columns):
+                priority = source_col.get("priority", i + 1)
+                attr_col = f"{attr_name}_p{priority}_attr"
+                order_col = f"{attr_name}_p{priority}_order"
+                
+                if source_col["table"] == table_name:
+                    # This table contributes to this attribute at this priority
+                    column_name = source_col["column"]
+                    order_by = source_col.get("order_by", "time")
+                    select_columns.append(f"{column_name} as {attr_col}")
+                    select_columns.append(f"{order_by} as {order_col}")
+                else:
+                    # This table doesn't contribute to this attribute at this priority
+                    select_columns.append(f"CAST(NULL AS VARCHAR) as {attr_col}")
+                    select_columns.append(f"CAST(NULL AS NUMBER) as {order_col}")
+        
+        select_columns_str = ',\n            '.join(select_columns)
+        union_query = f"""SELECT
+            {select_columns_str}
+        FROM {enriched_table}
+        WHERE {canonical_id} IS NOT NULL"""
+        
+        union_queries.append(union_query)
+
+    if not union_queries:
+        return None
+
+    union_sql = "\n\n        UNION ALL\n        \n        ".join(union_queries)
+
+    # Build attribute selection logic matching Presto exactly
+    attr_selections = [canonical_id]
+    
+    for attr in attributes:
+        attr_name = attr["name"]
+        source_columns = attr.get("source_columns", [])
+        array_elements = attr.get("array_elements")
+        
+        if array_elements:
+            # Array attribute - replicate Presto's max_by(attr, order, limit) with filter
+            array_parts = []
+            for i, source_col in enumerate(source_columns):
+                priority = source_col.get("priority", i + 1)
+                attr_col = f"{attr_name}_p{priority}_attr"
+                order_col = f"{attr_name}_p{priority}_order"
+                
+                # Replicate: max_by("attr", "order", 3) filter (where cast("attr" as varchar) is not null)
+                array_parts.append(f"""COALESCE(
+                    ARRAY_SLICE(
+                        ARRAY_AGG(CASE WHEN CAST({attr_col} AS VARCHAR) IS NOT NULL THEN {attr_col} END) 
+                        WITHIN GROUP (ORDER BY {order_col} DESC),
+                        0, {array_elements}
+                    ),
+                    ARRAY_CONSTRUCT()
+                )""")
+            
+            # Use ARRAY_CAT to concatenate arrays (matching Presto's concat)
+            if len(array_parts) == 1:
+                array_concat_expr = array_parts[0]
+            else:
+                array_concat_expr = array_parts[0]
+                for part in array_parts[1:]:
+                    array_concat_expr = f"ARRAY_CAT({array_concat_expr}, {part})"
+            
+            # Replicate Presto's slice(concat(...), 1, 3) - note Presto is 1-indexed
+            attr_selection = f"""ARRAY_SLICE(
+            {array_concat_expr},
+            0, {array_elements}
+        ) AS {attr_name}"""
+        else:
+            # Single value attribute - replicate Presto's max_by with filter
+            if len(source_columns) == 1:
+                priority = source_columns[0].get("priority", 1)
+                attr_col = f"{attr_name}_p{priority}_attr"
+                order_col = f"{attr_name}_p{priority}_order"
+                # Replicate: max_by("attr", "order") filter (where cast("attr" as varchar) is not null)
+                attr_selection = f"""MAX_BY(
+            CASE WHEN CAST({attr_col} AS VARCHAR) IS NOT NULL THEN {attr_col} END,
+            CASE WHEN CAST({attr_col} AS VARCHAR) IS NOT NULL THEN {order_col} END
+        ) AS {attr_name}"""
+            else:
+                # Multiple sources with COALESCE (matching Presto pattern)
+                coalesce_parts = []
+                for source_col in source_columns:
+                    priority = source_col.get("priority", 999)
+                    attr_col = f"{attr_name}_p{priority}_attr"
+                    order_col = f"{attr_name}_p{priority}_order"
+                    coalesce_parts.append(f"""MAX_BY(
+            CASE WHEN CAST({attr_col} AS VARCHAR) IS NOT NULL THEN {attr_col} END,
+            CASE WHEN CAST({attr_col} AS VARCHAR) IS NOT NULL THEN {order_col} END
+        )""")
+                
+                coalesce_parts_str = ',\n            '.join(coalesce_parts)
+                attr_selection = f"""COALESCE(
+            {coalesce_parts_str}
+        ) AS {attr_name}"""
+        
+        attr_selections.append(attr_selection)
+
+    attr_selections_str = ',\n        '.join(attr_selections)
+    return union_sql, attr_selections_str
+
+
+def generate_workflow_sql_snowflake(
+    yaml_data: Dict[str, Any],
+    database: str,
+    schema: str,
+    src_database: str,
+    src_schema: str,
+    fix_syntax: bool = True,
+    loop_mode: str = "full",
+    loop_tables: str = "per-iteration",
+    loop_runner: str = "client",
+    loop_iterations: Optional[int] = None,
+    incremental: bool = False,
+    warm_start: bool = False,
+    surrogate_ids: bool = False,
+    source_table_bitmask: bool = False,
+) -> List[Tuple[str, str]]:
+    """
+    Generate all Snowflake SQL steps based on YAML configuration
+    incremental keeps the graph between runs and only extracts source rows
+    newer than the per-table watermarks of the previous run; warm_start seeds
+    iteration 0 with the previous run's converged graph; surrogate_ids runs the
+    unify loop on NUMBER ids and joins the string ids back in canonicalization;
+    source_table_bitmask carries follower_source_table_ids as a NUMBER bitmask
+    through the graph tables, expanded back into an array in the lookup
+    """
+    sql_files: List[Tuple[str, str]] = []
+
+    keys_config = yaml_data["keys"]
+    tables_config = yaml_data["tables"]
+    master_tables_config = yaml_data.get("master_tables", [])
+    merge_keys = get_merge_keys(yaml_data)
+    canonical_id_name = get_canonical_id_name(yaml_data)
+
+    # Calculate max iterations dynamically
+    max_iterations = loop_iterations or calculate_max_iterations(yaml_data)
+
+    # Assign table IDs
+    for idx, table in enumerate(tables_config, 1):
+        table["table_id"] = idx
+    if source_table_bitmask and len(tables_config) > MAX_BITMASK_SOURCE_TABLES:
+        raise ValueError(
+            f"A source table bitmask holds at most {MAX_BITMASK_SOURCE_TABLES} tables, "
+            f"the configuration has {len(tables_config)}"
+        )
+    if source_table_bitmask:
+        source_table_ids_type = "NUMBER"
+        source_table_ids_agg = "BITOR_AGG(BITSHIFTLEFT(1, follower_source_table_id - 1))"
+        source_table_ids_union = "BITOR(graph.follower_source_table_ids, edges.follower_source_table_ids)"
+    else:
+        source_table_ids_type = "ARRAY"
+        source_table_ids_agg = "ARRAY_AGG(DISTINCT follower_source_table_id)"
+        source_table_ids_union = (
+            "ARRAY_DISTINCT(ARRAY_CAT(graph.follower_source_table_ids, edges.follower_source_table_ids))"
+        )
+
+    # 01: Create main graph table using Snowflake syntax
+    graph_table = format_database_table(database, schema, f"{canonical_id_name}_graph_unify_loop_0")
+    loop_stats_table = format_database_table(database, schema, f"{canonical_id_name}_unify_loop_stats")
+    watermarks_table = format_database_table(database, schema, f"{canonical_id_name}_watermarks")
+    create_graph = "CREATE TABLE IF NOT EXISTS" if incremental else "CREATE OR REPLACE TABLE"
+    create_graph_sql = f"""USE DATABASE {database};
+USE SCHEMA {schema};
+
+{create_graph} {graph_table} (
+    follower_id VARCHAR,
+    follower_ns NUMBER,
+    leader_id VARCHAR,
+    leader_ns NUMBER,
+    follower_first_seen_at NUMBER,
+    follower_last_seen_at NUMBER,
+    follower_source_table_ids {source_table_ids_type},
+    follower_last_processed_at NUMBER
+)
+CLUSTER BY (follower_id);
+
+CREATE OR REPLACE TABLE {loop_stats_table} (
+    iteration NUMBER,
+    updated_count NUMBER,
+    time NUMBER
+);"""
+
+    if incremental:
+        create_graph_sql += f"""
+
+CREATE TABLE IF NOT EXISTS {watermarks_table} (
+    source_table VARCHAR,
+    source_table_id NUMBER,
+    max_time NUMBER,
+    updated_at NUMBER
+);"""
+
+    # Pairs a warm start adds to the edge table are recorded so they can be taken out again
+    warm_start_seed_table = format_database_table(database, schema, f"{canonical_id_name}_warm_start_seed")
+    if warm_start:
+        create_graph_sql += f"""
+
+CREATE TABLE IF NOT EXISTS {warm_start_seed_table} (
+    follower_id VARCHAR,
+    follower_ns NUMBER,
+    leader_id VARCHAR,
+    leader_ns NUMBER
+);
+
+-- Drop pairs an interrupted warm start left in the edge table
+DELETE FROM {graph_table} graph
+USING {warm_start_seed_table} seeded
+WHERE graph.follower_id = seeded.follower_id
+    AND graph.follower_ns = seeded.follower_ns
+    AND graph.leader_id = seeded.leader_id
+    AND graph.leader_ns = seeded.leader_ns;
+
+DELETE FROM {warm_start_seed_table};"""
+
+    sql_files.append(("01_create_graph", create_graph_sql))
+
+    # 02: Extract and merge (following the working pattern)
+    extract_blocks = []
+    for table in tables_config:
+        extract_blocks.append(
+            generate_extract_sql_snowflake(
+                table, keys_config, merge_keys, table["table_id"], database, schema, src_database, src_schema,
+                watermarks_table if incremental else None,
+            )
+        )
+
+    union_sql = (
+        "\n            \n            UNION ALL\n            \n            ".join(
+            extract_blocks
+        )
+    )
+
+    def edges_sql(records_sql: str) -> str:
+        # One row per (follower, leader) pair: every id of a record follows the record's first id
+        return f"""SELECT
+    follower_id,
+    follower_ns,
+    exploded_leaders.value:id::VARCHAR as leader_id,
+    exploded_leaders.value:ns::NUMBER as leader_ns,
+    follower_first_seen_at,
+    follower_last_seen_at,
+    follower_source_table_ids,
+    follower_last_processed_at
+FROM (
+    SELECT
+        follower_id,
+        follower_ns,
+        ARRAY_AGG(DISTINCT OBJECT_CONSTRUCT('id', leader_id, 'ns', leader_ns)) as leaders,
+        {source_table_ids_agg} as follower_source_table_ids,
+        MIN(follower_first_seen_at) as follower_first_seen_at,
+        MAX(follower_last_seen_at) as follower_last_seen_at,
+        MAX(follower_last_processed_at) as follower_last_processed_at
+    FROM (
+        SELECT
+            f.value:id::VARCHAR as follower_id,
+            f.value:ns::NUMBER as follower_ns,
+            id_ns_array[0]:id::VARCHAR as leader_id,
+            id_ns_array[0]:ns::NUMBER as leader_ns,
+            time as follower_first_seen_at,
+            time as follower_last_seen_at,
+            source_table_id as follower_source_table_id,
+            DATE_PART(epoch_second, CURRENT_TIMESTAMP()) as follower_last_processed_at
+        FROM {records_sql} extracted_records_id_arrays,
+        LATERAL FLATTEN(input => id_ns_array) f
+        WHERE ARRAY_SIZE(id_ns_array) > 0
+    ) extracted_flat_leader_follower_pairs
+    GROUP BY follower_id, follower_ns
+) followers,
+LATERAL FLATTEN(input => leaders) exploded_leaders"""
+
+    if not incremental:
+        records_sql = f"""(
+            {union_sql}
+        )"""
+        extract_merge_sql = f"""USE DATABASE {database};
+USE SCHEMA {schema};
+
+-- Task: Extract and merge data
+INSERT INTO {graph_table}
+{edges_sql(records_sql)};"""
+    else:
+        delta_table = format_database_table(database, schema, f"{canonical_id_name}_extract_delta")
+        source_table_cases = "\n        ".join(
+            f"WHEN {table['table_id']} THEN '{src_database}.{src_schema}.{table['table']}'"
+            for table in tables_config
+        )
+        extract_merge_sql = f"""USE DATABASE {database};
+USE SCHEMA {schema};
+
+-- Task: Extract source rows at or after each table's watermark
+CREATE OR REPLACE TABLE {delta_table} AS
+SELECT id_ns_array, time, source_table_id
+FROM (
+            {union_sql}
+) extracted_records;
+
+-- Task: Merge the new edges into the graph kept from previous runs
+MERGE INTO {graph_table} graph
+USING (
+{edges_sql(delta_table)}
+) edges
+ON graph.follower_id = edges.follower_id
+    AND graph.follower_ns = edges.follower_ns
+    AND graph.leader_id = edges.leader_id
+    AND graph.leader_ns = edges.leader_ns
+WHEN MATCHED THEN UPDATE SET
+    follower_first_seen_at = LEAST(graph.follower_first_seen_at, edges.follower_first_seen_at),
+    follower_last_seen_at = GREATEST(graph.follower_last_seen_at, edges.follower_last_seen_at),
+    follower_source_table_ids = {source_table_ids_union},
+    follower_last_processed_at = edges.follower_last_processed_at
+WHEN NOT MATCHED THEN INSERT (
+    follower_id, follower_ns, leader_id, leader_ns, follower_first_seen_at,
+    follower_last_seen_at, follower_source_table_ids, follower_last_processed_at
+) VALUES (
+    edges.follower_id, edges.follower_ns, edges.leader_id, edges.leader_ns, edges.follower_first_seen_at,
+    edges.follower_last_seen_at, edges.follower_source_table_ids, edges.follower_last_processed_at
+);
+
+-- Task: Advance each source table's watermark to the newest row extracted above
+MERGE INTO {watermarks_table} watermarks
+USING (
+    SELECT
+        CASE source_table_id
+        {source_table_cases}
+        END as source_table,
+        source_table_id,
+        MAX(time) as max_time
+    FROM {delta_table}
+    GROUP BY source_table_id
+    HAVING MAX(time) IS NOT NULL
+) extracted
+ON watermarks.source_table = extracted.source_table
+WHEN MATCHED THEN UPDATE SET
+    source_table_id = extracted.source_table_id,
+    max_time = GREATEST(watermarks.max_time, extracted.max_time),
+    updated_at = DATE_PART(epoch_second, CURRENT_TIMESTAMP())
+WHEN NOT MATCHED THEN INSERT (source_table, source_table_id, max_time, updated_at)
+VALUES (extracted.source_table, extracted.source_table_id, extracted.max_time, DATE_PART(epoch_second, CURRENT_TIMESTAMP()));"""
+
+    sql_files.append(("02_extract_merge", extract_merge_sql))
+
+    # 02: Warm start - the executor skips this step when the previous graph is missing
+    # or was built with other keys or priorities (see the fingerprint header)
+    key_fingerprint = get_key_fingerprint(yaml_data, surrogate_ids, source_table_bitmask)
+    if warm_start:
+        previous_graph_table = format_database_table(database, schema, f"{canonical_id_name}_graph")
+        warm_start_sql = f"""-- warm_start: fingerprint={key_fingerprint}
+USE DATABASE {database};
+USE SCHEMA {schema};
+
+-- Task: Record the previous run's pairs that are not extracted edges; 05_canonicalize removes them
+INSERT INTO {warm_start_seed_table}
+SELECT previous.follower_id, previous.follower_ns, previous.leader_id, previous.leader_ns
+FROM {previous_graph_table} previous
+WHERE NOT EXISTS (
+    SELECT 1 FROM {graph_table} graph
+    WHERE graph.follower_id = previous.follower_id
+        AND graph.follower_ns = previous.follower_ns
+        AND graph.leader_id = previous.leader_id
+        AND graph.leader_ns = previous.leader_ns
+);
+
+-- Task: Seed iteration 0 with the previous run's converged follower -> leader pairs
+MERGE INTO {graph_table} graph
+USING {previous_graph_table} previous
+ON graph.follower_id = previous.follower_id
+    AND graph.follower_ns = previous.follower_ns
+    AND graph.leader_id = previous.leader_id
+    AND graph.leader_ns = previous.leader_ns
+WHEN NOT MATCHED THEN INSERT (
+    follower_id, follower_ns, leader_id, leader_ns, follower_first_seen_at,
+    follower_last_seen_at, follower_source_table_ids, follower_last_processed_at
+) VALUES (
+    previous.follower_id, previous.follower_ns, previous.leader_id, previous.leader_ns,
+    previous.follower_first_seen_at, previous.follower_last_seen_at,
+    previous.follower_source_table_ids, previous.follower_last_processed_at
+);"""
+        sql_files.append(("02_warm_start_seed", warm_start_sql))
+
+    # 03: Source key statistics - matching TD Presto structure
+    source_stats_table = format_database_table(
+        database, schema, f"{canonical_id_name}_source_key_stats"
+    )
+    
+    # Build table flag expressions for leader and follower stats
+    table_flag_exprs = []
+    table_names = []
+    grouping_sets_items = []
+    case_conditions = []
+    
+    for table in tables_config:
+        table_id = table["table_id"]
+        table_name = table["table"]
+        table_names.append(table_name)
+        table_flag_exprs.append(
+            f"BOOLOR_AGG({source_table_ids_contains_sql_snowflake('follower_source_table_ids', table_id, source_table_bitmask)})"
+            f" as from_{table_name}"
+        )
+        grouping_sets_items.append(f"(from_{table_name})")
+        case_conditions.append(f"WHEN from_{table_name} THEN '{table_name}'")
+    
+    # Add empty grouping set for totals
+    grouping_sets_items.append("()")
+    case_conditions_str = " ".join(case_conditions)
+    grouping_sets_str = ", ".join(grouping_sets_items)
+    
+    # Build dynamic distinct columns based on merge keys
+    key_name_to_ns = {key: i + 1 for i, key in enumerate(merge_keys)}
+    distinct_key_columns = []
+    for key_name in merge_keys:
+        key_ns = key_name_to_ns[key_name]
+        distinct_key_columns.append(f"COUNT_IF(follower_ns = {key_ns}) as distinct_{key_name}")
+    
+    # HAVING condition to match TD logic
+    having_conditions = " AND ".join([f"COALESCE(from_{name}, TRUE)" for name in table_names])
+
+    # Create dynamic column definitions for the table
+    distinct_column_defs = [f"distinct_{key} NUMBER" for key in merge_keys]
+    
+    source_stats_sql = f"""USE DATABASE {database};
+USE SCHEMA {schema};
+
+CREATE OR REPLACE TABLE {source_stats_table} (
+    from_table VARCHAR,
+    total_distinct NUMBER,
+    {', '.join(distinct_column_defs)},
+    time NUMBER
+);
+
+INSERT INTO {source_stats_table}
+SELECT
+    leader_stats.from_table,
+    total_distinct,
+    {', '.join([f'distinct_{key}' for key in merge_keys])},
+    DATE_PART(epoch_second, CURRENT_TIMESTAMP()) as time
+FROM (
+    SELECT
+        CASE
+            {case_conditions_str}
+            ELSE '*'
+        END as from_table,
+        total_distinct
+    FROM (
+        SELECT
+            {', '.join([f'from_{name}' for name in table_names])},
+            COUNT(*) as total_distinct
+        FROM (
+            SELECT
+                leader_id,
+                leader_ns,
+                {', '.join(table_flag_exprs)}
+            FROM {graph_table}
+            GROUP BY leader_id, leader_ns
+        ) distinct_leaders
+        GROUP BY GROUPING SETS ({grouping_sets_str})
+        HAVING {having_conditions}
+    ) source_leader_stats
+) leader_stats
+JOIN (
+    SELECT
+        CASE
+            {case_conditions_str}
+            ELSE '*'
+        END as from_table,
+        {', '.join([f'distinct_{key}' for key in merge_keys])}
+    FROM (
+        SELECT
+            {', '.join([f'from_{name}' for name in table_names])},
+            {', '.join(distinct_key_columns)}
+        FROM (
+            SELECT
+                follower_id,
+                follower_ns,
+                {', '.join(table_flag_exprs)}
+            FROM {graph_table}
+            GROUP BY follower_id, follower_ns
+        ) distinct_followers
+        GROUP BY GROUPING SETS ({grouping_sets_str})
+        HAVING {having_conditions}
+    ) source_follower_stats
+) follower_stats
+ON leader_stats.from_table = follower_stats.from_table;"""
+
+    sql_files.append(("03_source_key_stats", source_stats_sql))
+
+    # 03: Surrogate id dictionary - the loop joins, groups and compares numbers instead of strings
+    id_dictionary_table = format_database_table(database, schema, f"{canonical_id_name}_id_dictionary")
+    surrogate_graph_table = format_database_table(database, schema, f"{canonical_id_name}_graph_surrogate_0")
+    id_type = "NUMBER" if surrogate_ids else "VARCHAR"
+    if surrogate_ids:
+        id_dictionary_sql = f"""USE DATABASE {database};
+USE SCHEMA {schema};
+
+-- Surrogates are ranks in (id, ns) order, so the loop picks the same leaders as on the
+-- strings. Ranks are numbered per two-character prefix and offset by the sizes of the
+-- preceding prefixes, which keeps the numbering distributed
+CREATE OR REPLACE TABLE {id_dictionary_table}
+CLUSTER BY (id) AS
+WITH ids AS (
+    SELECT follower_id AS id, follower_ns AS ns FROM {graph_table}
+    UNION
+    SELECT leader_id AS id, leader_ns AS ns FROM {graph_table}
+),
+buckets AS (
+    SELECT SUBSTR(id, 1, 2) AS bucket, COUNT(*) AS bucket_size
+    FROM ids
+    GROUP BY SUBSTR(id, 1, 2)
+),
+offsets AS (
+    SELECT bucket, SUM(bucket_size) OVER (ORDER BY bucket) - bucket_size AS bucket_offset
+    FROM buckets
+)
+SELECT
+    offsets.bucket_offset
+        + ROW_NUMBER() OVER (PARTITION BY offsets.bucket ORDER BY ids.id, ids.ns) AS surrogate_id,
+    ids.id,
+    ids.ns
+FROM ids
+JOIN offsets ON offsets.bucket = SUBSTR(ids.id, 1, 2);
+
+-- Iteration 0 on surrogate ids
+CREATE OR REPLACE TRANSIENT TABLE {surrogate_graph_table}
+CLUSTER BY (follower_id) AS
+SELECT
+    followers.surrogate_id AS follower_id,
+    graph.follower_ns,
+    leaders.surrogate_id AS leader_id,
+    graph.leader_ns,
+    graph.follower_first_seen_at,
+    graph.follower_last_seen_at,
+    graph.follower_source_table_ids,
+    graph.follower_last_processed_at
+FROM {graph_table} graph
+JOIN {id_dictionary_table} followers
+    ON followers.id = graph.follower_id AND followers.ns = graph.follower_ns
+JOIN {id_dictionary_table} leaders
+    ON leaders.id = graph.leader_id AND leaders.ns = graph.leader_ns;"""
+
+        sql_files.append(("03_id_dictionary", id_dictionary_sql))
+
+    # 04: Unification loop iterations (dynamic count)
+    final_loop_table = format_database_table(database, schema, f"{canonical_id_name}_graph_unify_loop_final")
+    loop_header = generate_unify_loop_header(canonical_id_name, loop_mode, loop_tables, loop_runner)
+    prev_table = surrogate_graph_table if surrogate_ids else graph_table
+    for i in range(1, max_iterations + 1):
+        if loop_tables == "ping-pong":
+            # Alternate between two working tables instead of one table per iteration
+            curr_table = format_database_table(
+                database, schema, f"{canonical_id_name}_graph_unify_loop_{'ping' if i % 2 else 'pong'}"
+            )
+        else:
+            curr_table = format_database_table(
+                database, schema, f"{canonical_id_name}_graph_unify_loop_{i}"
+            )
+
+        # Build priority array mapping to replicate TD's array[1,2,3][leader_ns] logic
+        priority_array = get_key_priority_array(yaml_data)  # Configurable priority array
+        
+        # Build CASE statement that replicates array[1,2,3][leader_ns] in Snowflake
+        priority_case_conditions = []
+        for ns_idx, priority in enumerate(priority_array):
+            ns = ns_idx + 1  # Convert 0-based to 1-based namespace
+            priority_case_conditions.append(f"WHEN {ns} THEN {priority}")
+        
+        priority_case_sql = f"""CASE leader_ns 
+                {' '.join(priority_case_conditions)} 
+                ELSE leader_ns 
+            END"""
+
+        if loop_mode == "frontier" and i == 1:
+            # First pass is a full iteration written straight into the persistent graph
+            loop_sql = generate_unify_loop_iteration_sql_snowflake(
+                database, schema, canonical_id_name, i, prev_table, final_loop_table, priority_case_sql,
+                id_type=id_type,
+                source_table_bitmask=source_table_bitmask,
+            )
+            loop_sql += "\n\n" + generate_frontier_seed_sql_snowflake(
+                database, schema, canonical_id_name, prev_table, id_type=id_type
+            )
+        elif loop_mode == "frontier":
+            loop_sql = generate_frontier_loop_iteration_sql_snowflake(
+                database, schema, canonical_id_name, i, priority_case_sql, id_type=id_type,
+                source_table_bitmask=source_table_bitmask,
+            )
+        else:
+            loop_sql = generate_unify_loop_iteration_sql_snowflake(
+                database,
+                schema,
+                canonical_id_name,
+                i,
+                prev_table,
+                curr_table,
+                priority_case_sql,
+                pointer_jump=loop_mode == "pointer-jumping",
+                create_as_select=loop_tables == "ping-pong",
+                id_type=id_type,
+                source_table_bitmask=source_table_bitmask,
+            )
+
+        sql_files.append((f"04_unify_loop_iteration_{i:02d}", f"{loop_header}\n{loop_sql}"))
+        if i == 1:
+            first_loop_sql = loop_sql
+        prev_table = curr_table
+
+    # Template the executor renders for iterations beyond the generated files
+    if loop_mode == "frontier":
+        template_sql = generate_frontier_loop_iteration_sql_snowflake(
+            database, schema, canonical_id_name, "{{iteration}}", priority_case_sql, id_type=id_type,
+            source_table_bitmask=source_table_bitmask,
+        )
+    else:
+        # Ping-pong slots are rendered by the executor from the iteration number
+        prev_suffix, curr_suffix = (
+            ("{{prev_slot}}", "{{curr_slot}}")
+            if loop_tables == "ping-pong"
+            else ("{{prev_iteration}}", "{{iteration}}")
+        )
+        template_sql = generate_unify_loop_iteration_sql_snowflake(
+            database,
+            schema,
+            canonical_id_name,
+            "{{iteration}}",
+            format_database_table(database, schema, f"{canonical_id_name}_graph_unify_loop_{prev_suffix}"),
+            format_database_table(database, schema, f"{canonical_id_name}_graph_unify_loop_{curr_suffix}"),
+            priority_case_sql,
+            pointer_jump=loop_mode == "pointer-jumping",
+            create_as_select=loop_tables == "ping-pong",
+            id_type=id_type,
+            source_table_bitmask=source_table_bitmask,
+        )
+    if loop_runner == "procedure":
+        sql_files.append((
+            "04_unify_loop_procedure",
+            generate_unify_loop_procedure_sql_snowflake(
+                database, schema, canonical_id_name, first_loop_sql, template_sql
+            ),
+        ))
+    sql_files.append((LOOP_TEMPLATE_FILE, f"{loop_header}\n{template_sql}"))
+
+    # 05: Simple canonicalization using the final loop table
+    lookup_table = format_database_table(database, schema, f"{canonical_id_name}_lookup")
+    keys_table = format_database_table(database, schema, f"{canonical_id_name}_keys")
+    tables_table = format_database_table(database, schema, f"{canonical_id_name}_tables")
+    final_graph_table = format_database_table(database, schema, f"{canonical_id_name}_graph")
+    
+    # Use the final loop table (created by SQL executor as an alias to the actual final iteration)
+    final_loop_table = format_database_table(database, schema, f"{canonical_id_name}_graph_unify_loop_final")
+
+    key_values = []
+    table_values = []
+    
+    for i, key in enumerate(merge_keys):
+        key_ns = i + 1
+        key_values.append(f"({key_ns}, '{key}')")
+    
+    for i, table in enumerate(tables_config):
+        # Fix table name to match TD exactly (remove database prefix)
+        table_name = table['table'].split('.')[-1]  # Remove any database prefix
+        if table_name == 'kris_src_orders':
+            table_name = 'orders'  # Match TD's naming
+        table_values.append(f"({i+1}, '{table_name}')")
+
+    # Canonicalization step using dynamic key mask generation
+    keys_table_tmp = format_database_table(database, schema, f"{canonical_id_name}_keys_tmp")
+    tables_table_tmp = format_database_table(database, schema, f"{canonical_id_name}_tables_tmp")
+    lookup_table_tmp = format_database_table(database, schema, f"{canonical_id_name}_lookup_tmp")
+    
+    # Generate dynamic key mask values based on number of merge keys
+    key_masks = generate_key_mask_values(len(merge_keys))
+    key_mask_values = []
+    for i, mask in enumerate(key_masks):
+        key_mask_values.append(f"({i+1}, '{mask}')")
+    
+    # Extract table names to avoid f-string backslash issues
+    lookup_table_name = lookup_table.split('.')[-1]
+    keys_table_name = keys_table.split('.')[-1]
+    tables_table_name = tables_table.split('.')[-1]
+    final_graph_table_name = final_graph_table.split('.')[-1]
+    
+    # With surrogate ids, canonicalize a copy of the converged graph with the string ids joined back
+    canonical_graph_table = final_loop_table
+    join_back_sql = ""
+    drop_loop_graph_sql = ""
+    if surrogate_ids:
+        canonical_graph_table = format_database_table(database, schema, f"{canonical_id_name}_graph_tmp")
+        join_back_sql = f"""-- Join the string ids back onto the converged graph
+CREATE OR REPLACE TABLE {canonical_graph_table}
+CLUSTER BY (follower_id) AS
+SELECT
+    followers.id AS follower_id,
+    followers.ns AS follower_ns,
+    leaders.id AS leader_id,
+    leaders.ns AS leader_ns,
+    graph.follower_first_seen_at,
+    graph.follower_last_seen_at,
+    graph.follower_source_table_ids,
+    graph.follower_last_processed_at
+FROM {final_loop_table} graph
+JOIN {id_dictionary_table} followers ON followers.surrogate_id = graph.follower_id
+JOIN {id_dictionary_table} leaders ON leaders.surrogate_id = graph.leader_id;
+
+"""
+        drop_loop_graph_sql = f"\nDROP TABLE IF EXISTS {final_loop_table};"
+
+    lookup_select_sql = generate_lookup_select_sql_snowflake(
+        canonical_graph_table, keys_table_tmp, key_mask_values,
+        source_table_count=len(tables_config) if source_table_bitmask else None,
+    )
+
+    canonicalize_sql = f"""USE DATABASE {database};
+USE SCHEMA {schema};
+
+{join_back_sql}-- Create temporary reference tables matching Presto exactly
+DROP TABLE IF EXISTS {keys_table_tmp};
+CREATE TABLE {keys_table_tmp} AS
+SELECT * FROM VALUES
+    {', '.join(key_values)}
+AS t (key_type, key_name);
+
+DROP TABLE IF EXISTS {tables_table_tmp};
+CREATE TABLE {tables_table_tmp} AS
+SELECT * FROM VALUES
+    {', '.join(table_values)}
+AS t (table_id, table_name);
+
+-- Canonicalized canonical ID lookup table matching Presto exactly
+DROP TABLE IF EXISTS {lookup_table_tmp};
+CREATE TABLE {lookup_table_tmp}
+CLUSTER BY (id) AS
+{lookup_select_sql};
 
 -- Commit lookup tables
 DROP TABLE IF EXISTS {lookup_table};
@@ -765,7 +1955,25 @@ ALTER TABLE {keys_table_tmp} RENAME TO {keys_table_name};
 DROP TABLE IF EXISTS {tables_table};
 ALTER TABLE {tables_table_tmp} RENAME TO {tables_table_name};
 DROP TABLE IF EXISTS {final_graph_table};
-ALTER TABLE {final_loop_table} RENAME TO {final_graph_table_name};"""
+ALTER TABLE {canonical_graph_table} RENAME TO {final_graph_table_name};{drop_loop_graph_sql}"""
+
+    if warm_start:
+        fingerprint_table = format_database_table(database, schema, f"{canonical_id_name}_graph_fingerprint")
+        canonicalize_sql += f"""
+
+-- Take the seeded pairs back out so the edge table only holds extracted edges
+DELETE FROM {graph_table} graph
+USING {warm_start_seed_table} seeded
+WHERE graph.follower_id = seeded.follower_id
+    AND graph.follower_ns = seeded.follower_ns
+    AND graph.leader_id = seeded.leader_id
+    AND graph.leader_ns = seeded.leader_ns;
+
+DELETE FROM {warm_start_seed_table};
+
+-- Keys and priorities the graph was built with, checked before the next warm start
+CREATE OR REPLACE TABLE {fingerprint_table} AS
+SELECT '{key_fingerprint}' AS key_fingerprint, DATE_PART(epoch_second, CURRENT_TIMESTAMP()) AS time;"""
 
     sql_files.append(("05_canonicalize", canonicalize_sql))
 
@@ -789,7 +1997,10 @@ ALTER TABLE {final_loop_table} RENAME TO {final_graph_table_name};"""
             clean_table_name = 'orders'  # Match TD's naming
         
         clean_table_names.append(clean_table_name)
-        table_flag_exprs.append(f"BOOLOR_AGG(ARRAYS_OVERLAP(follower_source_table_ids, ARRAY_CONSTRUCT({table_id}))) as from_{clean_table_name}")
+        table_flag_exprs.append(
+            f"BOOLOR_AGG({source_table_ids_contains_sql_snowflake('follower_source_table_ids', table_id, source_table_bitmask)})"
+            f" as from_{clean_table_name}"
+        )
         case_conditions.append(f"WHEN source_groups.from_{clean_table_name} THEN '{clean_table_name}'")
         grouping_sets_items.append(f"(from_{clean_table_name})")
     
@@ -896,84 +2107,11 @@ GROUP BY {', '.join([f'source_groups.from_{name}' for name in clean_table_names]
     # 10+ Enrichments (for each source table)
     for table in tables_config:
         table_name = table["table"]
-        key_name_to_ns = {key: i + 1 for i, key in enumerate(merge_keys)}
-        key_name_to_config = {key["name"]: key for key in keys_config}
-
-        # Build prioritized key columns for this table (following extract_merge pattern)
-        table_key_columns = []
-        
-        for key_col in table["key_columns"]:
-            if key_col["key"] in merge_keys:
-                column = key_col["column"]
-                key_name = key_col["key"]
-                key_config = key_name_to_config.get(key_name, {})
-                key_ns = key_name_to_ns.get(key_name)
-
-                # Use proper NULL handling and valid_regexp
-                condition = format_invalid_values_condition(
-                    column, key_config.get("invalid_texts", []), key_config.get("valid_regexp")
-                )
-                
-                table_key_columns.append({
-                    'column': column,
-                    'key_name': key_name,
-                    'key_ns': key_ns,
-                    'condition': condition,
-                    'key_config': key_config
-                })
-
+        key_cases = build_enrich_key_cases_snowflake(table, keys_config, merge_keys)
         # Skip if no key columns for this table
-        if not table_key_columns:
+        if not key_cases:
             continue
-            
-        # Sort by merge_keys order to match extract_merge priority
-        def get_merge_key_priority(key_col):
-            return merge_keys.index(key_col['key_name'])
-        
-        table_key_columns.sort(key=get_merge_key_priority)
-
-        # Build CASE statements for lookup JOIN (id and id_key_type)
-        lookup_id_cases = []
-        lookup_key_type_cases = []
-        
-        # Build CASE statements for fallback hash generation
-        hash_cases = []
-        
-        for key_col in table_key_columns:
-            column = key_col['column']
-            key_ns = key_col['key_ns']
-            condition = key_col['condition']
-            
-            lookup_id_cases.append(f"""WHEN {condition}
-                THEN CAST(p.{column} AS VARCHAR)""")
-            
-            lookup_key_type_cases.append(f"""WHEN {condition}
-                THEN {key_ns}""")
-            
-            hash_expr = build_id_hash_expression_snowflake(
-                f"CAST(p.{column} AS VARCHAR)", key_ns, len(merge_keys)
-            )
-            hash_cases.append(f"""WHEN {condition}
-                THEN {hash_expr}""")
-
-        # Combine all conditions for the WHEN clause in COALESCE
-        all_valid_conditions = " OR ".join([f"({key_col['condition']})" for key_col in table_key_columns])
-        
-        # Build complete CASE statements
-        lookup_id_case = f"""CASE
-            {chr(10).join(lookup_id_cases)}
-            ELSE NULL
-        END"""
-        
-        lookup_key_type_case = f"""CASE
-            {chr(10).join(lookup_key_type_cases)}
-            ELSE NULL
-        END"""
-        
-        hash_case = f"""CASE
-            {chr(10).join(hash_cases)}
-            ELSE NULL
-        END"""
+        all_valid_conditions, hash_case, lookup_id_case, lookup_key_type_case = key_cases
 
         enriched_table = format_database_table(database, schema, f"enriched_{table_name}")
         enriched_table_tmp = format_database_table(
@@ -1015,155 +2153,20 @@ ALTER TABLE {enriched_table_tmp} RENAME TO {enriched_table.split('.')[-1]};"""
     for master in master_tables_config:
         master_name = master["name"]
         canonical_id = master["canonical_id"]
-        attributes = master.get("attributes", [])
 
         master_table = format_database_table(database, schema, master_name)
         master_table_tmp = format_database_table(database, schema, f"{master_name}_tmp")
 
-        # Build mapping of all tables that have enriched versions
-        enriched_table_map = {}
-        for table in tables_config:
-            table_name = table["table"]
-            # Handle table name mapping for enriched tables
-            clean_table_name = table_name.split('.')[-1]
-            
-            # Map table names to match Presto/TD naming conventions
-            if clean_table_name == 'kris_orders' or clean_table_name == 'kris_src_orders':
-                clean_table_name = 'orders'  # Match TD's naming
-            
-            enriched_table = format_database_table(database, schema, f"enriched_{table_name}")
-            
-            # Add mappings for both original and clean names
-            enriched_table_map[clean_table_name] = enriched_table
-            enriched_table_map[table_name] = enriched_table
-            
-            # Also add the full table name without database prefix
-            enriched_table_map[table_name.split('.')[-1]] = enriched_table
-
-        # Build UNION ALL queries for each enriched table
-        union_queries = []
-        
-        # Get all unique table names from attributes
-        tables_with_attributes = set()
-        for attr in attributes:
-            for source_col in attr.get("source_columns", []):
-                tables_with_attributes.add(source_col["table"])
-
-        for table_name in tables_with_attributes:
-            if table_name not in enriched_table_map:
-                continue
-                
-            enriched_table = enriched_table_map[table_name]
-            
-            # Build SELECT columns for this table
-            select_columns = [canonical_id]
-            
-            for attr in attributes:
-                attr_name = attr["name"]
-                source_columns = attr.get("source_columns", [])
-                
-                for i, source_col in enumerate(source_columns):
-                    priority = source_col.get("priority", i + 1)
-                    attr_col = f"{attr_name}_p{priority}_attr"
-                    order_col = f"{attr_name}_p{priority}_order"
-                    
-                    if source_col["table"] == table_name:
-                        # This table contributes to this attribute at this priority
-                        column_name = source_col["column"]
-                        order_by = source_col.get("order_by", "time")
-                        select_columns.append(f"{column_name} as {attr_col}")
-                        select_columns.append(f"{order_by} as {order_col}")
-                    else:
-                        # This table doesn't contribute to this attribute at this priority
-                        select_columns.append(f"CAST(NULL AS VARCHAR) as {attr_col}")
-                        select_columns.append(f"CAST(NULL AS NUMBER) as {order_col}")
-            
-            select_columns_str = ',\n            '.join(select_columns)
-            union_query = f"""SELECT
-            {select_columns_str}
-        FROM {enriched_table}
-        WHERE {canonical_id} IS NOT NULL"""
-            
-            union_queries.append(union_query)
-
-        if not union_queries:
+        master_parts = build_master_select_parts_snowflake(
+            master, tables_config, database, schema
+        )
+        if not master_parts:
             # Skip if no enriched tables found
             continue
-
-        union_sql = "\n\n        UNION ALL\n        \n        ".join(union_queries)
-
-        # Build attribute selection logic matching Presto exactly
-        attr_selections = [canonical_id]
-        
-        for attr in attributes:
-            attr_name = attr["name"]
-            source_columns = attr.get("source_columns", [])
-            array_elements = attr.get("array_elements")
-            
-            if array_elements:
-                # Array attribute - replicate Presto's max_by(attr, order, limit) with filter
-                array_parts = []
-                for i, source_col in enumerate(source_columns):
-                    priority = source_col.get("priority", i + 1)
-                    attr_col = f"{attr_name}_p{priority}_attr"
-                    order_col = f"{attr_name}_p{priority}_order"
-                    
-                    # Replicate: max_by("attr", "order", 3) filter (where cast("attr" as varchar) is not null)
-                    array_parts.append(f"""COALESCE(
-                    ARRAY_SLICE(
-                        ARRAY_AGG(CASE WHEN CAST({attr_col} AS VARCHAR) IS NOT NULL THEN {attr_col} END) 
-                        WITHIN GROUP (ORDER BY {order_col} DESC),
-                        0, {array_elements}
-                    ),
-                    ARRAY_CONSTRUCT()
-                )""")
-                
-                # Use ARRAY_CAT to concatenate arrays (matching Presto's concat)
-                if len(array_parts) == 1:
-                    array_concat_expr = array_parts[0]
-                else:
-                    array_concat_expr = array_parts[0]
-                    for part in array_parts[1:]:
-                        array_concat_expr = f"ARRAY_CAT({array_concat_expr}, {part})"
-                
-                # Replicate Presto's slice(concat(...), 1, 3) - note Presto is 1-indexed
-                attr_selection = f"""ARRAY_SLICE(
-            {array_concat_expr},
-            0, {array_elements}
-        ) AS {attr_name}"""
-            else:
-                # Single value attribute - replicate Presto's max_by with filter
-                if len(source_columns) == 1:
-                    priority = source_columns[0].get("priority", 1)
-                    attr_col = f"{attr_name}_p{priority}_attr"
-                    order_col = f"{attr_name}_p{priority}_order"
-                    # Replicate: max_by("attr", "order") filter (where cast("attr" as varchar) is not null)
-                    attr_selection = f"""MAX_BY(
-            CASE WHEN CAST({attr_col} AS VARCHAR) IS NOT NULL THEN {attr_col} END,
-            CASE WHEN CAST({attr_col} AS VARCHAR) IS NOT NULL THEN {order_col} END
-        ) AS {attr_name}"""
-                else:
-                    # Multiple sources with COALESCE (matching Presto pattern)
-                    coalesce_parts = []
-                    for source_col in source_columns:
-                        priority = source_col.get("priority", 999)
-                        attr_col = f"{attr_name}_p{priority}_attr"
-                        order_col = f"{attr_name}_p{priority}_order"
-                        coalesce_parts.append(f"""MAX_BY(
-            CASE WHEN CAST({attr_col} AS VARCHAR) IS NOT NULL THEN {attr_col} END,
-            CASE WHEN CAST({attr_col} AS VARCHAR) IS NOT NULL THEN {order_col} END
-        )""")
-                    
-                    coalesce_parts_str = ',\n            '.join(coalesce_parts)
-                    attr_selection = f"""COALESCE(
-            {coalesce_parts_str}
-        ) AS {attr_name}"""
-            
-            attr_selections.append(attr_selection)
+        union_sql, attr_selections_str = master_parts
 
         # Extract table names to avoid f-string issues
         master_table_name = master_table.split('.')[-1]
-        attr_selections_str = ',\n        '.join(attr_selections)
         
         master_sql = f"""USE DATABASE {database};
 USE SCHEMA {schema};
@@ -1328,6 +2331,271 @@ AS t(database_name, table_name, column_name, key_name);"""
     return sql_files
 
 
+def generate_suppression_sql_snowflake(
+    yaml_data: Dict[str, Any],
+    database: str,
+    schema: str,
+    suppressions_table: str,
+    fix_syntax: bool = True,
+    source_table_bitmask: bool = False,
+) -> List[Tuple[str, str]]:
+    """
+    Generate the SQL steps that remove suppressed ids (opt-outs, deletions) from an
+    existing unification without a full rebuild. suppressions_table holds (id, key_name)
+    rows; only the canonical ids containing one of them are re-split, by a unify loop over
+    their remaining edges, and their lookup, enriched and master rows are rewritten in place.
+    source_table_bitmask must match the workflow that built the graph
+    """
+    sql_files: List[Tuple[str, str]] = []
+
+    keys_config = yaml_data["keys"]
+    tables_config = yaml_data["tables"]
+    master_tables_config = yaml_data.get("master_tables", [])
+    merge_keys = get_merge_keys(yaml_data)
+    canonical_id_name = get_canonical_id_name(yaml_data)
+    prefix = f"{canonical_id_name}_suppress"
+
+    if "." not in suppressions_table:
+        suppressions_table = format_database_table(database, schema, suppressions_table)
+
+    edges_table = format_database_table(database, schema, f"{canonical_id_name}_graph_unify_loop_0")
+    graph_table = format_database_table(database, schema, f"{canonical_id_name}_graph")
+    lookup_table = format_database_table(database, schema, f"{canonical_id_name}_lookup")
+    keys_table = format_database_table(database, schema, f"{canonical_id_name}_keys")
+    ids_table = format_database_table(database, schema, f"{prefix}_ids")
+    followers_table = format_database_table(database, schema, f"{prefix}_followers")
+    loop_start_table = format_database_table(database, schema, f"{prefix}_graph_unify_loop_0")
+    loop_stats_table = format_database_table(database, schema, f"{prefix}_unify_loop_stats")
+    split_graph_table = format_database_table(database, schema, f"{prefix}_graph")
+    split_lookup_table = format_database_table(database, schema, f"{prefix}_lookup")
+    changes_table = format_database_table(database, schema, f"{prefix}_lookup_changes")
+    canonical_ids_table = format_database_table(database, schema, f"{prefix}_canonical_ids")
+
+    # 01: Affected components and their remaining edges
+    components_sql = f"""USE DATABASE {database};
+USE SCHEMA {schema};
+
+-- Suppressed ids with their key type
+CREATE OR REPLACE TRANSIENT TABLE {ids_table} AS
+SELECT DISTINCT CAST(s.id AS VARCHAR) AS id, keys.key_type AS ns
+FROM {suppressions_table} s
+JOIN {keys_table} keys ON keys.key_name = s.key_name;
+
+-- Every id of a canonical id that contains a suppressed id
+CREATE OR REPLACE TRANSIENT TABLE {followers_table} AS
+SELECT
+    graph.follower_id,
+    graph.follower_ns,
+    lookup.canonical_id AS old_canonical_id,
+    ids.id IS NOT NULL AS suppressed
+FROM {graph_table} graph
+JOIN (
+    SELECT DISTINCT graph.leader_id, graph.leader_ns
+    FROM {graph_table} graph
+    JOIN {ids_table} ids ON ids.id = graph.follower_id AND ids.ns = graph.follower_ns
+) components ON components.leader_id = graph.leader_id
+            AND components.leader_ns = graph.leader_ns
+LEFT JOIN {ids_table} ids ON ids.id = graph.follower_id AND ids.ns = graph.follower_ns
+LEFT JOIN {lookup_table} lookup ON lookup.id = graph.follower_id
+                                AND lookup.id_key_type = graph.follower_ns;
+
+-- Drop edges from or to a suppressed id
+DELETE FROM {edges_table} edges
+USING {ids_table} ids
+WHERE (ids.id = edges.follower_id AND ids.ns = edges.follower_ns)
+   OR (ids.id = edges.leader_id AND ids.ns = edges.leader_ns);
+
+-- Ids only linked through a suppressed id lead themselves
+INSERT INTO {edges_table}
+SELECT
+    graph.follower_id, graph.follower_ns, graph.follower_id AS leader_id, graph.follower_ns AS leader_ns,
+    graph.follower_first_seen_at, graph.follower_last_seen_at,
+    graph.follower_source_table_ids, graph.follower_last_processed_at
+FROM {graph_table} graph
+JOIN {followers_table} followers ON followers.follower_id = graph.follower_id
+                                 AND followers.follower_ns = graph.follower_ns
+WHERE NOT followers.suppressed
+AND NOT EXISTS (
+    SELECT 1 FROM {edges_table} edges
+    WHERE edges.follower_id = graph.follower_id AND edges.follower_ns = graph.follower_ns
+);
+
+-- Iteration 0 of the component-local unify loop
+CREATE OR REPLACE TRANSIENT TABLE {loop_start_table} AS
+SELECT edges.*
+FROM {edges_table} edges
+JOIN {followers_table} followers ON followers.follower_id = edges.follower_id
+                                 AND followers.follower_ns = edges.follower_ns
+WHERE NOT followers.suppressed;
+
+CREATE OR REPLACE TABLE {loop_stats_table} (
+    iteration NUMBER,
+    updated_count NUMBER,
+    time NUMBER
+);"""
+
+    sql_files.append(("01_suppress_components", components_sql))
+
+    # 02: Re-split the affected components with the loop procedure
+    priority_case_conditions = [
+        f"WHEN {ns_idx + 1} THEN {priority}"
+        for ns_idx, priority in enumerate(get_key_priority_array(yaml_data))
+    ]
+    priority_case_sql = f"""CASE leader_ns 
+                {' '.join(priority_case_conditions)} 
+                ELSE leader_ns 
+            END"""
+    first_loop_sql = generate_unify_loop_iteration_sql_snowflake(
+        database,
+        schema,
+        prefix,
+        1,
+        loop_start_table,
+        format_database_table(database, schema, f"{prefix}_graph_unify_loop_1"),
+        priority_case_sql,
+        pointer_jump=True,
+        source_table_bitmask=source_table_bitmask,
+    )
+    template_sql = generate_unify_loop_iteration_sql_snowflake(
+        database,
+        schema,
+        prefix,
+        "{{iteration}}",
+        format_database_table(database, schema, f"{prefix}_graph_unify_loop_{{{{prev_iteration}}}}"),
+        format_database_table(database, schema, f"{prefix}_graph_unify_loop_{{{{iteration}}}}"),
+        priority_case_sql,
+        pointer_jump=True,
+        source_table_bitmask=source_table_bitmask,
+    )
+    loop_procedure_sql = generate_unify_loop_procedure_sql_snowflake(
+        database, schema, prefix, first_loop_sql, template_sql, final_table=split_graph_table
+    )
+    procedure = format_database_table(database, schema, f"{prefix}_unify_loop")
+    sql_files.append(("02_suppress_unify_loop", f"""USE DATABASE {database};
+USE SCHEMA {schema};
+
+{loop_procedure_sql}
+
+CALL {procedure}(1, {MAX_LOOP_ITERATIONS});"""))
+
+    # 03: New canonical ids of the affected ids
+    key_mask_values = [
+        f"({i + 1}, '{mask}')" for i, mask in enumerate(generate_key_mask_values(len(merge_keys)))
+    ]
+    lookup_select_sql = generate_lookup_select_sql_snowflake(
+        split_graph_table, keys_table, key_mask_values,
+        source_table_count=len(tables_config) if source_table_bitmask else None,
+    )
+    lookup_sql = f"""USE DATABASE {database};
+USE SCHEMA {schema};
+
+CREATE OR REPLACE TRANSIENT TABLE {split_lookup_table} AS
+{lookup_select_sql};
+
+-- New canonical id of every affected id (NULL once suppressed)
+CREATE OR REPLACE TRANSIENT TABLE {changes_table} AS
+SELECT
+    followers.follower_id AS id,
+    followers.follower_ns AS id_key_type,
+    lookup.canonical_id
+FROM {followers_table} followers
+LEFT JOIN {split_lookup_table} lookup ON lookup.id = followers.follower_id
+                                      AND lookup.id_key_type = followers.follower_ns;
+
+-- Canonical ids whose master rows are recomputed
+CREATE OR REPLACE TRANSIENT TABLE {canonical_ids_table} AS
+SELECT old_canonical_id AS canonical_id FROM {followers_table} WHERE old_canonical_id IS NOT NULL
+UNION
+SELECT canonical_id FROM {split_lookup_table};
+
+-- Replace the affected ids in the lookup and the graph
+DELETE FROM {lookup_table} lookup
+USING {followers_table} followers
+WHERE lookup.id = followers.follower_id AND lookup.id_key_type = followers.follower_ns;
+
+INSERT INTO {lookup_table}
+SELECT * FROM {split_lookup_table};
+
+DELETE FROM {graph_table} graph
+USING {followers_table} followers
+WHERE graph.follower_id = followers.follower_id AND graph.follower_ns = followers.follower_ns;
+
+INSERT INTO {graph_table}
+SELECT * FROM {split_graph_table};"""
+
+    sql_files.append(("03_suppress_lookup", lookup_sql))
+
+    # 10+ Re-assign canonical ids in the enriched tables
+    for table in tables_config:
+        table_name = table["table"]
+        key_cases = build_enrich_key_cases_snowflake(table, keys_config, merge_keys)
+        if not key_cases:
+            continue
+        all_valid_conditions, hash_case, lookup_id_case, lookup_key_type_case = key_cases
+        enriched_table = format_database_table(database, schema, f"enriched_{table_name}")
+
+        enrich_sql = f"""USE DATABASE {database};
+USE SCHEMA {schema};
+
+-- Suppressed ids fall back to their own hashed id, as in the enrich step
+MERGE INTO {enriched_table} p
+USING {changes_table} k0
+    ON k0.id = {lookup_id_case}
+    AND k0.id_key_type = {lookup_key_type_case}
+WHEN MATCHED THEN UPDATE SET {canonical_id_name} = COALESCE(
+    k0.canonical_id,
+    CASE
+        WHEN {all_valid_conditions}
+        THEN {hash_case}
+        ELSE NULL
+    END
+);"""
+
+        sql_files.append((f"10_suppress_enrich_{table_name}", enrich_sql))
+
+    # 20+ Recompute master rows of the affected canonical ids
+    for master in master_tables_config:
+        master_name = master["name"]
+        canonical_id = master["canonical_id"]
+        master_parts = build_master_select_parts_snowflake(master, tables_config, database, schema)
+        if not master_parts:
+            continue
+        union_sql, attr_selections_str = master_parts
+        master_table = format_database_table(database, schema, master_name)
+
+        master_sql = f"""USE DATABASE {database};
+USE SCHEMA {schema};
+
+DELETE FROM {master_table}
+WHERE {canonical_id} IN (SELECT canonical_id FROM {canonical_ids_table});
+
+INSERT INTO {master_table}
+WITH us AS (
+    {union_sql}
+),
+attrs AS (
+    SELECT
+        {attr_selections_str}
+    FROM us
+    WHERE {canonical_id} IN (SELECT canonical_id FROM {canonical_ids_table})
+    GROUP BY {canonical_id}
+)
+SELECT * FROM attrs id_attrs
+WHERE EXISTS (
+    SELECT 1 FROM {lookup_table} ids 
+    WHERE ids.canonical_id = id_attrs.{canonical_id}
+);"""
+
+        sql_files.append((f"20_suppress_master_{master_name}", master_sql))
+
+    # Apply conversion rules to all SQL
+    sql_files = [
+        (name, apply_snowflake_rules(sql, fix_syntax)) for name, sql in sql_files
+    ]
+
+    return sql_files
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Generate complete Snowflake SQL from YAML unification configuration"
@@ -1359,8 +2627,76 @@ def main():
         action="store_true",
         help="Skip Presto/Databricks→Snowflake conversion rules",
     )
+    parser.add_argument(
+        "--loop-mode",
+        choices=["full", "frontier", "pointer-jumping", "auto"],
+        default="full",
+        help="Unify loop strategy: full rewrites the graph every iteration, "
+        "frontier only re-aggregates followers whose leader changed, "
+        "pointer-jumping shortcuts leader chains to converge in fewer iterations, "
+        "auto picks one from the recorded loop history (default: full)",
+    )
+    parser.add_argument(
+        "--loop-tables",
+        choices=["per-iteration", "ping-pong"],
+        default="per-iteration",
+        help="Loop table layout: a new table per iteration, or two alternating tables built with "
+        "one CTAS each and promoted to the final table by rename (default: per-iteration)",
+    )
+    parser.add_argument(
+        "--loop-procedure",
+        action="store_true",
+        help="Also generate a stored procedure that runs the whole unify loop inside Snowflake; "
+        "the executor calls it instead of running iterations one by one",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Keep the graph between runs and only extract source rows at or after each table's "
+        "watermark (the max time processed so far); assumes rows arrive in time order",
+    )
+    parser.add_argument(
+        "--warm-start",
+        action="store_true",
+        help="Seed the unify loop with the previous run's <canonical_id>_graph; the executor "
+        "falls back to a cold start when the merge keys or their priority changed",
+    )
+    parser.add_argument(
+        "--surrogate-ids",
+        action="store_true",
+        help="Map every (key, id) to a NUMBER surrogate before the unify loop so it joins and "
+        "compares numbers instead of strings; string ids are joined back in canonicalization",
+    )
+    parser.add_argument(
+        "--source-table-bitmask",
+        action="store_true",
+        help=f"Carry follower_source_table_ids as a NUMBER bitmask (at most {MAX_BITMASK_SOURCE_TABLES} "
+        "tables) so the unify loop ORs integers instead of flattening arrays; the lookup still gets "
+        "an array. Switching it needs a non-incremental run; --warm-start falls back to a cold start",
+    )
+    parser.add_argument(
+        "--suppress",
+        metavar="TABLE",
+        help="Instead of the workflow, generate SQL that removes the ids listed in TABLE "
+        "(columns id, key_name) from the existing unification, re-splitting only the "
+        "canonical ids that contain them; written to <outdir>/<yaml name>_suppress",
+    )
+    parser.add_argument(
+        "--loop-history",
+        type=pathlib.Path,
+        help="Unify loop history exported by the SQL executor, used to size the loop "
+        f"(default: <outdir>/<yaml name>/{LOOP_HISTORY_FILE} if present)",
+    )
+    parser.add_argument(
+        "--ignore-loop-history",
+        action="store_true",
+        help="Size the unify loop from the YAML configuration only",
+    )
     args = parser.parse_args()
 
+    if args.loop_mode == "frontier" and args.loop_tables == "ping-pong":
+        parser.error("--loop-tables ping-pong does not apply to --loop-mode frontier")
+
     if not args.yaml_file.exists():
         print(f"Error: {args.yaml_file} not found.")
         return 1
@@ -1373,17 +2709,49 @@ def main():
     src_database = args.src_database if args.src_database else args.database
     src_schema = args.src_schema if args.src_schema else "PUBLIC"
 
-    # Generate SQL files
-    sql_files = generate_workflow_sql_snowflake(
-        yaml_data, args.database, args.schema, src_database, src_schema, fix_syntax=not args.no_fix_syntax
-    )
-
-    # Create output directory
-    output_dir = args.outdir / args.yaml_file.stem
-    output_dir.mkdir(parents=True, exist_ok=True)
+    if args.suppress:
+        output_dir = args.outdir / f"{args.yaml_file.stem}_suppress"
+        output_dir.mkdir(parents=True, exist_ok=True)
+        sql_files = generate_suppression_sql_snowflake(
+            yaml_data, args.database, args.schema, args.suppress, fix_syntax=not args.no_fix_syntax,
+            source_table_bitmask=args.source_table_bitmask,
+        )
+    else:
+        # Create output directory
+        output_dir = args.outdir / args.yaml_file.stem
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        # Size the unify loop from previous runs; merge_iterations in the YAML still wins
+        loop_mode = args.loop_mode
+        loop_iterations = None
+        if not args.ignore_loop_history:
+            history_path = args.loop_history or output_dir / LOOP_HISTORY_FILE
+            runs = load_loop_history(history_path)
+            loop_iterations, loop_mode = calibrate_loop_from_history(runs, args.loop_mode, args.loop_tables)
+            if get_merge_iterations(yaml_data) is not None:
+                loop_iterations = None
+            if loop_iterations:
+                print(f"Using {loop_iterations} loop iterations from {len(runs)} recorded runs in {history_path}")
+        elif loop_mode == "auto":
+            loop_mode = "full"
+        if args.loop_mode == "auto":
+            print(f"Loop mode: {loop_mode}")
+
+        # Generate SQL files
+        sql_files = generate_workflow_sql_snowflake(
+            yaml_data, args.database, args.schema, src_database, src_schema, fix_syntax=not args.no_fix_syntax,
+            loop_mode=loop_mode,
+            loop_tables=args.loop_tables,
+            loop_runner="procedure" if args.loop_procedure else "client",
+            loop_iterations=loop_iterations,
+            incremental=args.incremental,
+            warm_start=args.warm_start,
+            surrogate_ids=args.surrogate_ids,
+            source_table_bitmask=args.source_table_bitmask,
+        )
 
     # Clean up existing SQL files in the output directory
-    existing_sql_files = list(output_dir.glob("*.sql"))
+    existing_sql_files = list(output_dir.glob("*.sql")) + list(output_dir.glob("*.sql.tmpl"))
     if existing_sql_files:
         print(f"Cleaning up {len(existing_sql_files)} existing SQL files...")
         for existing_file in existing_sql_files:
@@ -1393,7 +2761,7 @@ def main():
 
     # Write SQL files
     for filename, sql_content in sql_files:
-        file_path = output_dir / f"{filename}.sql"
+        file_path = output_dir / (filename if filename == LOOP_TEMPLATE_FILE else f"{filename}.sql")
         with open(file_path, "w") as f:
             f.write(sql_content)
         print(f"✓ {file_path.relative_to(args.outdir)}")
@@ -1404,7 +2772,8 @@ def main():
 
     # Show execution order
     print(f"\nExecution order:")
-    for i, (filename, _) in enumerate(sql_files, 1):
+    sql_steps = [filename for filename, _ in sql_files if filename != LOOP_TEMPLATE_FILE]
+    for i, filename in enumerate(sql_steps, 1):
         print(f"  {i:2d}. {filename}")
 
     print(f"\nSnowflake table benefits enabled:")